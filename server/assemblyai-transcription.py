@@ -6,9 +6,11 @@ Processes authentic audio content using paid API
 import json
 import sys
 import os
-import requests
 import time
 from pathlib import Path
+import call_metrics
+import stream_output
+import transcript_cache
 
 # AssemblyAI API configuration
 ASSEMBLYAI_API_KEY = os.environ.get('ASSEMBLYAI_API_KEY')
@@ -17,6 +19,8 @@ ASSEMBLYAI_TRANSCRIPT_URL = "https://api.assemblyai.com/v2/transcript"
 
 def upload_audio_to_assemblyai(file_path: str) -> str:
     """Upload audio file to AssemblyAI and get URL"""
+    import requests
+    
     headers = {
         'authorization': ASSEMBLYAI_API_KEY,
         'content-type': 'application/octet-stream'
@@ -30,8 +34,10 @@ def upload_audio_to_assemblyai(file_path: str) -> str:
     else:
         raise Exception(f"Failed to upload audio: {response.text}")
 
-def transcribe_with_assemblyai(audio_url: str) -> dict:
-    """Transcribe audio using AssemblyAI API"""
+def transcribe_with_assemblyai(audio_url: str, stream=None) -> dict:
+    """Transcribe audio using AssemblyAI API (status changes go to `stream` as progress)"""
+    import requests
+    
     headers = {
         'authorization': ASSEMBLYAI_API_KEY,
         'content-type': 'application/json'
@@ -58,10 +64,15 @@ def transcribe_with_assemblyai(audio_url: str) -> dict:
     
     print("Waiting for AssemblyAI transcription to complete...", file=sys.stderr)
     
+    status = None
     while True:
         response = requests.get(polling_url, headers=headers)
         result = response.json()
         
+        if stream and result['status'] != status:
+            status = result['status']
+            stream.progress(stage='transcription', status=status)
+        
         if result['status'] == 'completed':
             return result
         elif result['status'] == 'error':
@@ -69,6 +80,28 @@ def transcribe_with_assemblyai(audio_url: str) -> dict:
         
         time.sleep(2)  # Wait 2 seconds before polling again
 
+@call_metrics.with_call_metrics
+@transcript_cache.cached_transcription('assemblyai')
+def transcribe_file(audio_file: str, stream=None) -> dict:
+    """Upload, transcribe and process one file (cached by decoded audio content)"""
+    # Upload audio file
+    print("Uploading audio to AssemblyAI...", file=sys.stderr)
+    if stream:
+        stream.progress(stage='upload', status='started')
+    audio_url = upload_audio_to_assemblyai(audio_file)
+    
+    # Transcribe audio
+    print("Starting transcription...", file=sys.stderr)
+    assemblyai_result = transcribe_with_assemblyai(audio_url, stream=stream)
+    
+    # Process results
+    result = process_assemblyai_result(assemblyai_result)
+    if stream:
+        # A API só entrega o resultado completo; os segmentos saem todos ao final
+        for segment in result['segments']:
+            stream.segment(segment)
+    return result
+
 def process_assemblyai_result(result: dict) -> dict:
     """Process AssemblyAI transcription result into our format"""
     
@@ -213,11 +246,14 @@ def analyze_transcription_content(text: str, segments: list, sentiment_score: fl
 
 def main():
     """Main function"""
-    if len(sys.argv) != 2:
-        print("Usage: python assemblyai-transcription.py <audio_file>", file=sys.stderr)
+    args = sys.argv[1:]
+    stream = stream_output.NdjsonStream() if stream_output.pop_stream_flag(args) else None
+    
+    if len(args) != 1:
+        print("Usage: python assemblyai-transcription.py [--stream] <audio_file>", file=sys.stderr)
         sys.exit(1)
     
-    audio_file = sys.argv[1]
+    audio_file = args[0]
     
     if not os.path.exists(audio_file):
         print(f"Error: File {audio_file} not found", file=sys.stderr)
@@ -230,21 +266,15 @@ def main():
     try:
         print(f"Processing real audio with AssemblyAI: {audio_file}", file=sys.stderr)
         
-        # Upload audio file
-        print("Uploading audio to AssemblyAI...", file=sys.stderr)
-        audio_url = upload_audio_to_assemblyai(audio_file)
-        
-        # Transcribe audio
-        print("Starting transcription...", file=sys.stderr)
-        assemblyai_result = transcribe_with_assemblyai(audio_url)
-        
-        # Process results
-        result = process_assemblyai_result(assemblyai_result)
+        result = transcribe_file(audio_file, stream=stream)
         
         print(f"Transcription completed: {len(result['text'])} characters, {len(result['segments'])} segments", file=sys.stderr)
         
         # Output JSON result
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+        if stream:
+            stream.summary(result)
+        else:
+            print(json.dumps(result, ensure_ascii=False, indent=2))
         
     except Exception as e:
         error_result = {
@@ -255,6 +285,8 @@ def main():
             "duration": 0,
             "transcription_engine": "assemblyai_real"
         }
+        if stream:
+            stream.error(str(e))
         print(json.dumps(error_result), file=sys.stderr)
         sys.exit(1)
 
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Cache de áudio decodificado (PCM canônico mono 16kHz em .npy mapeável em memória)
+A primeira decodificação de um arquivo grava as amostras; as etapas seguintes (VAD,
+energia, cortes, ASR) e as reexecuções abrem o .npy com np.load(mmap_mode='c'), sem
+custo de decodificação. A chave é o hash dos bytes do arquivo de origem + taxa + dtype.
+Separado do transcript_cache: aqui ficam amostras, lá resultados.
+
+Variáveis de ambiente:
+    AUDIO_CACHE_DIR   diretório do cache (padrão: ~/.cache/akig/audio)
+    AUDIO_CACHE_MB    tamanho máximo das entradas (padrão: 2048)
+    AUDIO_CACHE       0 desativa o cache
+    AUDIO_CACHE_SOURCES  memórias de hash guardadas (padrão: 20000)
+
+Uso: audio_cache.py stats | clear | probe <arquivo>
+"""
+
+import os
+import sys
+import json
+import time
+import fcntl
+import hashlib
+import tempfile
+import transcript_cache
+
+CACHE_DIR = os.environ.get('AUDIO_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'akig', 'audio')
+CACHE_MB = float(os.environ.get('AUDIO_CACHE_MB', '2048'))
+ENABLED = os.environ.get('AUDIO_CACHE', '1') != '0'
+# Memórias de hash por (caminho, tamanho, mtime) guardadas antes de podar as menos usadas
+MAX_SOURCES = int(os.environ.get('AUDIO_CACHE_SOURCES', '20000'))
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _memo_path(file_path: str) -> str:
+    stat = os.stat(file_path)
+    source_key = hashlib.sha256(f"{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+    return os.path.join(CACHE_DIR, 'sources', source_key[:2], source_key)
+
+def _read_memo(file_path: str) -> dict:
+    """Hashes memorizados de `file_path` ({'sha256', 'pcm'}); um acesso renova a memória"""
+    path = _memo_path(file_path)
+    try:
+        with open(path) as f:
+            text = f.read().strip()
+        os.utime(path)
+    except OSError:
+        return {}
+    try:
+        return json.loads(text)
+    except ValueError:
+        # Formato antigo: só o hash dos bytes
+        return {'sha256': text}
+
+def _write_memo(file_path: str, memo: dict):
+    path = _memo_path(file_path)
+    new = not os.path.exists(path)
+    transcript_cache.atomic_write(path, json.dumps(memo).encode())
+    if new and _update_stats(sources=1)['sources'] > MAX_SOURCES:
+        prune_sources()
+
+def source_hash(file_path: str) -> str:
+    """Hash dos bytes de `file_path`, memorizado por (caminho, tamanho, mtime)"""
+    memo = _read_memo(file_path)
+    if 'sha256' not in memo:
+        memo['sha256'] = _file_sha256(file_path)
+        _write_memo(file_path, memo)
+    return memo['sha256']
+
+def pcm_hash(file_path: str):
+    """Hash do PCM canônico (16kHz mono s16le) gravado pelo audio_decode, ou None"""
+    return _read_memo(file_path).get('pcm')
+
+def store_pcm_hash(file_path: str, digest: str):
+    memo = _read_memo(file_path)
+    if memo.get('pcm') != digest:
+        _write_memo(file_path, dict(memo, pcm=digest))
+
+def prune_sources(max_sources: int = None) -> int:
+    """
+    Remove as memórias de hash menos usadas até sobrar metade do limite
+    Só roda quando o contador de stats.json passa de MAX_SOURCES, não a cada gravação
+    """
+    max_sources = MAX_SOURCES // 2 if max_sources is None else max_sources
+    memos = []
+    for directory, _, files in os.walk(os.path.join(CACHE_DIR, 'sources')):
+        for name in files:
+            if name.startswith('.tmp-'):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                memos.append((os.stat(path).st_mtime, path))
+            except OSError:
+                pass
+    removed = 0
+    for _, path in sorted(memos)[:max(0, len(memos) - max_sources)]:
+        try:
+            os.unlink(path)
+            removed += 1
+        except OSError:
+            pass
+    _update_stats(values={'sources': len(memos) - removed})
+    return removed
+
+def entry_path(digest: str, sample_rate: int, dtype: str) -> str:
+    return os.path.join(CACHE_DIR, 'entries', digest[:2], f"{digest}-{sample_rate}-{dtype}.npy")
+
+def _update_stats(values: dict = None, **increments) -> dict:
+    """
+    Soma contadores (e fixa `values`) em stats.json sob flock (vários processos usam o mesmo cache)
+    Retorna os contadores atualizados
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(os.path.join(CACHE_DIR, 'stats.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        stats = read_stats()
+        for name, value in increments.items():
+            stats[name] = stats.get(name, 0) + value
+        stats.update(values or {})
+        transcript_cache.atomic_write(os.path.join(CACHE_DIR, 'stats.json'), json.dumps(stats).encode())
+    return stats
+
+def read_stats() -> dict:
+    try:
+        with open(os.path.join(CACHE_DIR, 'stats.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def load(file_path: str, sample_rate: int, dtype: str):
+    """
+    Amostras em cache de `file_path` mapeadas em memória, ou None
+    mmap copy-on-write: o array é gravável e o arquivo nunca é alterado
+    """
+    import numpy as np
+
+    if not ENABLED:
+        return None
+    try:
+        path = entry_path(source_hash(file_path), sample_rate, dtype)
+        samples = np.load(path, mmap_mode='c')
+    except (OSError, ValueError):
+        return None
+    try:
+        # Um acesso renova a entrada no LRU
+        os.utime(path)
+    except OSError:
+        pass
+    _update_stats(hits=1, bytes_mapped=samples.nbytes)
+    return samples
+
+def store(file_path: str, samples, sample_rate: int, dtype: str, decode_seconds: float = 0.0):
+    """Grava as amostras decodificadas (atomicamente) e descarta as entradas menos usadas"""
+    import numpy as np
+
+    if not ENABLED or len(samples) == 0:
+        return None
+    try:
+        path = entry_path(source_hash(file_path), sample_rate, dtype)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-', suffix='.npy')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, samples, allow_pickle=False)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        # O total gravado fica em stats.json: o diretório só é percorrido quando passa do limite
+        _update_stats(misses=1, decode_seconds=decode_seconds)
+        if add_stored_bytes('stored_bytes', os.path.getsize(path)) > CACHE_MB * 1024 * 1024:
+            evict()
+        return path
+    except OSError as e:
+        print(f"Audio cache write failed: {e}", file=sys.stderr)
+        return None
+
+def list_files(subdir: str, suffix: str) -> list:
+    """(mtime, tamanho, caminho) dos arquivos `suffix` em CACHE_DIR/`subdir` (sem os temporários)"""
+    files = []
+    for directory, _, names in os.walk(os.path.join(CACHE_DIR, subdir)):
+        for name in names:
+            if not name.endswith(suffix) or name.startswith('.tmp-'):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+    return files
+
+def _entries() -> list:
+    return list_files('entries', '.npy')
+
+def evict_files(files: list, max_bytes: int, counter: str, evictions: str = 'evictions') -> int:
+    """
+    Remove os arquivos com mtime mais antigo até caber em `max_bytes`; retorna quantos saíram
+    O total que sobra vira o contador `counter` de stats.json; as remoções somam em `evictions`
+    """
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+    _update_stats(values={counter: total}, **{evictions: removed})
+    return removed
+
+def add_stored_bytes(counter: str, size: int) -> int:
+    """Soma `size` ao total gravado em `counter` e retorna o novo total"""
+    return _update_stats(**{counter: size})[counter]
+
+def evict(max_bytes: int = None) -> int:
+    """
+    Remove as entradas com mtime mais antigo até caber no limite; retorna quantas saíram
+    Processos que já mapearam uma entrada removida continuam lendo normalmente (unlink)
+    """
+    max_bytes = int(CACHE_MB * 1024 * 1024) if max_bytes is None else max_bytes
+    return evict_files(_entries(), max_bytes, 'stored_bytes')
+
+def stats() -> dict:
+    counters = read_stats()
+    hits = counters.get('hits', 0)
+    misses = counters.get('misses', 0)
+    entries = _entries()
+    return {
+        'directory': CACHE_DIR,
+        'entries': len(entries),
+        'bytes': sum(size for _, size, _ in entries),
+        'max_bytes': int(CACHE_MB * 1024 * 1024),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        'bytes_mapped': counters.get('bytes_mapped', 0),
+        # Tempo médio de decodificação das entradas gravadas: o que cada hit economiza
+        'mean_decode_seconds': round(counters.get('decode_seconds', 0.0) / misses, 3) if misses else None,
+        'evictions': counters.get('evictions', 0),
+        'sources': counters.get('sources', 0),
+        'peaks_bytes': counters.get('peaks_bytes', 0)
+    }
+
+def clear() -> int:
+    """Remove todas as entradas (as memórias de hash e as estatísticas ficam)"""
+    return evict(max_bytes=0)
+
+def main():
+    args = sys.argv[1:]
+    if args in (['stats'], ['clear']):
+        print(json.dumps(stats() if args[0] == 'stats' else {'removed': clear()}, indent=2))
+    elif len(args) == 2 and args[0] == 'probe':
+        # Decodifica (ou reaproveita) e informa a duração; usado para aquecer o cache no upload
+        import audio_decode
+
+        start = time.perf_counter()
+        samples = audio_decode.decode(args[1])
+        print(json.dumps({
+            'duration': round(audio_decode.duration(samples), 3),
+            'sample_rate': audio_decode.SAMPLE_RATE,
+            'channels': 1,
+            'samples': len(samples),
+            'seconds': round(time.perf_counter() - start, 3)
+        }))
+    else:
+        print("Usage: audio_cache.py stats | clear | probe <file>", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
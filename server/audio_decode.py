@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Decodificação de áudio em um único passe: ffmpeg -> PCM mono 16kHz -> array NumPy
+Substitui AudioSegment.from_file + set_channels + set_frame_rate + export para WAV
+temporário + releitura: o ffmpeg converte e reamostra, o PCM vem pelo pipe direto para
+um buffer do NumPy, sem WAV temporário.
+
+    samples = audio_decode.decode(path)             # int16, para análise de energia/pydub
+    audio = audio_decode.load_audio(path)           # float32 em [-1, 1), entrada do Whisper
+
+O PCM decodificado fica no audio_cache; outra etapa ou reexecução sobre o mesmo arquivo
+recebe um np.memmap do .npy em vez de decodificar de novo. A pirâmide de picos/RMS
+(audio_peaks) é gravada no mesmo cache, pelo hash do conteúdo, na mesma passada, e o
+hash do PCM int16 (pcm_hash, chave do transcript_cache) é memorizado ao lado.
+
+Para gravações longas, iter_pcm_blocks() entrega o áudio em blocos de tamanho fixo:
+a memória de pico depende do bloco, não da duração da chamada.
+
+    for block in audio_decode.iter_pcm_blocks(path):
+        ...
+"""
+
+import time
+import hashlib
+import threading
+import subprocess
+import audio_cache
+import audio_peaks
+
+SAMPLE_RATE = 16000
+READ_BLOCK = 1 << 20
+# 30s: múltiplo das janelas de 0.5s das análises de energia e dos quadros de 30ms do VAD
+BLOCK_SECONDS = 30
+
+# dtype do NumPy -> formato raw do ffmpeg
+PCM_FORMATS = {
+    'int16': 's16le',
+    'float32': 'f32le'
+}
+
+def ffmpeg_command(file_path: str, sample_rate: int = SAMPLE_RATE, dtype: str = 'int16') -> list:
+    return [
+        'ffmpeg', '-nostdin', '-v', 'error', '-threads', '0',
+        '-i', file_path,
+        '-vn', '-ac', '1', '-ar', str(sample_rate),
+        '-f', PCM_FORMATS[dtype], '-'
+    ]
+
+def _read_all(stream) -> bytearray:
+    """Lê o pipe num bytearray (gravável: o array resultante não precisa ser copiado)"""
+    buffer = bytearray()
+    while True:
+        block = stream.read(READ_BLOCK)
+        if not block:
+            return buffer
+        buffer += block
+
+def decode(file_path: str, sample_rate: int = SAMPLE_RATE, dtype: str = 'int16', cache: bool = True,
+           timeout: float = None):
+    """
+    Amostras mono de `file_path` reamostradas para `sample_rate`
+    `dtype` 'int16' (PCM s16le) ou 'float32' (f32le, já normalizado em [-1, 1))
+    Com `cache`, reaproveita o PCM já decodificado (audio_cache, np.memmap) ou grava o novo,
+    e grava a pirâmide de picos/RMS do conteúdo se ela ainda não existir (audio_peaks)
+    Com `timeout` (segundos), o ffmpeg é encerrado e sobe subprocess.TimeoutExpired
+    """
+    if dtype not in PCM_FORMATS:
+        raise ValueError(f"Unsupported dtype: {dtype}")
+
+    samples = audio_cache.load(file_path, sample_rate, dtype) if cache else None
+    if samples is None:
+        start = time.perf_counter()
+        samples = _run_ffmpeg(file_path, sample_rate, dtype, timeout)
+        if cache:
+            audio_cache.store(file_path, samples, sample_rate, dtype, time.perf_counter() - start)
+
+    if cache and audio_peaks.ENABLED and not audio_peaks.is_fresh(file_path):
+        audio_peaks.ensure(file_path, samples, sample_rate)
+    # PCM canônico: o hash vira a chave do transcript_cache sem outro passe do ffmpeg
+    if cache and dtype == 'int16' and sample_rate == SAMPLE_RATE and audio_cache.pcm_hash(file_path) is None:
+        audio_cache.store_pcm_hash(file_path, _sha256(samples))
+    return samples
+
+def _sha256(samples) -> str:
+    """SHA-256 dos bytes s16le (o mesmo do muxer hash do ffmpeg sobre o PCM canônico)"""
+    import numpy as np
+
+    return hashlib.sha256(memoryview(np.ascontiguousarray(samples, dtype='<i2')).cast('B')).hexdigest()
+
+def pcm_hash(file_path: str) -> str:
+    """
+    SHA-256 do PCM canônico (16kHz mono s16le) de `file_path`
+    Memorizado no audio_cache; sem memória, decodifica uma vez e o PCM fica no cache para
+    a etapa seguinte (transcrição, VAD), que não roda o ffmpeg de novo
+    """
+    digest = audio_cache.pcm_hash(file_path)
+    if digest is None:
+        digest = _sha256(decode(file_path))
+    return digest
+
+def _run_ffmpeg(file_path: str, sample_rate: int, dtype: str, timeout: float = None):
+    import numpy as np
+
+    command = ffmpeg_command(file_path, sample_rate, dtype)
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # O prazo mata o ffmpeg; a leitura termina no EOF do pipe, sem copiar o buffer
+    expired = threading.Event()
+    timer = None
+    if timeout:
+        timer = threading.Timer(timeout, lambda: (expired.set(), process.kill()))
+        timer.start()
+    try:
+        buffer = _read_all(process.stdout)
+        # Com -v error o stderr é curto e não chega a encher o pipe enquanto lemos o stdout
+        errors = process.stderr.read().decode(errors='replace').strip()
+        returncode = process.wait()
+    finally:
+        if timer:
+            timer.cancel()
+    if expired.is_set():
+        raise subprocess.TimeoutExpired(command, timeout)
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg decode failed: {errors or returncode}")
+
+    item_size = np.dtype(dtype).itemsize
+    return np.frombuffer(buffer, dtype=dtype, count=len(buffer) // item_size)
+
+def iter_pcm_blocks(file_path: str, block_seconds: float = BLOCK_SECONDS,
+                    sample_rate: int = SAMPLE_RATE, dtype: str = 'int16'):
+    """
+    Gera as amostras mono de `file_path` em blocos de `block_seconds` (o último pode ser menor)
+    Se o PCM já estiver no audio_cache, os blocos são fatias do np.memmap; senão o ffmpeg
+    decodifica sob demanda e só um bloco fica em memória por vez (nada é gravado no cache)
+    """
+    import numpy as np
+
+    if dtype not in PCM_FORMATS:
+        raise ValueError(f"Unsupported dtype: {dtype}")
+    block_length = max(1, int(block_seconds * sample_rate))
+
+    cached = audio_cache.load(file_path, sample_rate, dtype)
+    convert = None
+    if cached is None and dtype == 'float32':
+        # O PCM int16 (gravado ao calcular a chave do transcript_cache) serve convertido por bloco
+        cached, convert = audio_cache.load(file_path, sample_rate, 'int16'), to_float32
+    if cached is not None:
+        for start in range(0, len(cached), block_length):
+            block = cached[start:start + block_length]
+            yield convert(block) if convert else block
+        return
+
+    item_size = np.dtype(dtype).itemsize
+    process = subprocess.Popen(
+        ffmpeg_command(file_path, sample_rate, dtype),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    try:
+        while True:
+            data = process.stdout.read(block_length * item_size)
+            if not data:
+                break
+            yield np.frombuffer(data, dtype=dtype, count=len(data) // item_size)
+        errors = process.stderr.read().decode(errors='replace').strip()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg decode failed: {errors or process.returncode}")
+    finally:
+        # Consumidor que para no meio (timeout, erro) não deixa o ffmpeg pendurado
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+def probe_duration(file_path: str):
+    """Duração em segundos pelo cabeçalho do container (ffprobe, sem decodificar) ou None"""
+    try:
+        output = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', file_path],
+            capture_output=True, text=True, timeout=30
+        ).stdout.strip()
+        return float(output)
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
+
+def load_audio(file_path: str, sample_rate: int = SAMPLE_RATE):
+    """
+    Equivalente a whisper.load_audio (s16le / 32768)
+    Parte do PCM int16 do audio_cache, o mesmo que deu a chave do transcript_cache
+    """
+    return to_float32(decode(file_path, sample_rate))
+
+def duration(samples, sample_rate: int = SAMPLE_RATE) -> float:
+    return len(samples) / sample_rate
+
+def to_float32(samples):
+    """int16 -> float32 em [-1, 1) (float32 passa direto)"""
+    import numpy as np
+
+    if samples.dtype == np.float32:
+        return samples
+    return samples.astype(np.float32) / 32768.0
+
+def to_int16(samples):
+    """float32 em [-1, 1) -> int16 (int16 passa direto)"""
+    import numpy as np
+
+    if samples.dtype == np.int16:
+        return samples
+    return (np.clip(samples, -1.0, 32767 / 32768) * 32768).astype(np.int16)
+
+def to_audio_segment(samples, sample_rate: int = SAMPLE_RATE):
+    """AudioSegment do pydub sobre as amostras já decodificadas (sem reabrir o arquivo)"""
+    from pydub import AudioSegment
+
+    return AudioSegment(
+        data=to_int16(samples).tobytes(),
+        sample_width=2,
+        frame_rate=sample_rate,
+        channels=1
+    )
+
+def to_audio_data(audio, sample_rate: int = SAMPLE_RATE):
+    """
+    sr.AudioData direto do PCM em memória, sem exportar WAV e reabrir com sr.AudioFile
+    `audio` é um AudioSegment do pydub (chunk) ou um array de amostras mono (float ou PCM inteiro)
+    """
+    import numpy as np
+    import speech_recognition as sr
+    import audio_energy
+
+    if hasattr(audio, 'raw_data'):
+        if audio.channels > 1:
+            audio = audio.set_channels(1)
+        sample_rate = audio.frame_rate
+        audio = audio_energy.segment_samples(audio)
+    if audio.dtype.kind == 'f':
+        audio = to_int16(audio)
+    elif audio.dtype.itemsize == 1:
+        # PCM de 8 bits do pydub é com sinal; o AudioData espera sem sinal (como no WAV)
+        audio = audio.astype(np.int16) << 8
+    return sr.AudioData(audio.tobytes(), sample_rate, audio.dtype.itemsize)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Energia por janela (RMS, pico, média de |amostra| e dBFS) vetorizada com NumPy
+Substitui os laços struct.unpack + sum(s * s for s in window) dos transcritores de
+análise de energia. Aceita PCM de 8, 16 e 32 bits (raw_data do pydub) ou arrays do
+audio_decode, em qualquer tamanho de janela; a última janela pode ser parcial.
+
+    energy = audio_energy.frame_energy(samples, sample_rate // 2)
+    energy = audio_energy.stream_frame_energy(audio_decode.iter_pcm_blocks(path), 8000)
+    energy['rms'], energy['peak'], energy['mean_abs'], energy['dbfs']   # um valor por janela
+"""
+
+# Piso de dBFS para janelas de silêncio digital (log de zero); abaixo do ruído de 24 bits
+SILENCE_DBFS = -120.0
+# Janelas processadas por vez: limita os temporários float64 sem laço por janela no Python
+FRAMES_PER_PASS = 64
+
+# sample_width do pydub -> dtype (o pydub já converte o PCM de 8 bits do WAV para com sinal)
+SAMPLE_DTYPES = {
+    1: 'int8',
+    2: '<i2',
+    4: '<i4'
+}
+
+def samples_from_bytes(raw_data: bytes, sample_width: int):
+    """Amostras (sem cópia) de um PCM little-endian de 8/16/32 bits"""
+    import numpy as np
+
+    if sample_width not in SAMPLE_DTYPES:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+    return np.frombuffer(raw_data, dtype=SAMPLE_DTYPES[sample_width], count=len(raw_data) // sample_width)
+
+def segment_samples(audio):
+    """Amostras de um AudioSegment do pydub (mono)"""
+    return samples_from_bytes(audio.raw_data, audio.sample_width)
+
+def full_scale(dtype) -> float:
+    """Valor de fundo de escala (0 dBFS) do dtype: 2^(bits-1) para inteiros, 1.0 para float"""
+    import numpy as np
+
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'f':
+        return 1.0
+    return float(2 ** (dtype.itemsize * 8 - 1))
+
+def to_dbfs(rms, scale: float):
+    """RMS -> dBFS, com SILENCE_DBFS nas janelas sem sinal"""
+    import numpy as np
+
+    rms = np.asarray(rms, dtype=np.float64)
+    with np.errstate(divide='ignore'):
+        dbfs = 20 * np.log10(rms / scale)
+    return np.maximum(dbfs, SILENCE_DBFS)
+
+def _measure(frames):
+    """(soma dos quadrados, pico, soma de |amostra|) de cada linha de uma matriz de janelas"""
+    import numpy as np
+
+    values = frames.astype(np.float64)
+    squares = np.einsum('ij,ij->i', values, values)
+    np.abs(values, out=values)
+    return squares, values.max(axis=1), values.sum(axis=1)
+
+def stream_frame_energy(blocks, frame_length: int) -> dict:
+    """
+    Energia por janela de `frame_length` amostras sobre blocos de amostras mono
+    Blocos que não são múltiplos da janela são emendados; só o resto parcial é guardado
+    """
+    import numpy as np
+
+    if frame_length <= 0:
+        raise ValueError(f"Invalid frame length: {frame_length}")
+
+    squares, peaks, sums = [], [], []
+    carry = None
+    total = 0
+    dtype = None
+    step = frame_length * FRAMES_PER_PASS
+
+    for block in blocks:
+        if len(block) == 0:
+            continue
+        if dtype is None:
+            dtype = block.dtype
+        total += len(block)
+        if carry is not None and len(carry):
+            block = np.concatenate((carry, block))
+        full = len(block) // frame_length * frame_length
+        for start in range(0, full, step):
+            stop = min(start + step, full)
+            frame_squares, frame_peaks, frame_sums = _measure(block[start:stop].reshape(-1, frame_length))
+            squares.append(frame_squares)
+            peaks.append(frame_peaks)
+            sums.append(frame_sums)
+        carry = block[full:]
+
+    if carry is not None and len(carry):
+        frame_squares, frame_peaks, frame_sums = _measure(carry.reshape(1, -1))
+        squares.append(frame_squares)
+        peaks.append(frame_peaks)
+        sums.append(frame_sums)
+
+    if not squares:
+        empty = np.zeros(0)
+        return {'rms': empty, 'peak': empty, 'mean_abs': empty, 'dbfs': empty,
+                'frame_length': frame_length, 'samples': 0, 'full_scale': 1.0}
+
+    # Quantidade de amostras por janela: todas cheias, exceto possivelmente a última
+    counts = np.full(sum(len(s) for s in squares), frame_length, dtype=np.float64)
+    counts[-1] = total - (len(counts) - 1) * frame_length
+
+    rms = np.sqrt(np.concatenate(squares) / counts)
+    scale = full_scale(dtype)
+    return {
+        'rms': rms,
+        'peak': np.concatenate(peaks),
+        'mean_abs': np.concatenate(sums) / counts,
+        'dbfs': to_dbfs(rms, scale),
+        'frame_length': frame_length,
+        'samples': total,
+        'full_scale': scale
+    }
+
+def frame_energy(samples, frame_length: int) -> dict:
+    """Energia por janela de um array de amostras mono (ver stream_frame_energy)"""
+    return stream_frame_energy([samples], frame_length)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Pirâmide de picos/RMS por gravação (<hash>.peaks.npz em peaks/ no diretório do audio_cache)
+A etapa de decodificação grava, para cada nível (10ms, 100ms e 1s), o pico de |amostra|
+e o RMS de cada janela como int16 na escala do PCM 16 bits. Uma hora de áudio ocupa
+cerca de 1.6MB. Forma de onda do player, consultas de silêncio e estatísticas de
+atividade saem desse arquivo sem decodificar o áudio de novo.
+
+A chave é o hash dos bytes da gravação (audio_cache.source_hash), não o caminho: nada é
+gravado ao lado do arquivo (WAVs temporários das conversões não deixam lixo), uma
+gravação alterada ganha outra chave. As pirâmides têm limite próprio (LRU), separado do
+PCM: uma decodificação grande não descarta o arquivo que o player usa.
+
+Variáveis de ambiente:
+    AUDIO_PEAKS       0 desativa a gravação na decodificação
+    AUDIO_PEAKS_MB    tamanho máximo das pirâmides (padrão: 512)
+
+Uso: audio_peaks.py build <arquivo> | waveform <arquivo> [pontos] | stats <arquivo> [limiar_dbfs]
+"""
+
+import os
+import sys
+import json
+import tempfile
+import audio_cache
+
+ENABLED = os.environ.get('AUDIO_PEAKS', '1') != '0'
+PEAKS_MB = float(os.environ.get('AUDIO_PEAKS_MB', '512'))
+PEAKS_SUFFIX = '.peaks.npz'
+LEVELS_MS = (10, 100, 1000)
+# Escala dos int16 gravados: 32767 = 0 dBFS
+INT16_MAX = 32767
+SILENCE_DBFS = -40.0
+WAVEFORM_POINTS = 1000
+
+def peaks_path(file_path: str) -> str:
+    digest = audio_cache.source_hash(file_path)
+    return os.path.join(audio_cache.CACHE_DIR, 'peaks', digest[:2], digest + PEAKS_SUFFIX)
+
+def _pool(peak, squares, counts, factor: int) -> tuple:
+    """Junta `factor` janelas consecutivas: pico máximo, soma dos quadrados e das amostras"""
+    import numpy as np
+
+    full = len(peak) // factor * factor
+    parts = [(peak[:full].reshape(-1, factor).max(axis=1),
+              squares[:full].reshape(-1, factor).sum(axis=1),
+              counts[:full].reshape(-1, factor).sum(axis=1))]
+    if len(peak) > full:
+        parts.append((peak[full:].max(keepdims=True), squares[full:].sum(keepdims=True), counts[full:].sum(keepdims=True)))
+    return tuple(np.concatenate(values) for values in zip(*parts))
+
+def _to_int16(values, full_scale: float):
+    import numpy as np
+
+    return np.minimum(np.round(values / full_scale * (INT16_MAX + 1)), INT16_MAX).astype(np.int16)
+
+def build(blocks, sample_rate: int) -> dict:
+    """
+    Pirâmide a partir de blocos de amostras mono (ou de uma lista com o array inteiro)
+    Retorna {'levels': {ms: {'peak': int16[], 'rms': int16[]}}, 'samples', 'sample_rate'}
+    """
+    import numpy as np
+    import audio_energy
+
+    base_ms = LEVELS_MS[0]
+    frames = audio_energy.stream_frame_energy(blocks, sample_rate * base_ms // 1000)
+    counts = np.full(len(frames['rms']), frames['frame_length'], dtype=np.float64)
+    if len(counts):
+        counts[-1] = frames['samples'] - (len(counts) - 1) * frames['frame_length']
+    peak, squares = frames['peak'], frames['rms'] ** 2 * counts
+
+    levels = {}
+    previous_ms = base_ms
+    for level_ms in LEVELS_MS:
+        if level_ms != previous_ms:
+            peak, squares, counts = _pool(peak, squares, counts, level_ms // previous_ms)
+            previous_ms = level_ms
+        rms = np.sqrt(squares / np.maximum(counts, 1))
+        levels[level_ms] = {
+            'peak': _to_int16(peak, frames['full_scale']),
+            'rms': _to_int16(rms, frames['full_scale'])
+        }
+    return {'levels': levels, 'samples': frames['samples'], 'sample_rate': sample_rate}
+
+def store(file_path: str, pyramid: dict):
+    """Grava a pirâmide no diretório do cache (atomicamente); falha de escrita só é registrada"""
+    import numpy as np
+
+    meta = {
+        'levels_ms': list(pyramid['levels']),
+        'samples': pyramid['samples'],
+        'sample_rate': pyramid['sample_rate']
+    }
+    arrays = {'meta': np.array(json.dumps(meta))}
+    for level_ms, level in pyramid['levels'].items():
+        arrays[f'peak_{level_ms}'] = level['peak']
+        arrays[f'rms_{level_ms}'] = level['rms']
+
+    try:
+        path = peaks_path(file_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-', suffix=PEAKS_SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        if audio_cache.add_stored_bytes('peaks_bytes', os.path.getsize(path)) > PEAKS_MB * 1024 * 1024:
+            evict()
+        return path
+    except OSError as e:
+        print(f"Peaks write failed: {e}", file=sys.stderr)
+        return None
+
+def load(file_path: str):
+    """Pirâmide gravada para `file_path`, ou None se não existir"""
+    import numpy as np
+
+    try:
+        path = peaks_path(file_path)
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            levels = {
+                level_ms: {'peak': data[f'peak_{level_ms}'], 'rms': data[f'rms_{level_ms}']}
+                for level_ms in meta['levels_ms']
+            }
+    except (OSError, ValueError, KeyError):
+        return None
+    try:
+        # Um acesso renova a pirâmide no LRU
+        os.utime(path)
+    except OSError:
+        pass
+    return {'levels': levels, 'samples': meta['samples'], 'sample_rate': meta['sample_rate']}
+
+def evict(max_bytes: int = None) -> int:
+    """Remove as pirâmides menos usadas até caber em AUDIO_PEAKS_MB; retorna quantas saíram"""
+    max_bytes = int(PEAKS_MB * 1024 * 1024) if max_bytes is None else max_bytes
+    return audio_cache.evict_files(audio_cache.list_files('peaks', PEAKS_SUFFIX), max_bytes,
+                                     'peaks_bytes', 'peaks_evictions')
+
+def is_fresh(file_path: str) -> bool:
+    """Já existe pirâmide para o conteúdo atual da gravação (hash memorizado: só stat)"""
+    try:
+        return os.path.exists(peaks_path(file_path))
+    except OSError:
+        return False
+
+def ensure(file_path: str, samples=None, sample_rate: int = None):
+    """
+    Pirâmide de `file_path`, gravando-a se faltar: a partir de `samples` já decodificadas
+    (sem custo de decodificação) ou dos blocos do audio_decode
+    """
+    import audio_decode
+
+    if is_fresh(file_path):
+        pyramid = load(file_path)
+        if pyramid is not None:
+            return pyramid
+
+    sample_rate = sample_rate or audio_decode.SAMPLE_RATE
+    blocks = [samples] if samples is not None else audio_decode.iter_pcm_blocks(file_path, sample_rate=sample_rate)
+    pyramid = build(blocks, sample_rate)
+    store(file_path, pyramid)
+    return pyramid
+
+def duration(pyramid: dict) -> float:
+    return pyramid['samples'] / pyramid['sample_rate']
+
+def waveform(pyramid: dict, points: int = WAVEFORM_POINTS) -> dict:
+    """
+    Até `points` valores de pico e RMS (0..1) para desenhar a forma de onda
+    Usa o nível mais grosso que ainda tem pontos suficientes e agrupa o resto
+    """
+    import numpy as np
+
+    levels = pyramid['levels']
+    level_ms = max((ms for ms in levels if len(levels[ms]['peak']) >= points), default=min(levels))
+    peak = levels[level_ms]['peak'].astype(np.float64)
+    squares = levels[level_ms]['rms'].astype(np.float64) ** 2
+
+    factor = max(1, int(np.ceil(len(peak) / points)))
+    peak, squares, counts = _pool(peak, squares, np.ones(len(peak)), factor)
+    return {
+        'duration': round(duration(pyramid), 3),
+        'bin_seconds': level_ms * factor / 1000,
+        'peak': np.round(peak / INT16_MAX, 4).tolist(),
+        'rms': np.round(np.sqrt(squares / counts) / INT16_MAX, 4).tolist()
+    }
+
+def silent_mask(pyramid: dict, level_ms: int = 100, silence_dbfs: float = SILENCE_DBFS):
+    """Janelas do nível `level_ms` com RMS abaixo de `silence_dbfs`"""
+    return pyramid['levels'][level_ms]['rms'] < INT16_MAX * 10 ** (silence_dbfs / 20)
+
+def activity_stats(pyramid: dict, level_ms: int = 100, silence_dbfs: float = SILENCE_DBFS) -> dict:
+    """Tempo de atividade e de silêncio pelas janelas de `level_ms`"""
+    import numpy as np
+
+    silent = silent_mask(pyramid, level_ms, silence_dbfs)
+    total = duration(pyramid)
+    silence_time = min(total, float(np.count_nonzero(silent)) * level_ms / 1000)
+    rms = pyramid['levels'][level_ms]['rms']
+    return {
+        'duration': round(total, 3),
+        'active_time': round(total - silence_time, 3),
+        'silence_time': round(silence_time, 3),
+        'activity_ratio': round((total - silence_time) / total, 4) if total else 0,
+        'peak_dbfs': round(20 * np.log10(max(1, int(pyramid['levels'][level_ms]['peak'].max(initial=0))) / INT16_MAX), 2),
+        'mean_rms_dbfs': round(20 * np.log10(max(1.0, float(np.sqrt(np.mean(rms.astype(np.float64) ** 2)))) / INT16_MAX), 2) if len(rms) else None,
+        'silence_dbfs': silence_dbfs,
+        'level_ms': level_ms
+    }
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] not in ('build', 'waveform', 'stats'):
+        print("Usage: audio_peaks.py build <file> | waveform <file> [points] | stats <file> [silence_dbfs]", file=sys.stderr)
+        sys.exit(1)
+
+    command, file_path = args[0], args[1]
+    if not os.path.exists(file_path):
+        print(json.dumps({'error': f"File not found: {file_path}"}))
+        sys.exit(1)
+
+    pyramid = ensure(file_path)
+    if command == 'build':
+        print(json.dumps({
+            'path': peaks_path(file_path),
+            'duration': round(duration(pyramid), 3),
+            'levels': {ms: len(level['peak']) for ms, level in pyramid['levels'].items()}
+        }))
+    elif command == 'waveform':
+        print(json.dumps(waveform(pyramid, int(args[2]) if len(args) > 2 else WAVEFORM_POINTS)))
+    else:
+        print(json.dumps(activity_stats(pyramid, silence_dbfs=float(args[2]) if len(args) > 2 else SILENCE_DBFS)))
+
+if __name__ == "__main__":
+    main()
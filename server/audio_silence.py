@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Divisão por silêncio vetorizada, com a mesma semântica de pydub.silence
+O detect_silence do pydub calcula um RMS por passo de 1ms em Python (segundos numa
+chamada longa); aqui a soma dos quadrados por milissegundo é acumulada uma vez e o RMS
+de todas as janelas sai de diferenças da soma cumulativa.
+
+split_on_silence() devolve (início_ms, fim_ms, amostras) com as amostras como views do
+buffer original (sem cópia), então o tempo de cada chunk é exato.
+
+    samples = audio_energy.segment_samples(audio)
+    for start_ms, end_ms, chunk in audio_silence.split_on_silence(samples, audio.frame_rate, 500, audio.dBFS - 14, 250):
+        ...
+"""
+
+# Milissegundos de áudio convertidos para inteiro por vez (limita o temporário dos quadrados)
+BLOCK_MS = 60000
+
+def _ms_bounds(samples, sample_rate: int):
+    """Índice da primeira amostra de cada milissegundo; a quantidade segue len() do pydub"""
+    import numpy as np
+
+    total_ms = int(round(len(samples) * 1000 / sample_rate))
+    return np.arange(total_ms, dtype=np.int64) * sample_rate // 1000
+
+def _cumulative_squares(samples, bounds):
+    """Soma cumulativa (com 0 na frente) dos quadrados por milissegundo"""
+    import numpy as np
+
+    # Inteiros até 16 bits somam exato em int64 (uma hora não passa de 2^63)
+    exact = samples.dtype.kind in 'iu' and samples.dtype.itemsize <= 2
+    accumulator = np.int64 if exact else np.float64
+    sums = np.empty(len(bounds), dtype=accumulator)
+    for first in range(0, len(bounds), BLOCK_MS):
+        last = min(first + BLOCK_MS, len(bounds))
+        stop = bounds[last] if last < len(bounds) else len(samples)
+        values = samples[bounds[first]:stop].astype(accumulator)
+        values *= values
+        sums[first:last] = np.add.reduceat(values, bounds[first:last] - bounds[first])
+    return np.concatenate(([0], np.cumsum(sums)))
+
+def max_possible_amplitude(samples) -> float:
+    """Mesmo fundo de escala do pydub: 2^(bits-1) para inteiros, 1.0 para float"""
+    import audio_energy
+
+    return audio_energy.full_scale(samples.dtype)
+
+def dbfs(samples) -> float:
+    """Nível RMS do áudio inteiro em dBFS (AudioSegment.dBFS)"""
+    import numpy as np
+
+    if len(samples) == 0:
+        return float('-inf')
+    values = samples.astype(np.float64)
+    rms = np.sqrt(np.dot(values, values) / len(values))
+    if samples.dtype.kind in 'iu':
+        rms = np.floor(rms)
+    if rms == 0:
+        return float('-inf')
+    return float(20 * np.log10(rms / max_possible_amplitude(samples)))
+
+def detect_silence(samples, sample_rate: int, min_silence_len: int = 1000,
+                   silence_thresh: float = -16, seek_step: int = 1) -> list:
+    """Trechos [início_ms, fim_ms] de silêncio (pydub.silence.detect_silence)"""
+    import numpy as np
+
+    bounds = _ms_bounds(samples, sample_rate)
+    seg_len = len(bounds)
+    if seg_len < min_silence_len:
+        return []
+
+    threshold = 10 ** (silence_thresh / 20) * max_possible_amplitude(samples)
+
+    last_slice_start = seg_len - min_silence_len
+    starts = np.arange(0, last_slice_start + 1, seek_step)
+    if last_slice_start % seek_step:
+        starts = np.append(starts, last_slice_start)
+
+    squares = _cumulative_squares(samples, bounds)
+    positions = np.append(bounds, len(samples))
+    counts = positions[starts + min_silence_len] - positions[starts]
+    rms = np.sqrt((squares[starts + min_silence_len] - squares[starts]) / np.maximum(counts, 1))
+    if samples.dtype.kind in 'iu':
+        # audioop.rms trunca para inteiro
+        rms = np.floor(rms)
+
+    silence_starts = starts[rms <= threshold]
+    if len(silence_starts) == 0:
+        return []
+
+    # Janelas silenciosas que se sobrepõem (ou são consecutivas) formam um trecho só
+    steps = np.diff(silence_starts)
+    breaks = np.flatnonzero((steps != seek_step) & (steps > min_silence_len))
+    range_starts = silence_starts[np.concatenate(([0], breaks + 1))]
+    range_ends = silence_starts[np.concatenate((breaks, [len(silence_starts) - 1]))] + min_silence_len
+    return [[int(start), int(end)] for start, end in zip(range_starts, range_ends)]
+
+def detect_nonsilent(samples, sample_rate: int, min_silence_len: int = 1000,
+                     silence_thresh: float = -16, seek_step: int = 1) -> list:
+    """Trechos [início_ms, fim_ms] com som (pydub.silence.detect_nonsilent)"""
+    silent_ranges = detect_silence(samples, sample_rate, min_silence_len, silence_thresh, seek_step)
+    len_seg = int(round(len(samples) * 1000 / sample_rate))
+
+    if not silent_ranges:
+        return [[0, len_seg]]
+    if silent_ranges[0][0] == 0 and silent_ranges[0][1] == len_seg:
+        return []
+
+    prev_end = 0
+    nonsilent_ranges = []
+    for start, end in silent_ranges:
+        nonsilent_ranges.append([prev_end, start])
+        prev_end = end
+    if prev_end != len_seg:
+        nonsilent_ranges.append([prev_end, len_seg])
+    if nonsilent_ranges[0] == [0, 0]:
+        nonsilent_ranges.pop(0)
+    return nonsilent_ranges
+
+def _view(samples, sample_rate: int, start_ms: int, end_ms: int):
+    return samples[start_ms * sample_rate // 1000:end_ms * sample_rate // 1000]
+
+def split_on_silence(samples, sample_rate: int, min_silence_len: int = 1000, silence_thresh: float = -16,
+                     keep_silence=100, seek_step: int = 1) -> list:
+    """
+    (início_ms, fim_ms, amostras) de cada trecho com som (pydub.silence.split_on_silence)
+    Cada trecho mantém até `keep_silence` ms de silêncio nas bordas; quando as margens de
+    dois trechos se sobrepõem, o corte fica no meio
+    """
+    len_seg = int(round(len(samples) * 1000 / sample_rate))
+    if isinstance(keep_silence, bool):
+        keep_silence = len_seg if keep_silence else 0
+
+    output_ranges = [
+        [start - keep_silence, end + keep_silence]
+        for start, end in detect_nonsilent(samples, sample_rate, min_silence_len, silence_thresh, seek_step)
+    ]
+    for current, following in zip(output_ranges, output_ranges[1:]):
+        if following[0] < current[1]:
+            current[1] = (current[1] + following[0]) // 2
+            following[0] = current[1]
+
+    chunks = []
+    for start, end in output_ranges:
+        start, end = max(start, 0), min(end, len_seg)
+        chunks.append((start, end, _view(samples, sample_rate, start, end)))
+    return chunks
+
+def split_fixed(samples, sample_rate: int, chunk_ms: int) -> list:
+    """(início_ms, fim_ms, amostras) em pedaços de `chunk_ms`, no mesmo formato de split_on_silence"""
+    len_seg = int(round(len(samples) * 1000 / sample_rate))
+    return [
+        (start, min(start + chunk_ms, len_seg), _view(samples, sample_rate, start, min(start + chunk_ms, len_seg)))
+        for start in range(0, len_seg, chunk_ms)
+    ]
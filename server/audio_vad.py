@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Detecção de atividade de voz (VAD) por quadro: energia + taxa de cruzamentos por zero
+O piso de ruído é estimado por percentil da energia dos quadros, então a detecção
+se adapta ao nível de cada gravação (chamadas com chiado, música de espera etc.) e um
+estalo ou trecho saturado não derruba o limiar da chamada inteira, como acontecia com
+limiares relativos ao máximo (energia > max * 0.1).
+
+Histerese: um trecho só começa num quadro acima de piso + SPEECH_MARGIN_DB com
+cruzamentos por zero de fala sonora, e só termina quando a energia cai abaixo de
+piso + SPEECH_MARGIN_DB - HYSTERESIS_DB. Pausas menores que MIN_SILENCE_MS (hangover)
+não quebram o trecho. Tudo em operações vetorizadas sobre os quadros.
+
+Uso (pré-etapa no upload): python3 audio_vad.py <arquivo>
+"""
+
+import sys
+import json
+import time
+
+FRAME_MS = 30
+NOISE_PERCENTILE = 10
+LOUD_PERCENTILE = 95
+SPEECH_MARGIN_DB = 12
+HYSTERESIS_DB = 6
+# Fala sonora cruza o zero bem menos que ruído de banda larga (chiado, estalos: ~0.5 por amostra)
+MAX_ONSET_ZCR = 0.3
+MIN_SPEECH_MS = 200
+MIN_SILENCE_MS = 500
+PADDING_MS = 200
+# Abaixo disso é silêncio mesmo que o arquivo inteiro esteja nesse nível
+ABSOLUTE_FLOOR_DB = -55
+
+def _frames(samples, sample_rate: int, frame_ms: int):
+    """Quadros completos (float32 em [-1, 1)) como matriz quadros x amostras"""
+    import numpy as np
+    import audio_energy
+
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    frames = len(samples) // frame_length
+    framed = np.asarray(samples[:frames * frame_length], dtype=np.float32).reshape(frames, frame_length)
+    if samples.dtype.kind != 'f':
+        framed /= audio_energy.full_scale(samples.dtype)
+    return framed
+
+def frame_energy_db(samples, sample_rate: int, frame_ms: int = FRAME_MS):
+    """Energia RMS de cada quadro em dBFS (amostras float em [-1, 1] ou PCM inteiro)"""
+    import numpy as np
+
+    framed = _frames(samples, sample_rate, frame_ms)
+    rms = np.sqrt(np.mean(framed * framed, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+def frame_features(samples, sample_rate: int, frame_ms: int = FRAME_MS) -> tuple:
+    """(energia em dBFS, cruzamentos por zero por amostra) de cada quadro"""
+    import numpy as np
+
+    framed = _frames(samples, sample_rate, frame_ms)
+    rms = np.sqrt(np.mean(framed * framed, axis=1))
+    signs = np.signbit(framed)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / max(1, framed.shape[1])
+    return 20 * np.log10(np.maximum(rms, 1e-10)), zcr
+
+def speech_regions(samples, sample_rate: int, frame_ms: int = FRAME_MS, **options) -> list:
+    """
+    Trechos de fala como lista de (início, fim) em segundos
+    Pausas menores que `min_silence_ms` não quebram o trecho e cada trecho ganha
+    `padding_ms` de margem para não cortar o começo e o fim das palavras
+    """
+    energy, zcr = frame_features(samples, sample_rate, frame_ms)
+    return regions_from_features(energy, zcr, len(samples) / sample_rate, frame_ms, **options)
+
+class StreamVAD:
+    """
+    VAD incremental sobre blocos de amostras (audio_decode.iter_pcm_blocks)
+    Só as características por quadro (dois valores a cada 30ms) ficam em memória.
+    Os blocos devem ter múltiplos do quadro, exceto o último.
+
+        vad = audio_vad.StreamVAD(sample_rate)
+        energy = audio_energy.stream_frame_energy(vad.feed(blocks), window)
+        regions = vad.regions()
+    """
+
+    def __init__(self, sample_rate: int, frame_ms: int = FRAME_MS):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.energies = []
+        self.zcrs = []
+        self.total_samples = 0
+
+    def feed(self, blocks):
+        """Repassa os blocos, acumulando as características: outra análise lê o mesmo decode"""
+        for block in blocks:
+            energy, zcr = frame_features(block, self.sample_rate, self.frame_ms)
+            self.energies.append(energy)
+            self.zcrs.append(zcr)
+            self.total_samples += len(block)
+            yield block
+
+    @property
+    def duration(self) -> float:
+        return self.total_samples / self.sample_rate
+
+    def regions(self, **options) -> list:
+        import numpy as np
+
+        if not self.energies:
+            return []
+        return regions_from_features(np.concatenate(self.energies), np.concatenate(self.zcrs),
+                                     self.duration, self.frame_ms, **options)
+
+def stream_speech_regions(blocks, sample_rate: int, frame_ms: int = FRAME_MS, **options) -> tuple:
+    """
+    speech_regions() sobre blocos de amostras (ver StreamVAD)
+    Retorna (trechos, duração em segundos)
+    """
+    vad = StreamVAD(sample_rate, frame_ms)
+    for _ in vad.feed(blocks):
+        pass
+    return vad.regions(**options), vad.duration
+
+def _percentiles(values, percentiles: list) -> list:
+    """Percentis por seleção (np.partition, O(n)) em vez de ordenação completa"""
+    import numpy as np
+
+    positions = [min(len(values) - 1, int(len(values) * p / 100)) for p in percentiles]
+    partitioned = np.partition(values, positions)
+    return [float(partitioned[k]) for k in positions]
+
+def _runs(mask) -> tuple:
+    """(inícios, fins exclusivos) das sequências de True de `mask`"""
+    import numpy as np
+
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def _merge(starts, ends, max_gap: float) -> tuple:
+    """Une trechos consecutivos (ordenados) separados por menos que `max_gap`"""
+    import numpy as np
+
+    if len(starts) == 0:
+        return starts, ends
+    breaks = np.flatnonzero(starts[1:] - ends[:-1] >= max_gap)
+    return starts[np.concatenate(([0], breaks + 1))], ends[np.concatenate((breaks, [len(ends) - 1]))]
+
+def regions_from_features(energy, zcr, duration: float, frame_ms: int = FRAME_MS,
+                          margin_db: float = SPEECH_MARGIN_DB, hysteresis_db: float = HYSTERESIS_DB,
+                          max_onset_zcr: float = MAX_ONSET_ZCR, min_speech_ms: int = MIN_SPEECH_MS,
+                          min_silence_ms: int = MIN_SILENCE_MS, padding_ms: int = PADDING_MS) -> list:
+    """Trechos de fala a partir da energia (dBFS) e dos cruzamentos por zero por quadro"""
+    import numpy as np
+
+    if len(energy) == 0:
+        return []
+
+    noise_floor, loud_level = _percentiles(energy, [NOISE_PERCENTILE, LOUD_PERCENTILE])
+    # Gravações sem silêncio: o limiar não pode passar do nível típico da fala
+    threshold = max(min(noise_floor + margin_db, loud_level - 6), ABSOLUTE_FLOOR_DB)
+
+    sustain = energy > threshold - hysteresis_db
+    onset = (energy > threshold) & (zcr <= max_onset_zcr) if zcr is not None else energy > threshold
+
+    # Trechos acima do limiar baixo que contêm ao menos um quadro de início
+    starts, ends = _runs(sustain)
+    onsets = np.concatenate(([0], np.cumsum(onset)))
+    keep = onsets[ends] > onsets[starts]
+
+    frame_seconds = frame_ms / 1000
+    starts, ends = _merge(starts[keep] * frame_seconds, ends[keep] * frame_seconds, min_silence_ms / 1000)
+
+    long_enough = ends - starts >= min_speech_ms / 1000
+    padding = padding_ms / 1000
+    starts = np.maximum(0.0, starts[long_enough] - padding)
+    ends = np.minimum(duration, ends[long_enough] + padding)
+    # Margens que se encostam viram um trecho só
+    starts, ends = _merge(starts, ends, np.nextafter(0, 1))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+def regions_from_energy(energy, duration: float, frame_ms: int = FRAME_MS, **options) -> list:
+    """Trechos de fala só pela energia por quadro em dBFS (sem o critério de cruzamentos por zero)"""
+    return regions_from_features(energy, None, duration, frame_ms, **options)
+
+def window_activity(regions: list, window_seconds: float, windows: int):
+    """Máscara de janelas fixas (ex.: 0.5s das análises de energia) que tocam algum trecho de fala"""
+    import numpy as np
+
+    if not regions:
+        return np.zeros(windows, dtype=bool)
+    region_starts, region_ends = (np.array(values) for values in zip(*regions))
+    window_starts = np.arange(windows) * window_seconds
+    following = np.searchsorted(region_ends, window_starts, side='right')
+    active = following < len(region_starts)
+    active[active] = region_starts[following[active]] < window_starts[active] + window_seconds
+    return active
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 audio_vad.py <audio_file>", file=sys.stderr)
+        sys.exit(1)
+
+    import audio_decode
+
+    start = time.perf_counter()
+    regions, duration = stream_speech_regions(audio_decode.iter_pcm_blocks(sys.argv[1]), audio_decode.SAMPLE_RATE)
+    speech_time = sum(end - start for start, end in regions)
+    print(json.dumps({
+        'duration': round(duration, 3),
+        'regions': [{'start': round(s, 3), 'end': round(e, 3)} for s, e in regions],
+        'speech_time': round(speech_time, 3),
+        'speech_ratio': round(speech_time / duration, 4) if duration else 0,
+        'seconds': round(time.perf_counter() - start, 3)
+    }))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark: decodificação antiga (AudioSegment -> WAV temporário -> releitura) vs audio_decode
+Cada método roda num processo novo, para que o pico de memória (ru_maxrss) seja só dele.
+
+Métodos:
+    pydub_wav_wave      from_file + set_channels + set_frame_rate + export + wave (hybrid/offline)
+    pydub_wav_whisper   o mesmo, relido por whisper.load_audio (segundo ffmpeg, whisper-real)
+    ffmpeg_int16        audio_decode.decode (um passe, PCM s16le no pipe)
+    ffmpeg_float32      audio_decode.decode(dtype='float32') (um passe, f32le no pipe)
+    cache_memmap        audio_cache: .npy já gravado aberto com np.memmap (reexecuções)
+    stream_blocks       audio_decode.iter_pcm_blocks + VAD incremental (pico de memória
+                        independente da duração; compare com ffmpeg_int16 em arquivos longos)
+
+Uso: python3 benchmark-audio-decode.py [arquivo] [repetições]
+Sem arquivo, usa a chamada de exemplo em attached_assets/
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parent
+DEFAULT_AUDIO = SERVER_DIR.parent / 'attached_assets' / 'Chamada1-bedcad5b-9736-48a4-94af-2d0fac104ff0_1749599024169.MP3'
+
+METHODS = ['pydub_wav_wave', 'pydub_wav_whisper', 'ffmpeg_int16', 'ffmpeg_float32', 'cache_memmap', 'stream_blocks']
+
+def current_rss_mb() -> float:
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+def peak_rss_mb() -> float:
+    # ru_maxrss vem em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def export_temp_wav(file_path: str) -> str:
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(file_path)
+    if audio.channels > 1:
+        audio = audio.set_channels(1)
+    audio = audio.set_frame_rate(16000)
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
+        audio.export(temp_file.name, format="wav")
+        return temp_file.name
+
+def run_method(method: str, file_path: str) -> dict:
+    """Executa um método neste processo e mede tempo, memória e bytes em disco"""
+    # Imports fora da medição: só a decodificação conta
+    import numpy as np
+    import audio_decode
+
+    if method == 'pydub_wav_whisper':
+        import whisper
+    if method.startswith('pydub'):
+        import wave
+        from pydub import AudioSegment
+    if method == 'cache_memmap':
+        # Aquecimento: a primeira decodificação grava o .npy
+        audio_decode.decode(file_path)
+
+    baseline_mb = current_rss_mb()
+    temp_bytes = 0
+    start = time.perf_counter()
+
+    if method.startswith('pydub'):
+        temp_path = export_temp_wav(file_path)
+        temp_bytes = os.path.getsize(temp_path)
+        try:
+            if method == 'pydub_wav_wave':
+                with wave.open(temp_path, 'rb') as wav_file:
+                    samples = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+            else:
+                samples = whisper.load_audio(temp_path)
+        finally:
+            os.unlink(temp_path)
+    elif method == 'ffmpeg_int16':
+        samples = audio_decode.decode(file_path, cache=False)
+    elif method == 'ffmpeg_float32':
+        samples = audio_decode.decode(file_path, dtype='float32', cache=False)
+    elif method == 'stream_blocks':
+        import audio_vad
+
+        counted = []
+        def blocks():
+            for block in audio_decode.iter_pcm_blocks(file_path):
+                counted.append(len(block))
+                yield block
+        audio_vad.stream_speech_regions(blocks(), audio_decode.SAMPLE_RATE)
+        samples = range(sum(counted))
+    else:
+        samples = audio_decode.decode(file_path)
+        # Percorre as amostras: inclui o custo de trazer as páginas do mapeamento
+        float(np.abs(samples).max())
+
+    seconds = time.perf_counter() - start
+    return {
+        'seconds': round(seconds, 3),
+        'samples': len(samples),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'peak_over_baseline_mb': round(peak_rss_mb() - baseline_mb, 1),
+        'temp_bytes': temp_bytes
+    }
+
+def measure(method: str, file_path: str) -> dict:
+    """Roda o método num processo filho"""
+    completed = subprocess.run(
+        [sys.executable, __file__, '--method', method, file_path],
+        capture_output=True, text=True, cwd=str(SERVER_DIR)
+    )
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'failed'}
+    return json.loads(completed.stdout)
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--method':
+        sys.path.insert(0, str(SERVER_DIR))
+        print(json.dumps(run_method(sys.argv[2], sys.argv[3])))
+        return
+
+    file_path = sys.argv[1] if len(sys.argv) > 1 else str(DEFAULT_AUDIO)
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    if not os.path.exists(file_path):
+        print(f"Error: File {file_path} not found", file=sys.stderr)
+        sys.exit(1)
+
+    report = {'file': file_path, 'runs': runs, 'methods': {}}
+    for method in METHODS:
+        results = [measure(method, file_path) for _ in range(runs)]
+        errors = [r['error'] for r in results if 'error' in r]
+        if errors:
+            report['methods'][method] = {'error': errors[0]}
+            continue
+        report['methods'][method] = {
+            'seconds': round(sum(r['seconds'] for r in results) / runs, 3),
+            'peak_over_baseline_mb': max(r['peak_over_baseline_mb'] for r in results),
+            'temp_bytes': results[0]['temp_bytes'],
+            'samples': results[0]['samples']
+        }
+
+    legacy = report['methods'].get('pydub_wav_wave', {})
+    single_pass = report['methods'].get('ffmpeg_int16', {})
+    if 'seconds' in legacy and 'seconds' in single_pass and single_pass['seconds']:
+        report['speedup_int16'] = round(legacy['seconds'] / single_pass['seconds'], 2)
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
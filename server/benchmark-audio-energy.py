@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: RMS por janela em Python puro (struct.unpack + sum(s * s)) vs audio_energy
+Por padrão usa 1 hora de áudio sintético a 16kHz (fala intercalada com silêncio), sem
+precisar de ffmpeg; com um arquivo, decodifica pelo audio_decode.
+
+Uso: python3 benchmark-audio-energy.py [--seconds N] [--width 1|2|4] [arquivo]
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import audio_energy
+
+SAMPLE_RATE = 16000
+WINDOW_SIZE = 8000  # 0.5s, como nos transcritores
+
+def synthetic_pcm(seconds: float, sample_width: int) -> bytes:
+    """Tom de 220Hz com amplitude variável a cada 2s (trechos de 'fala' e de silêncio)"""
+    import numpy as np
+
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = np.where((t // 2) % 3 == 0, 0.01, 0.6)
+    signal = np.sin(2 * np.pi * 220 * t) * envelope
+    scale = audio_energy.full_scale(audio_energy.SAMPLE_DTYPES[sample_width]) - 1
+    return (signal * scale).astype(audio_energy.SAMPLE_DTYPES[sample_width]).tobytes()
+
+def legacy_rms(raw_data: bytes, sample_width: int) -> list:
+    """Laço dos transcritores antes do audio_energy"""
+    formats = {1: 'b', 2: 'h', 4: 'i'}
+    energy_values = []
+    for i in range(0, len(raw_data), WINDOW_SIZE * sample_width):
+        window = raw_data[i:i + WINDOW_SIZE * sample_width]
+        samples = struct.unpack(f"<{len(window) // sample_width}{formats[sample_width]}", window)
+        energy_values.append((sum(s * s for s in samples) / len(samples)) ** 0.5)
+    return energy_values
+
+def vectorized_rms(raw_data: bytes, sample_width: int) -> list:
+    samples = audio_energy.samples_from_bytes(raw_data, sample_width)
+    return audio_energy.frame_energy(samples, WINDOW_SIZE)['rms'].tolist()
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    args = sys.argv[1:]
+    seconds = 3600.0
+    sample_width = 2
+    if '--seconds' in args:
+        index = args.index('--seconds')
+        seconds = float(args[index + 1])
+        del args[index:index + 2]
+    if '--width' in args:
+        index = args.index('--width')
+        sample_width = int(args[index + 1])
+        del args[index:index + 2]
+
+    if args:
+        import audio_decode
+
+        if not os.path.exists(args[0]):
+            print(f"Error: File {args[0]} not found", file=sys.stderr)
+            sys.exit(1)
+        raw_data = audio_decode.decode(args[0]).tobytes()
+        sample_width = 2
+        source = args[0]
+    else:
+        raw_data = synthetic_pcm(seconds, sample_width)
+        source = f"synthetic {seconds:.0f}s"
+
+    print(f"Measuring {len(raw_data) // sample_width} samples...", file=sys.stderr)
+    vectorized, vectorized_seconds = timed(vectorized_rms, raw_data, sample_width)
+    legacy, legacy_seconds = timed(legacy_rms, raw_data, sample_width)
+
+    max_difference = max((abs(a - b) for a, b in zip(legacy, vectorized)), default=0.0)
+    print(json.dumps({
+        'source': source,
+        'duration': round(len(raw_data) / sample_width / SAMPLE_RATE, 1),
+        'sample_width': sample_width,
+        'windows': len(vectorized),
+        'legacy_seconds': round(legacy_seconds, 3),
+        'vectorized_seconds': round(vectorized_seconds, 3),
+        'speedup': round(legacy_seconds / vectorized_seconds, 1) if vectorized_seconds else None,
+        'same_windows': len(legacy) == len(vectorized),
+        'max_rms_difference': max_difference
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
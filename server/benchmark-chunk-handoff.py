@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: entrega dos chunks ao speech_recognition
+Mede só o custo de preparar a entrada do recognizer, sem chamar a API.
+
+Métodos:
+    wav_audiofile   chunk.export para WAV temporário + sr.AudioFile + record + unlink (antigo)
+    audio_data      audio_decode.to_audio_data: sr.AudioData sobre o PCM do chunk em memória
+
+Uso: python3 benchmark-chunk-handoff.py [arquivo] [segundos_por_chunk]
+Sem arquivo, usa a chamada de exemplo em attached_assets/
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+import audio_decode
+
+SERVER_DIR = Path(__file__).resolve().parent
+DEFAULT_AUDIO = SERVER_DIR.parent / 'attached_assets' / 'Chamada1-bedcad5b-9736-48a4-94af-2d0fac104ff0_1749599024169.MP3'
+
+def handoff_wav_audiofile(chunk, counters: dict):
+    import speech_recognition as sr
+
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
+        chunk.export(temp_file.name, format="wav")
+        temp_path = temp_file.name
+    counters['files'] += 1
+    counters['bytes'] += os.path.getsize(temp_path)
+    try:
+        with sr.AudioFile(temp_path) as source:
+            return sr.Recognizer().record(source)
+    finally:
+        os.unlink(temp_path)
+
+def handoff_audio_data(chunk, counters: dict):
+    return audio_decode.to_audio_data(chunk)
+
+METHODS = {
+    'wav_audiofile': handoff_wav_audiofile,
+    'audio_data': handoff_audio_data
+}
+
+def measure(handoff, chunks: list) -> dict:
+    counters = {'files': 0, 'bytes': 0}
+    timings = []
+    for chunk in chunks:
+        start = time.perf_counter()
+        audio_data = handoff(chunk, counters)
+        timings.append(time.perf_counter() - start)
+        # Mesmo PCM nos dois métodos: o que chega ao recognize_google é igual
+        assert len(audio_data.frame_data) == len(chunk.raw_data)
+    timings.sort()
+    return {
+        'chunks': len(chunks),
+        'total_ms': round(sum(timings) * 1000, 2),
+        'mean_ms_per_chunk': round(sum(timings) * 1000 / len(timings), 3),
+        'p95_ms_per_chunk': round(timings[int(0.95 * (len(timings) - 1))] * 1000, 3),
+        'temp_files': counters['files'],
+        'temp_bytes': counters['bytes']
+    }
+
+def main():
+    file_path = sys.argv[1] if len(sys.argv) > 1 else str(DEFAULT_AUDIO)
+    chunk_seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 30.0
+
+    if not os.path.exists(file_path):
+        print(f"Error: File {file_path} not found", file=sys.stderr)
+        sys.exit(1)
+
+    audio = audio_decode.to_audio_segment(audio_decode.decode(file_path))
+    chunk_ms = int(chunk_seconds * 1000)
+    chunks = [audio[start:start + chunk_ms] for start in range(0, len(audio), chunk_ms)]
+
+    report = {'file': file_path, 'chunk_seconds': chunk_seconds, 'methods': {}}
+    for name, handoff in METHODS.items():
+        report['methods'][name] = measure(handoff, chunks)
+
+    legacy = report['methods']['wav_audiofile']['mean_ms_per_chunk']
+    in_memory = report['methods']['audio_data']['mean_ms_per_chunk']
+    if in_memory:
+        report['speedup'] = round(legacy / in_memory, 2)
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
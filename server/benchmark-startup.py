@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark de partida dos transcritores
+Mede o tempo até o primeiro byte no stdout de cada script (chamado com um arquivo
+inexistente, ou seja, só imports + validação) e o detalhamento de `python -X importtime`
+
+Uso:
+    python3 benchmark-startup.py [--runs N] [--max-ms MS] [--baseline arquivo.json]
+                                 [--tolerance 0.25] [--write-baseline] [script.py ...]
+
+Sai com código 1 quando algum script passa de --max-ms ou fica mais lento que o
+baseline além da tolerância (relativa, com folga mínima de MIN_SLACK_MS).
+"""
+
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+import threading
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = SERVER_DIR / 'startup-baseline.json'
+MISSING_FILE = '/nonexistent/akig-startup-probe.mp3'
+MIN_SLACK_MS = 20
+TOP_IMPORTS = 10
+
+ENTRY_POINTS = [
+    'assemblyai-transcription.py',
+    'google-speech-api.py',
+    'google-speech-transcriber.py',
+    'honest-transcriber.py',
+    'hybrid-transcriber.py',
+    'local-whisper-transcriber.py',
+    'offline-audio-transcriber.py',
+    'offline-transcriber.py',
+    'python-transcriber.py',
+    'real-audio-transcriber.py',
+    'real-speech-transcriber.py',
+    'simple-reliable-transcription.py',
+    'simple-transcriber.py',
+    'whisper-local-transcriber.py',
+    'whisper-offline-real.py',
+    'whisper-real-transcriber.py',
+]
+
+def time_to_first_byte(script: str, importtime: bool = False) -> tuple:
+    """Executa o script uma vez; retorna (ms até o 1º byte do stdout, stderr completo)"""
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += [str(SERVER_DIR / script), MISSING_FILE]
+
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=SERVER_DIR)
+
+    # Drenar o stderr em paralelo para o -X importtime não travar o pipe
+    stderr_chunks = []
+    reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()))
+    reader.start()
+
+    first_byte = os.read(process.stdout.fileno(), 1)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    process.stdout.read()
+    process.wait()
+    reader.join()
+
+    if not first_byte:
+        # Script terminou sem escrever nada: vale o tempo total
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    return elapsed_ms, b''.join(stderr_chunks).decode('utf-8', errors='replace')
+
+def parse_importtime(stderr: str) -> list:
+    """Imports de primeiro nível por tempo acumulado (ms), do mais lento ao mais rápido"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|')
+        except ValueError:
+            continue
+        # Módulos aninhados vêm indentados; contamos só os de primeiro nível
+        if not name.startswith('  '):
+            imports.append({'module': name.strip(), 'cumulative_ms': round(int(cumulative) / 1000, 1)})
+    imports.sort(key=lambda item: item['cumulative_ms'], reverse=True)
+    return imports[:TOP_IMPORTS]
+
+def measure(script: str, runs: int) -> dict:
+    """Mediana do tempo até o 1º byte e detalhamento de imports de um script"""
+    samples = [time_to_first_byte(script)[0] for _ in range(runs)]
+    _, stderr = time_to_first_byte(script, importtime=True)
+    return {
+        'ttfb_ms': round(statistics.median(samples), 1),
+        'min_ms': round(min(samples), 1),
+        'max_ms': round(max(samples), 1),
+        'imports': parse_importtime(stderr)
+    }
+
+def find_regressions(results: dict, baseline: dict, tolerance: float, max_ms: float = None) -> list:
+    """Scripts acima do limite absoluto ou mais lentos que o baseline"""
+    regressions = []
+    for script, result in results.items():
+        if max_ms is not None and result['ttfb_ms'] > max_ms:
+            regressions.append(f"{script}: {result['ttfb_ms']}ms > max {max_ms}ms")
+
+        previous = baseline.get(script)
+        if previous is None:
+            continue
+        limit = previous + max(previous * tolerance, MIN_SLACK_MS)
+        if result['ttfb_ms'] > limit:
+            regressions.append(f"{script}: {result['ttfb_ms']}ms > baseline {previous}ms (+{tolerance:.0%})")
+    return regressions
+
+def main():
+    args = sys.argv[1:]
+    runs = 5
+    max_ms = None
+    tolerance = 0.25
+    baseline_path = DEFAULT_BASELINE
+    write_baseline = False
+    scripts = []
+
+    try:
+        while args:
+            arg = args.pop(0)
+            if arg == '--runs':
+                runs = max(1, int(args.pop(0)))
+            elif arg == '--max-ms':
+                max_ms = float(args.pop(0))
+            elif arg == '--tolerance':
+                tolerance = float(args.pop(0))
+            elif arg == '--baseline':
+                baseline_path = Path(args.pop(0))
+            elif arg == '--write-baseline':
+                write_baseline = True
+            elif arg.endswith('.py'):
+                scripts.append(os.path.basename(arg))
+            else:
+                raise ValueError(arg)
+    except (IndexError, ValueError):
+        print("Usage: python3 benchmark-startup.py [--runs N] [--max-ms MS] [--baseline file.json] "
+              "[--tolerance 0.25] [--write-baseline] [script.py ...]", file=sys.stderr)
+        sys.exit(1)
+
+    results = {}
+    for script in scripts or ENTRY_POINTS:
+        if not (SERVER_DIR / script).exists():
+            print(f"Skipping {script}: not found", file=sys.stderr)
+            continue
+        print(f"Measuring {script}...", file=sys.stderr)
+        results[script] = measure(script, runs)
+
+    baseline = {}
+    if baseline_path.exists():
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    if write_baseline:
+        baseline.update({script: result['ttfb_ms'] for script, result in results.items()})
+        with open(baseline_path, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {baseline_path}", file=sys.stderr)
+        regressions = find_regressions(results, {}, tolerance, max_ms)
+    else:
+        regressions = find_regressions(results, baseline, tolerance, max_ms)
+
+    print(json.dumps({
+        'python': sys.version.split()[0],
+        'runs': runs,
+        'results': results,
+        'regressions': regressions
+    }, ensure_ascii=False, indent=2))
+
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
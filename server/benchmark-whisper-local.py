@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Whisper via linha de comando vs engine em processo
+Compara o caminho antigo (CLI + JSON em disco) com whisper-local-transcriber.py
+
+Uso: python3 benchmark-whisper-local.py [arquivo] [repetições]
+Sem arquivo, usa a chamada de exemplo em attached_assets/
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+import importlib.util
+from pathlib import Path
+
+# Mede a inferência: sem cache de transcrições (um hit mediria só a consulta) nem métricas da chamada
+os.environ['TRANSCRIPT_CACHE'] = '0'
+os.environ['CALL_METRICS'] = '0'
+
+SERVER_DIR = Path(__file__).resolve().parent
+DEFAULT_AUDIO = SERVER_DIR.parent / 'attached_assets' / 'Chamada1-bedcad5b-9736-48a4-94af-2d0fac104ff0_1749599024169.MP3'
+
+def load_script(name: str):
+    """Importa um script do diretório server/ (nomes com hífen)"""
+    path = SERVER_DIR / name
+    spec = importlib.util.spec_from_file_location(path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def run_cli(file_path: str) -> float:
+    """Caminho antigo: WAV temporário, processo `whisper` e JSON relido do disco"""
+    start = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        wav_path = os.path.join(temp_dir, 'audio.wav')
+        subprocess.run(
+            ['ffmpeg', '-i', file_path, '-ar', '16000', '-ac', '1', '-y', wav_path],
+            capture_output=True, check=True
+        )
+        subprocess.run(
+            ['whisper', wav_path, '--model', 'base', '--language', 'pt',
+             '--output_format', 'json', '--output_dir', temp_dir],
+            capture_output=True, check=True
+        )
+        with open(os.path.join(temp_dir, 'audio.json'), encoding='utf-8') as f:
+            json.load(f)
+
+    return time.perf_counter() - start
+
+def run_in_process(transcriber, file_path: str) -> float:
+    """Caminho novo: transcribe_with_local_whisper() com o modelo residente"""
+    start = time.perf_counter()
+    result = transcriber.transcribe_with_local_whisper(file_path)
+    elapsed = time.perf_counter() - start
+
+    if not result.get('success'):
+        raise RuntimeError(result.get('error', 'in-process transcription failed'))
+    return elapsed
+
+def main():
+    file_path = sys.argv[1] if len(sys.argv) > 1 else str(DEFAULT_AUDIO)
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    if not os.path.exists(file_path):
+        print(f"Error: File {file_path} not found", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Benchmarking {file_path} ({runs} runs)", file=sys.stderr)
+
+    cli_times = [run_cli(file_path) for _ in range(runs)]
+
+    transcriber = load_script('whisper-local-transcriber.py')
+    # A primeira chamada em processo inclui import do torch e carga do modelo
+    in_process_times = [run_in_process(transcriber, file_path) for _ in range(runs)]
+
+    warm_times = in_process_times[1:] or in_process_times
+    report = {
+        'file': file_path,
+        'runs': runs,
+        'cli_seconds': [round(t, 3) for t in cli_times],
+        'in_process_seconds': [round(t, 3) for t in in_process_times],
+        'cli_mean': round(sum(cli_times) / len(cli_times), 3),
+        'in_process_cold': round(in_process_times[0], 3),
+        'in_process_warm_mean': round(sum(warm_times) / len(warm_times), 3),
+    }
+    report['speedup_warm'] = round(report['cli_mean'] / report['in_process_warm_mean'], 2)
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
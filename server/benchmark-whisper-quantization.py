@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Whisper fp32 vs int8 (quantização dinâmica) em CPU
+Reporta fator de tempo real (RTF), pico de RSS e WER sobre um conjunto de referência local
+
+Uso: python3 benchmark-whisper-quantization.py <diretório_referência> [modelo]
+O diretório contém pares <nome>.<áudio> + <nome>.txt com a transcrição de referência
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import resource
+import subprocess
+from pathlib import Path
+
+# Mede a inferência: sem cache de transcrições (um hit mediria só a consulta); vale para os processos filhos
+os.environ['TRANSCRIPT_CACHE'] = '0'
+
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.m4a', '.ogg', '.flac'}
+MODES = ('fp32', 'int8')
+
+def normalize_words(text: str) -> list:
+    """Minúsculas e sem pontuação, para comparar palavras"""
+    return re.findall(r"\w+", text.lower())
+
+def word_errors(reference: list, hypothesis: list) -> int:
+    """Distância de edição entre listas de palavras (substituições + inserções + remoções)"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i] + [0] * len(hypothesis)
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word)
+            )
+        previous = current
+    return previous[-1]
+
+def reference_set(directory: str) -> list:
+    """Lista (áudio, texto de referência) do diretório"""
+    pairs = []
+    for audio_path in sorted(Path(directory).iterdir()):
+        if audio_path.suffix.lower() not in AUDIO_EXTENSIONS:
+            continue
+        text_path = audio_path.with_suffix('.txt')
+        if text_path.exists():
+            pairs.append((str(audio_path), text_path.read_text(encoding='utf-8')))
+    return pairs
+
+def run_mode(directory: str, model_name: str, mode: str) -> dict:
+    """Executado em um processo filho para que o pico de RSS seja só deste modo"""
+    import whisper
+    import whisper_models
+
+    start = time.perf_counter()
+    model = whisper_models.get_model(model_name, quantize=mode)
+    load_time = time.perf_counter() - start
+
+    files = []
+    for audio_path, reference in reference_set(directory):
+        audio = whisper.load_audio(audio_path)
+        start = time.perf_counter()
+        result = model.transcribe(audio, language='pt', fp16=False, verbose=None)
+        elapsed = time.perf_counter() - start
+
+        files.append({
+            'file': os.path.basename(audio_path),
+            'audio_seconds': len(audio) / whisper.audio.SAMPLE_RATE,
+            'seconds': elapsed,
+            'hypothesis': result['text'],
+            'reference': reference
+        })
+
+    return {
+        'mode': mode,
+        'load_time': round(load_time, 3),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'files': files
+    }
+
+def summarize(run: dict, baseline: dict = None) -> dict:
+    """RTF e WER agregados de um modo (e WER relativo ao fp32, se informado)"""
+    audio_seconds = sum(f['audio_seconds'] for f in run['files'])
+    seconds = sum(f['seconds'] for f in run['files'])
+
+    errors = 0
+    reference_words = 0
+    for f in run['files']:
+        reference = normalize_words(f['reference'])
+        errors += word_errors(reference, normalize_words(f['hypothesis']))
+        reference_words += len(reference)
+
+    summary = {
+        'mode': run['mode'],
+        'files': len(run['files']),
+        'audio_seconds': round(audio_seconds, 1),
+        'load_time': run['load_time'],
+        'rtf': round(seconds / audio_seconds, 4) if audio_seconds else None,
+        'peak_rss_mb': run['peak_rss_mb'],
+        'wer': round(errors / reference_words, 4) if reference_words else None
+    }
+
+    if baseline:
+        # Divergência em relação à saída fp32 (independe da qualidade da referência)
+        divergence = 0
+        baseline_words = 0
+        for f, base in zip(run['files'], baseline['files']):
+            base_words = normalize_words(base['hypothesis'])
+            divergence += word_errors(base_words, normalize_words(f['hypothesis']))
+            baseline_words += len(base_words)
+        summary['wer_vs_fp32'] = round(divergence / baseline_words, 4) if baseline_words else None
+
+    return summary
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == '--mode':
+        # Processo filho: python3 benchmark-whisper-quantization.py --mode <modo> <dir> <modelo>
+        print(json.dumps(run_mode(sys.argv[3], sys.argv[4], sys.argv[2]), ensure_ascii=False))
+        return
+
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python3 benchmark-whisper-quantization.py <reference_dir> [model]", file=sys.stderr)
+        sys.exit(1)
+
+    directory = os.path.abspath(sys.argv[1])
+    model_name = sys.argv[2] if len(sys.argv) == 3 else 'base'
+
+    if not reference_set(directory):
+        print(f"Error: no <audio> + .txt pairs found in {directory}", file=sys.stderr)
+        sys.exit(1)
+
+    runs = {}
+    for mode in MODES:
+        print(f"Running {model_name} ({mode})...", file=sys.stderr)
+        output = subprocess.run(
+            [sys.executable, __file__, '--mode', mode, directory, model_name],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        runs[mode] = json.loads(output.stdout)
+
+    report = {
+        'model': model_name,
+        'fp32': summarize(runs['fp32']),
+        'int8': summarize(runs['int8'], baseline=runs['fp32'])
+    }
+    if report['int8']['rtf'] and report['fp32']['rtf']:
+        report['speedup'] = round(report['fp32']['rtf'] / report['int8']['rtf'], 2)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
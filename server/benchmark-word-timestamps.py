@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: timestamps por palavra embutidos vs alinhamento sob demanda
+Compara, por chamada, model.transcribe(word_timestamps=True) com a transcrição sem
+palavras seguida de whisper_engine.align_words() só nos segmentos com palavras críticas
+(WHISPER_WORD_TIMES=critical) e em todos os segmentos (all)
+
+Uso: python3 benchmark-word-timestamps.py [arquivo] [modelo] [repetições]
+Sem arquivo, usa a chamada de exemplo em attached_assets/
+"""
+
+import os
+import sys
+import json
+import time
+import importlib.util
+from pathlib import Path
+
+# Mede a inferência: sem cache de transcrições (um hit mediria só a consulta) nem métricas da chamada
+os.environ['TRANSCRIPT_CACHE'] = '0'
+os.environ['CALL_METRICS'] = '0'
+
+SERVER_DIR = Path(__file__).resolve().parent
+DEFAULT_AUDIO = SERVER_DIR.parent / 'attached_assets' / 'Chamada1-bedcad5b-9736-48a4-94af-2d0fac104ff0_1749599024169.MP3'
+
+def load_script(name: str):
+    """Importa um script do diretório server/ (nomes com hífen)"""
+    path = SERVER_DIR / name
+    spec = importlib.util.spec_from_file_location(path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def timed(function) -> tuple:
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def mean(values: list) -> float:
+    return round(sum(values) / len(values), 3)
+
+def main():
+    file_path = sys.argv[1] if len(sys.argv) > 1 else str(DEFAULT_AUDIO)
+    model_name = sys.argv[2] if len(sys.argv) > 2 else 'base'
+    runs = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    if not os.path.exists(file_path):
+        print(f"Error: File {file_path} not found", file=sys.stderr)
+        sys.exit(1)
+
+    import whisper
+    import whisper_models
+    import whisper_engine
+
+    detect_critical_words = load_script('whisper-offline-real.py').detect_critical_words
+    model = whisper_models.get_model(model_name)
+    audio = whisper.load_audio(file_path)
+    options = {'language': 'pt', 'fp16': False, 'verbose': None}
+
+    # Aquecimento: a primeira chamada inclui inicializações do torch
+    model.transcribe(audio[:whisper.audio.SAMPLE_RATE * 5], **options)
+
+    times = {'word_timestamps': [], 'no_words': [], 'align_critical': [], 'align_all': []}
+    critical_segments = total_segments = 0
+
+    for _ in range(runs):
+        elapsed, _ = timed(lambda: model.transcribe(audio, word_timestamps=True, **options))
+        times['word_timestamps'].append(elapsed)
+
+        elapsed, result = timed(lambda: model.transcribe(audio, **options))
+        times['no_words'].append(elapsed)
+
+        segments = result['segments']
+        critical = [i for i, segment in enumerate(segments) if detect_critical_words(segment['text'])]
+        critical_segments, total_segments = len(critical), len(segments)
+
+        align_time, _ = timed(lambda: whisper_engine.align_words(model, audio, segments, critical))
+        times['align_critical'].append(elapsed + align_time)
+
+        align_time, _ = timed(lambda: whisper_engine.align_words(model, audio, segments))
+        times['align_all'].append(elapsed + align_time)
+
+    report = {
+        'file': file_path,
+        'model': model_name,
+        'runs': runs,
+        'audio_seconds': round(len(audio) / whisper.audio.SAMPLE_RATE, 1),
+        'segments': total_segments,
+        'critical_segments': critical_segments,
+        'seconds': {mode: mean(values) for mode, values in times.items()}
+    }
+    baseline = report['seconds']['word_timestamps']
+    report['saved_seconds'] = {
+        mode: round(baseline - seconds, 3)
+        for mode, seconds in report['seconds'].items() if mode != 'word_timestamps'
+    }
+    report['saved_percent'] = {
+        mode: round(100 * saved / baseline, 1) if baseline else None
+        for mode, saved in report['saved_seconds'].items()
+    }
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
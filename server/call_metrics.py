@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Métricas de silêncio e tempo de fala da chamada (analysis.silenceAnalysis)
+A máscara de fala (trechos do audio_vad, ou os timestamps dos segmentos quando não há
+áudio) é rasterizada em quadros de 10ms e codificada em sequências (RLE); silêncios,
+dead air e tempo de fala saem das sequências sem laço por quadro.
+
+Formato (o mesmo do AssemblyAI em assemblyai-service.ts, com campos extras):
+    totalSilenceTime, silencePeriods [{startTime, endTime, duration}], averageSilenceDuration,
+    longestSilence, deadAirEvents [{startTime, endTime, duration}], deadAirTime,
+    speechTime, speechRatio, speechRate (palavras/min), wordCount, source ('vad' | 'segments')
+
+Os transcritores que já decodificaram o áudio anexam os trechos de fala ao resultado
+(with_regions / with_samples); o decorador with_call_metrics só decodifica o arquivo de
+novo (from_file) quando não há trechos anexados.
+
+Variáveis de ambiente:
+    CALL_MIN_SILENCE_SECONDS   silêncio mínimo listado em silencePeriods (padrão: 1.0)
+    CALL_DEAD_AIR_SECONDS      silêncio a partir do qual vira dead air (padrão: 5.0)
+    CALL_METRICS               0 desativa o preenchimento nos transcritores
+
+Uso: call_metrics.py <arquivo de áudio> [transcrição.json]
+"""
+
+import os
+import sys
+import json
+import time
+import functools
+
+RESOLUTION_SECONDS = 0.01
+MIN_SILENCE_SECONDS = float(os.environ.get('CALL_MIN_SILENCE_SECONDS', '1.0'))
+DEAD_AIR_SECONDS = float(os.environ.get('CALL_DEAD_AIR_SECONDS', '5.0'))
+ENABLED = os.environ.get('CALL_METRICS', '1') != '0'
+# Chave dos trechos de fala anexados ao resultado; o decorador a remove da saída
+REGIONS_KEY = 'speech_regions'
+
+def segment_bounds(segment: dict) -> tuple:
+    """(início, fim) em segundos; aceita startTime/endTime da saída e start/end do Whisper"""
+    start = segment.get('startTime', segment.get('start', 0)) or 0
+    end = segment.get('endTime', segment.get('end', start)) or start
+    return float(start), float(end)
+
+def speech_mask(regions: list, duration: float, resolution: float = RESOLUTION_SECONDS):
+    """Máscara de fala em quadros de `resolution` a partir de trechos (início, fim) em segundos"""
+    import numpy as np
+
+    frames = int(np.ceil(round(duration / resolution, 6))) if duration > 0 else 0
+    delta = np.zeros(frames + 1, dtype=np.int32)
+    if regions and frames:
+        # Arredonda antes de floor/ceil: 0.07 / 0.01 = 7.000000000000001 não vira o quadro 8
+        bounds = np.round(np.asarray(regions, dtype=np.float64).reshape(-1, 2) / resolution, 6)
+        starts = np.clip(np.floor(bounds[:, 0]), 0, frames).astype(np.int64)
+        ends = np.clip(np.ceil(bounds[:, 1]), 0, frames).astype(np.int64)
+        valid = ends > starts
+        # Trechos sobrepostos somam; a máscara é onde a contagem é positiva
+        np.add.at(delta, starts[valid], 1)
+        np.add.at(delta, ends[valid], -1)
+    return np.cumsum(delta[:-1]) > 0
+
+def run_lengths(mask) -> tuple:
+    """RLE de uma máscara booleana: (valores, inícios, comprimentos) em quadros"""
+    import numpy as np
+
+    if len(mask) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return np.zeros(0, dtype=bool), empty, empty
+    starts = np.concatenate(([0], np.flatnonzero(mask[1:] != mask[:-1]) + 1))
+    lengths = np.diff(np.concatenate((starts, [len(mask)])))
+    return mask[starts], starts, lengths
+
+def _periods(starts, lengths, resolution: float, duration: float) -> list:
+    return [
+        {
+            'startTime': round(start * resolution, 3),
+            'endTime': round(min((start + length) * resolution, duration), 3),
+            'duration': round(min((start + length) * resolution, duration) - start * resolution, 3)
+        }
+        for start, length in zip(starts.tolist(), lengths.tolist())
+    ]
+
+def speech_rate(segments: list) -> tuple:
+    """(palavras, palavras por minuto) pelo texto e timestamps dos segmentos (união dos intervalos)"""
+    import numpy as np
+
+    bounds = [segment_bounds(segment) for segment in segments or []]
+    words = sum(len(str(segment.get('text', '')).split()) for segment in segments or [])
+    if not bounds or not words:
+        return words, 0.0
+    spoken_seconds = float(np.count_nonzero(speech_mask(bounds, max(end for _, end in bounds)))) * RESOLUTION_SECONDS
+    return words, round(words / (spoken_seconds / 60), 1) if spoken_seconds > 0 else 0.0
+
+def silence_analysis(regions: list, duration: float, segments: list = None, source: str = 'vad',
+                     min_silence: float = MIN_SILENCE_SECONDS, dead_air: float = DEAD_AIR_SECONDS) -> dict:
+    """silenceAnalysis a partir dos trechos de fala (início, fim) e da duração da chamada"""
+    import numpy as np
+
+    mask = speech_mask(regions, duration)
+    values, starts, lengths = run_lengths(mask)
+
+    silent = ~values
+    silence_lengths = lengths[silent] * RESOLUTION_SECONDS
+    listed = silent.copy()
+    listed[silent] = silence_lengths >= min_silence
+    long_enough = silent.copy()
+    long_enough[silent] = silence_lengths >= dead_air
+
+    periods = _periods(starts[listed], lengths[listed], RESOLUTION_SECONDS, duration)
+    dead_air_events = _periods(starts[long_enough], lengths[long_enough], RESOLUTION_SECONDS, duration)
+    total_silence = sum(period['duration'] for period in periods)
+    speech_time = min(duration, float(np.count_nonzero(mask)) * RESOLUTION_SECONDS)
+    words, rate = speech_rate(segments)
+
+    return {
+        'totalSilenceTime': round(total_silence, 3),
+        'silencePeriods': periods,
+        'averageSilenceDuration': round(total_silence / len(periods), 3) if periods else 0,
+        'longestSilence': max((period['duration'] for period in periods), default=0),
+        'deadAirEvents': dead_air_events,
+        'deadAirTime': round(sum(event['duration'] for event in dead_air_events), 3),
+        'speechTime': round(speech_time, 3),
+        'speechRatio': round(speech_time / duration, 4) if duration > 0 else 0,
+        'speechRate': rate,
+        'wordCount': words,
+        'source': source
+    }
+
+def from_segments(segments: list, duration: float = None) -> dict:
+    """silenceAnalysis só pelos timestamps dos segmentos (sem áudio: reanálise, APIs)"""
+    bounds = [segment_bounds(segment) for segment in segments or []]
+    if duration is None:
+        duration = max((end for _, end in bounds), default=0.0)
+    return silence_analysis(bounds, duration, segments, source='segments')
+
+def from_samples(samples, sample_rate: int, segments: list = None) -> dict:
+    """silenceAnalysis pelo VAD sobre amostras já decodificadas"""
+    import audio_vad
+
+    regions = audio_vad.speech_regions(samples, sample_rate)
+    return silence_analysis(regions, len(samples) / sample_rate, segments)
+
+def from_file(file_path: str, segments: list = None, duration: float = None) -> dict:
+    """
+    silenceAnalysis pelo VAD sobre o áudio (blocos do audio_decode, memmap se já estiver no cache)
+    Sem ffmpeg ou com áudio ilegível, cai para os timestamps dos segmentos
+    """
+    import audio_vad
+    import audio_decode
+
+    try:
+        regions, audio_duration = audio_vad.stream_speech_regions(
+            audio_decode.iter_pcm_blocks(file_path), audio_decode.SAMPLE_RATE
+        )
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"Call metrics from segments ({e})", file=sys.stderr)
+        return from_segments(segments, duration)
+    return silence_analysis(regions, audio_duration, segments)
+
+def _is_failure(result) -> bool:
+    return not isinstance(result, dict) or result.get('success') is False or 'error' in result
+
+def with_regions(result: dict, regions: list, duration: float) -> dict:
+    """
+    Resultado com os trechos de fala (início, fim) que o transcritor já calculou
+    Fica no resultado em cache, então hits também evitam decodificar o áudio de novo
+    """
+    if not ENABLED or _is_failure(result) or regions is None:
+        return result
+    return dict(result, **{REGIONS_KEY: {
+        'duration': round(float(duration), 3),
+        'regions': [[round(float(start), 3), round(float(end), 3)] for start, end in regions]
+    }})
+
+def with_samples(result: dict, samples, sample_rate: int) -> dict:
+    """with_regions() pelo VAD sobre amostras já decodificadas (int16 ou float32)"""
+    import audio_vad
+
+    if not ENABLED or _is_failure(result):
+        return result
+    return with_regions(result, audio_vad.speech_regions(samples, sample_rate), len(samples) / sample_rate)
+
+def with_call_metrics(transcribe):
+    """
+    Decorador para as funções transcribe_*(file_path, ...): preenche analysis.silenceAnalysis
+    Usa os trechos anexados pelo transcritor (with_regions) e só decodifica o arquivo sem eles.
+    Fica por fora do cached_transcription, então hits do cache também recebem as métricas
+    (e mudanças nos limiares valem sem invalidar transcrições)
+    """
+    @functools.wraps(transcribe)
+    def wrapper(file_path, *args, **kwargs):
+        result = transcribe(file_path, *args, **kwargs)
+        attached = None
+        if isinstance(result, dict) and REGIONS_KEY in result:
+            attached = result[REGIONS_KEY]
+            result = {key: value for key, value in result.items() if key != REGIONS_KEY}
+        if not ENABLED or _is_failure(result) or not isinstance(file_path, str):
+            return result
+
+        start = time.perf_counter()
+        segments = result.get('segments') or []
+        if attached:
+            metrics = silence_analysis(attached['regions'], attached['duration'], segments)
+        else:
+            metrics = from_file(file_path, segments, result.get('duration'))
+        print(f"Call metrics in {(time.perf_counter() - start) * 1000:.0f}ms", file=sys.stderr)
+
+        analysis = result.get('analysis') if isinstance(result.get('analysis'), dict) else {}
+        return dict(result, analysis=dict(analysis, silenceAnalysis=metrics))
+    return wrapper
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print("Usage: call_metrics.py <audio_file> [transcript.json]", file=sys.stderr)
+        sys.exit(1)
+
+    if not os.path.exists(sys.argv[1]):
+        print(json.dumps({'error': f"File not found: {sys.argv[1]}"}))
+        sys.exit(1)
+
+    segments = []
+    if len(sys.argv) == 3:
+        with open(sys.argv[2], encoding='utf-8') as f:
+            segments = json.load(f).get('segments', [])
+
+    start = time.perf_counter()
+    metrics = from_file(sys.argv[1], segments)
+    metrics['seconds'] = round(time.perf_counter() - start, 3)
+    print(json.dumps(metrics, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Orçamento de threads de CPU para jobs de transcrição concorrentes
+Cada thread de um job reserva um núcleo (um lock de arquivo por núcleo, compartilhado entre
+processos), então a soma das threads de todos os jobs nunca passa do número de núcleos
+
+Variáveis de ambiente:
+    AKIG_JOB_THREADS   threads pedidas por job (padrão: metade dos núcleos)
+    CPU_BUDGET_DIR     diretório dos locks (padrão: <tmp>/akig-cpu-slots)
+    CPU_BUDGET_PIN     0 desativa o pinning com sched_setaffinity
+    CPU_BUDGET_TIMEOUT espera máxima por um núcleo livre, em segundos (padrão: 600)
+    CPU_BUDGET_OVERCOMMIT  1 segue com 1 thread sem reserva depois da espera em vez de
+                       falhar (passa do número de núcleos; fica registrado em cpu_budget)
+"""
+
+import os
+import sys
+import time
+import fcntl
+import tempfile
+
+SLOTS_DIR = os.environ.get('CPU_BUDGET_DIR', os.path.join(tempfile.gettempdir(), 'akig-cpu-slots'))
+PIN_CPUS = os.environ.get('CPU_BUDGET_PIN', '1') != '0'
+TIMEOUT_SECONDS = float(os.environ.get('CPU_BUDGET_TIMEOUT', '600'))
+OVERCOMMIT = os.environ.get('CPU_BUDGET_OVERCOMMIT', '0') == '1'
+POLL_INTERVAL = 0.1
+
+def available_cpus() -> list:
+    """Núcleos em que o processo pode rodar"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def default_job_threads() -> int:
+    """Threads por job quando o chamador não informa"""
+    configured = os.environ.get('AKIG_JOB_THREADS')
+    if configured:
+        return max(1, int(configured))
+    return max(1, len(available_cpus()) // 2)
+
+class CpuBudgetTimeout(Exception):
+    """Nenhum núcleo ficou livre dentro da espera máxima"""
+
+class CpuAllocation:
+    """Núcleos reservados por um job; liberados no release() ou ao fim do processo"""
+
+    def __init__(self, cpus: list, handles: list, wait_seconds: float, overcommitted: bool = False):
+        self.cpus = cpus
+        self.threads = max(1, len(cpus))
+        self.wait_seconds = wait_seconds
+        self.overcommitted = overcommitted
+        self.pinned = False
+        self._handles = handles
+
+    def apply(self, pin: bool = None):
+        """Limita as threads do torch/OpenMP e fixa o processo nos núcleos reservados"""
+        # Vale para o torch ainda não importado; se já estiver carregado, ajustamos direto
+        for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+            os.environ[var] = str(self.threads)
+        if 'torch' in sys.modules:
+            sys.modules['torch'].set_num_threads(self.threads)
+
+        pin = PIN_CPUS if pin is None else pin
+        if pin and self.cpus and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, self.cpus)
+                self.pinned = True
+            except OSError as e:
+                print(f"CPU pinning failed: {e}", file=sys.stderr)
+        return self
+
+    def release(self):
+        for handle in self._handles:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+                os.close(handle)
+            except OSError:
+                pass
+        self._handles = []
+
+    def as_dict(self) -> dict:
+        """Orçamento escolhido, para incluir no resultado do job"""
+        return {
+            'threads': self.threads,
+            'cpus': self.cpus,
+            'pinned': self.pinned,
+            'wait_seconds': round(self.wait_seconds, 3),
+            'overcommitted': self.overcommitted
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+def _try_lock(cpu: int):
+    path = os.path.join(SLOTS_DIR, f"cpu-{cpu}.lock")
+    handle = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return handle
+    except BlockingIOError:
+        os.close(handle)
+        return None
+
+def acquire(threads: int = None, timeout: float = None, pin: bool = None) -> CpuAllocation:
+    """
+    Reserva até `threads` núcleos livres e aplica o orçamento ao processo
+    Com a máquina cheia, o job fica na fila até `timeout` (padrão: CPU_BUDGET_TIMEOUT) por
+    pelo menos um núcleo; depois disso sobe CpuBudgetTimeout, ou, com CPU_BUDGET_OVERCOMMIT=1,
+    segue com 1 thread sem reserva (overcommitted no as_dict())
+    """
+    os.makedirs(SLOTS_DIR, exist_ok=True)
+    cpus = available_cpus()
+    wanted = min(threads or default_job_threads(), len(cpus))
+    timeout = TIMEOUT_SECONDS if timeout is None else timeout
+
+    start = time.monotonic()
+    while True:
+        reserved = []
+        handles = []
+        for cpu in cpus:
+            if len(reserved) >= wanted:
+                break
+            handle = _try_lock(cpu)
+            if handle is not None:
+                reserved.append(cpu)
+                handles.append(handle)
+
+        if reserved:
+            allocation = CpuAllocation(reserved, handles, time.monotonic() - start)
+            break
+
+        if time.monotonic() - start >= timeout:
+            if not OVERCOMMIT:
+                raise CpuBudgetTimeout(f"CPU budget: no free core after {timeout:g}s ({len(cpus)} cores busy)")
+            print("CPU budget: no free cores, overcommitting with 1 unreserved thread", file=sys.stderr)
+            allocation = CpuAllocation([], [], time.monotonic() - start, overcommitted=True)
+            return allocation.apply(pin=False)
+
+        time.sleep(POLL_INTERVAL)
+
+    print(f"CPU budget: {allocation.threads} thread(s) on cpus {allocation.cpus}", file=sys.stderr)
+    return allocation.apply(pin=pin)
@@ -9,6 +9,8 @@ import os
 import tempfile
 import subprocess
 from pathlib import Path
+import call_metrics
+import transcript_cache
 
 def convert_to_wav_for_google(input_path: str) -> str:
     """Convert audio to WAV format optimized for Google Speech API"""
@@ -37,6 +39,8 @@ def convert_to_wav_for_google(input_path: str) -> str:
         print(f"Audio conversion error: {e}", file=sys.stderr)
         raise
 
+@call_metrics.with_call_metrics
+@transcript_cache.cached_transcription('google_speech_api')
 def transcribe_with_google_cloud(wav_path: str) -> dict:
     """
     Transcribe using Google Cloud Speech-to-Text API
@@ -7,15 +7,34 @@ Processa o conteúdo real do áudio sem gerar diálogos sintéticos
 import os
 import sys
 import json
-import tempfile
-import speech_recognition as sr
-from pydub import AudioSegment
-from pydub.silence import split_on_silence
+import audio_decode
+import audio_energy
+import audio_silence
+import call_metrics
+import stream_output
+import transcript_cache
 
-def transcribe_with_google_api(file_path: str) -> dict:
+def make_segment(i: int, transcript: str, start_time: float, end_time: float) -> dict:
+    """Segmento da i-ésima transcrição, com o tempo do chunk no áudio original"""
+    speaker = 'agent' if i % 2 == 0 else 'client'
+    
+    return {
+        'id': f'segment_{i}',
+        'speaker': speaker,
+        'text': transcript,
+        'startTime': start_time,
+        'endTime': end_time,
+        'confidence': 0.9,
+        'criticalWords': []
+    }
+
+@call_metrics.with_call_metrics
+@transcript_cache.cached_transcription('google_speech')
+def transcribe_with_google_api(file_path: str, stream=None) -> dict:
     """
     Transcrição real usando Google Speech Recognition
     Baseado na implementação do QualityCallMonitor
+    Com `stream` (--stream), cada chunk transcrito sai como segmento na hora
     """
     try:
         print(f"Starting Google Speech transcription: {file_path}", file=sys.stderr)
@@ -24,6 +43,8 @@ def transcribe_with_google_api(file_path: str) -> dict:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Audio file not found: {file_path}")
         
+        from pydub import AudioSegment
+        
         # Carregar áudio
         audio = AudioSegment.from_file(file_path)
         print(f"Audio loaded: {len(audio)}ms, {audio.channels} channels", file=sys.stderr)
@@ -40,8 +61,11 @@ def transcribe_with_google_api(file_path: str) -> dict:
         audio = audio.normalize()
         
         # Dividir o áudio em chunks baseado no silêncio (como no QualityCallMonitor)
-        chunks = split_on_silence(
-            audio,
+        # Cada chunk é (início_ms, fim_ms, amostras) com as amostras como view do buffer
+        samples = audio_energy.segment_samples(audio)
+        chunks = audio_silence.split_on_silence(
+            samples,
+            audio.frame_rate,
             min_silence_len=500,  # 500ms de silêncio
             silence_thresh=audio.dBFS - 14,  # Threshold de silêncio
             keep_silence=250  # Manter 250ms de silêncio
@@ -51,38 +75,36 @@ def transcribe_with_google_api(file_path: str) -> dict:
         
         # Se não conseguiu dividir, usar o áudio completo
         if not chunks:
-            chunks = [audio]
+            chunks = [(0, len(audio), samples)]
             print("Using full audio as single chunk", file=sys.stderr)
         
+        import speech_recognition as sr
+        
         # Inicializar recognizer
         recognizer = sr.Recognizer()
         recognizer.energy_threshold = 300
         recognizer.dynamic_energy_threshold = True
         
         transcripts = []
+        segments = []
         total_duration = len(audio) / 1000.0
         
-        for i, chunk in enumerate(chunks):
+        for i, (start_ms, end_ms, chunk) in enumerate(chunks):
             try:
-                # Salvar chunk como WAV temporário
-                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                    chunk.export(temp_file.name, format="wav")
-                    temp_path = temp_file.name
-                
                 print(f"Processing chunk {i+1}/{len(chunks)}", file=sys.stderr)
                 
-                # Transcrever chunk
-                with sr.AudioFile(temp_path) as source:
-                    # Ajustar para ruído ambiente
-                    recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                    audio_data = recognizer.record(source)
+                # Entregar o PCM do chunk direto ao recognizer (sem WAV temporário)
+                audio_data = audio_decode.to_audio_data(chunk, audio.frame_rate)
                 
                 # Tentar Google Speech Recognition
                 try:
                     text = recognizer.recognize_google(audio_data, language='pt-BR')
                     if text.strip():
                         transcripts.append(text.strip())
+                        segments.append(make_segment(len(segments), text.strip(), start_ms / 1000.0, end_ms / 1000.0))
                         print(f"Chunk {i+1} transcribed: {text[:50]}...", file=sys.stderr)
+                        if stream:
+                            stream.segment(segments[-1])
                     else:
                         print(f"Chunk {i+1}: empty result", file=sys.stderr)
                 except sr.UnknownValueError:
@@ -98,37 +120,16 @@ def transcribe_with_google_api(file_path: str) -> dict:
                         'error': f"Google Speech API error: {e}"
                     }
                 
-                # Limpar arquivo temporário
-                os.unlink(temp_path)
-                
             except Exception as chunk_error:
                 print(f"Error processing chunk {i+1}: {chunk_error}", file=sys.stderr)
                 continue
+            finally:
+                if stream:
+                    stream.progress(chunks_processed=i + 1, chunks_total=len(chunks))
         
         # Combinar todas as transcrições
         full_transcript = " ".join(transcripts) if transcripts else ""
         
-        # Criar segmentos baseados nos chunks transcritos
-        segments = []
-        if transcripts:
-            chunk_duration = total_duration / len(chunks)
-            transcript_index = 0
-            
-            for i, transcript in enumerate(transcripts):
-                start_time = i * chunk_duration
-                end_time = min((i + 1) * chunk_duration, total_duration)
-                speaker = 'agent' if i % 2 == 0 else 'client'
-                
-                segments.append({
-                    'id': f'segment_{i}',
-                    'speaker': speaker,
-                    'text': transcript,
-                    'startTime': start_time,
-                    'endTime': end_time,
-                    'confidence': 0.9,
-                    'criticalWords': []
-                })
-        
         success = len(transcripts) > 0
         
         result = {
@@ -141,7 +142,8 @@ def transcribe_with_google_api(file_path: str) -> dict:
         }
         
         print(f"Transcription completed: {len(transcripts)}/{len(chunks)} chunks transcribed", file=sys.stderr)
-        return result
+        # VAD sobre as amostras já carregadas: as métricas da chamada não decodificam de novo
+        return call_metrics.with_samples(result, samples, audio.frame_rate)
         
     except Exception as e:
         print(f"Transcription failed: {e}", file=sys.stderr)
@@ -154,17 +156,26 @@ def transcribe_with_google_api(file_path: str) -> dict:
         }
 
 def main():
-    if len(sys.argv) != 2:
+    args = sys.argv[1:]
+    stream = stream_output.NdjsonStream() if stream_output.pop_stream_flag(args) else None
+    
+    if len(args) != 1:
         print(json.dumps({'error': 'Audio file path required'}))
         sys.exit(1)
     
-    file_path = sys.argv[1]
+    file_path = args[0]
     
     try:
-        result = transcribe_with_google_api(file_path)
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+        result = transcribe_with_google_api(file_path, stream=stream)
+        if stream:
+            stream.summary(result)
+        else:
+            print(json.dumps(result, ensure_ascii=False, indent=2))
     except Exception as e:
-        print(json.dumps({'error': str(e)}, ensure_ascii=False))
+        if stream:
+            stream.error(str(e))
+        else:
+            print(json.dumps({'error': str(e)}, ensure_ascii=False))
         sys.exit(1)
 
 if __name__ == "__main__":
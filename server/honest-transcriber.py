@@ -8,8 +8,11 @@ import os
 import sys
 import json
 import tempfile
-from pydub import AudioSegment
+import audio_energy
+import audio_vad
+import call_metrics
 
+@call_metrics.with_call_metrics
 def analyze_real_audio_content(file_path: str) -> dict:
     """
     Analisa o conteúdo real do arquivo de áudio
@@ -21,6 +24,8 @@ def analyze_real_audio_content(file_path: str) -> dict:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Arquivo não encontrado: {file_path}")
         
+        from pydub import AudioSegment
+        
         # Carregar e analisar arquivo real
         audio = AudioSegment.from_file(file_path)
         duration = len(audio) / 1000.0
@@ -34,36 +39,23 @@ def analyze_real_audio_content(file_path: str) -> dict:
             audio = audio.set_channels(1)
         audio = audio.set_frame_rate(16000)
         
-        # Analisar energia do áudio real
-        raw_data = audio.raw_data
-        sample_width = audio.sample_width
-        
-        # Calcular RMS em janelas de 0.5s
+        # Analisar energia do áudio real: RMS em janelas de 0.5s (8, 16 ou 32 bits)
         window_size = 8000  # 0.5s a 16kHz
-        energy_values = []
-        
-        for i in range(0, len(raw_data), window_size * sample_width):
-            window = raw_data[i:i + window_size * sample_width]
-            if len(window) >= sample_width:
-                if sample_width == 2:
-                    import struct
-                    try:
-                        samples = struct.unpack(f"<{len(window)//2}h", window)
-                        rms = (sum(s * s for s in samples) / len(samples)) ** 0.5
-                        energy_values.append(rms)
-                    except struct.error:
-                        continue
+        samples = audio_energy.segment_samples(audio)
+        energy_values = audio_energy.frame_energy(samples, window_size)['rms'].tolist()
         
-        # Detectar atividade baseada na energia real
+        # Detectar atividade pelo VAD (piso de ruído + histerese), não por fração do pico
         if energy_values:
             max_energy = max(energy_values)
-            threshold = max_energy * 0.15
-            active_windows = [i for i, energy in enumerate(energy_values) if energy > threshold]
+            regions = audio_vad.speech_regions(samples, 16000)
+            active = audio_vad.window_activity(regions, 0.5, len(energy_values))
+            active_windows = active.nonzero()[0].tolist()
             
             total_active_time = len(active_windows) * 0.5
             activity_ratio = total_active_time / duration if duration > 0 else 0
         else:
             max_energy = 1.0
+            regions = []
             active_windows = []
             total_active_time = 0
             activity_ratio = 0
@@ -133,7 +125,8 @@ def analyze_real_audio_content(file_path: str) -> dict:
         }
         
         print(f"Análise concluída: {len(active_windows)}/{len(energy_values)} janelas ativas", file=sys.stderr)
-        return result
+        # Trechos do VAD já calculados: as métricas da chamada não decodificam o arquivo de novo
+        return call_metrics.with_regions(result, regions, len(samples) / 16000)
         
     except Exception as e:
         print(f"Erro na análise: {e}", file=sys.stderr)
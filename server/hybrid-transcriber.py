@@ -7,50 +7,49 @@ Combina análise de arquivo real com processamento local eficiente
 import os
 import sys
 import json
-import tempfile
-from pydub import AudioSegment
-import wave
-import struct
+import audio_decode
+import audio_energy
+import audio_vad
+import call_metrics
+import transcript_cache
 
-def analyze_wav_content(wav_path: str) -> dict:
-    """Analisa o conteúdo real do arquivo WAV"""
+def analyze_audio_content(blocks, sample_rate: int) -> dict:
+    """
+    Analisa o conteúdo real do áudio em blocos (PCM mono int16, audio_decode.iter_pcm_blocks)
+    Só a energia de cada janela de 0.5s fica em memória, não as amostras
+    """
     try:
-        with wave.open(wav_path, 'rb') as wav_file:
-            frames = wav_file.getnframes()
-            sample_rate = wav_file.getframerate()
-            duration = frames / sample_rate
-            channels = wav_file.getnchannels()
-            
-            # Ler dados de áudio para análise de energia
-            raw_audio = wav_file.readframes(frames)
-            
-            # Converter para valores numéricos
-            if wav_file.getsampwidth() == 2:  # 16-bit
-                audio_data = struct.unpack(f"{frames * channels}h", raw_audio)
-            else:  # 8-bit
-                audio_data = struct.unpack(f"{frames * channels}B", raw_audio)
-            
-            # Calcular energia média e detectar segmentos de fala
-            chunk_size = sample_rate // 2  # 0.5 segundo chunks
-            energy_threshold = max(abs(min(audio_data)), abs(max(audio_data))) * 0.1
-            
-            speech_segments = []
-            for i in range(0, len(audio_data), chunk_size):
-                chunk = audio_data[i:i + chunk_size]
-                if chunk:
-                    energy = sum(abs(sample) for sample in chunk) / len(chunk)
-                    if energy > energy_threshold:
-                        start_time = i / (sample_rate * channels)
-                        end_time = min((i + chunk_size) / (sample_rate * channels), duration)
-                        speech_segments.append((start_time, end_time, energy))
-            
-            return {
-                'duration': duration,
-                'channels': channels,
-                'sample_rate': sample_rate,
-                'speech_segments': speech_segments,
-                'total_speech_time': sum(seg[1] - seg[0] for seg in speech_segments)
-            }
+        chunk_size = sample_rate // 2  # 0.5 segundo chunks
+        
+        # Energia média (|amostra|) por janela
+        vad = audio_vad.StreamVAD(sample_rate)
+        frames = audio_energy.stream_frame_energy(vad.feed(blocks), chunk_size)
+        energies = frames['mean_abs'].tolist()
+        total_samples = frames['samples']
+        
+        if total_samples == 0:
+            raise ValueError("No audio samples decoded")
+        
+        duration = total_samples / sample_rate
+        
+        # Detectar segmentos de fala: janelas que tocam um trecho do VAD
+        active = audio_vad.window_activity(vad.regions(), chunk_size / sample_rate, len(energies))
+        
+        speech_segments = []
+        for i, energy in enumerate(energies):
+            if active[i]:
+                start_time = i * chunk_size / sample_rate
+                end_time = min((i + 1) * chunk_size / sample_rate, duration)
+                speech_segments.append((start_time, end_time, energy))
+        
+        return {
+            'duration': duration,
+            'channels': 1,
+            'sample_rate': sample_rate,
+            'speech_segments': speech_segments,
+            'total_speech_time': sum(seg[1] - seg[0] for seg in speech_segments),
+            'speech_regions': vad.regions()
+        }
     except Exception as e:
         return {'error': str(e), 'duration': 60.0}
 
@@ -67,6 +66,8 @@ def create_realistic_transcript(audio_analysis: dict) -> str:
     else:  # Chamada longa
         return "Olá, bom dia! Central de atendimento, meu nome é Ana. Como posso ajudá-lo hoje? Entendo sua situação. Você está relatando um problema com o produto. Vou anotar todos os detalhes. Pode me informar o número do pedido? Perfeito, encontrei aqui no sistema. Vejo que realmente houve um problema no processamento. Peço desculpas pelo transtorno causado. Vou fazer o estorno imediatamente. Você receberá o valor de volta em até 5 dias úteis. Também vou enviar um email de confirmação. Algo mais que posso resolver? Muito obrigada pelo seu contato e pela paciência. Tenha um excelente dia!"
 
+@call_metrics.with_call_metrics
+@transcript_cache.cached_transcription('hybrid')
 def transcribe_audio_hybrid(file_path: str) -> dict:
     """Transcrição híbrida baseada em análise real do arquivo"""
     try:
@@ -75,28 +76,13 @@ def transcribe_audio_hybrid(file_path: str) -> dict:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        # Carregar e converter áudio
-        audio = AudioSegment.from_file(file_path)
-        
-        # Converter para mono e ajustar taxa de amostragem
-        if audio.channels > 1:
-            audio = audio.set_channels(1)
-        audio = audio.set_frame_rate(16000)
-        
-        # Salvar como WAV temporário para análise
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-            audio.export(temp_file.name, format="wav")
-            temp_wav_path = temp_file.name
-        
         print(f"Analyzing audio content...", file=sys.stderr)
         
-        # Analisar conteúdo real do WAV
-        audio_analysis = analyze_wav_content(temp_wav_path)
-        
-        # Limpar arquivo temporário
-        os.unlink(temp_wav_path)
+        # Analisar conteúdo real do áudio, decodificado em blocos de PCM mono 16kHz
+        audio_analysis = analyze_audio_content(audio_decode.iter_pcm_blocks(file_path), audio_decode.SAMPLE_RATE)
+        speech_regions = audio_analysis.pop('speech_regions', None)
         
-        duration = audio_analysis.get('duration', len(audio) / 1000.0)
+        duration = audio_analysis.get('duration', 60.0)
         
         # Gerar transcrição baseada na análise real
         transcript = create_realistic_transcript(audio_analysis)
@@ -160,14 +146,14 @@ def transcribe_audio_hybrid(file_path: str) -> dict:
             'success': True,
             'audio_properties': {
                 'duration': duration,
-                'channels': audio.channels,
-                'frame_rate': audio.frame_rate,
+                'channels': 1,
+                'frame_rate': audio_decode.SAMPLE_RATE,
                 'analysis': audio_analysis
             }
         }
         
         print(f"Hybrid transcription completed: {len(segments)} segments", file=sys.stderr)
-        return result
+        return call_metrics.with_regions(result, speech_regions, duration)
         
     except Exception as e:
         print(f"Transcription error: {e}", file=sys.stderr)
@@ -7,46 +7,31 @@ Processa áudio real sem dependência de APIs externas
 import sys
 import json
 import os
-import subprocess
-import librosa
-import whisper
+import cpu_budget
+import audio_decode
+import call_metrics
+import whisper_models
+import transcript_cache
 from pathlib import Path
 
-def convert_to_wav(input_path):
-    """Converte áudio para WAV usando ffmpeg"""
-    try:
-        output_path = input_path.replace('.mp3', '_converted.wav').replace('.m4a', '_converted.wav')
-        
-        # Usar ffmpeg para conversão
-        cmd = [
-            'ffmpeg', '-i', input_path, 
-            '-acodec', 'pcm_s16le', 
-            '-ar', '16000', 
-            '-ac', '1',
-            '-y',  # Sobrescrever arquivo existente
-            output_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            return output_path
-        else:
-            print(f"Erro na conversão FFmpeg: {result.stderr}")
-            return input_path
-            
-    except Exception as e:
-        print(f"Erro na conversão: {e}")
-        return input_path
-
+@transcript_cache.cached_transcription('local_whisper', model='base',
+                                        params=lambda audio_path: {'quantize': whisper_models.resolve_quantize()})
 def transcribe_with_whisper(audio_path):
-    """Transcreve áudio usando Whisper local"""
+    """
+    Transcreve áudio usando Whisper local
+    O áudio é decodificado uma vez para as características, o Whisper e o VAD; tudo fica
+    no resultado em cache, então um hit não decodifica nem analisa o arquivo
+    """
     try:
         # Carregar modelo Whisper (base é um bom compromisso)
-        model = whisper.load_model("base")
+        model = whisper_models.get_model("base")
+        
+        # Decodificar uma única vez (float32 mono 16kHz) para a análise e o Whisper
+        audio = audio_decode.load_audio(audio_path)
+        audio_features = analyze_audio_features(audio, audio_decode.SAMPLE_RATE)
         
         # Transcrever áudio
-        result = model.transcribe(audio_path, language="pt", verbose=False)
+        result = model.transcribe(audio, language="pt", verbose=False)
         
         # Processar segmentos
         segments = []
@@ -61,24 +46,25 @@ def transcribe_with_whisper(audio_path):
                 "confidence": 0.85
             })
         
-        return {
+        # Trechos de fala do VAD sobre o mesmo áudio (silenceAnalysis no main)
+        return call_metrics.with_samples({
             "text": result["text"],
             "segments": segments,
             "duration": result.get("duration", 0),
             "confidence": 0.85,
-            "language": result.get("language", "pt")
-        }
+            "language": result.get("language", "pt"),
+            "audioFeatures": audio_features
+        }, audio, audio_decode.SAMPLE_RATE)
         
     except Exception as e:
         print(f"Erro na transcrição Whisper: {e}")
         return None
 
-def analyze_audio_features(audio_path):
-    """Analisa características do áudio"""
+def analyze_audio_features(y, sr):
+    """Analisa características do áudio já decodificado"""
+    import librosa
+    
     try:
-        # Carregar áudio com librosa
-        y, sr = librosa.load(audio_path, sr=16000)
-        
         # Calcular duração
         duration = len(y) / sr
         
@@ -97,8 +83,8 @@ def analyze_audio_features(audio_path):
         print(f"Erro na análise de áudio: {e}")
         return {"duration": 0, "voice_activity": 0.5}
 
-def analyze_transcription(text, segments):
-    """Analisa transcrição para insights"""
+def analyze_transcription(text, segments, silence_analysis=None):
+    """Analisa transcrição para insights (`silence_analysis`: métricas já calculadas pelo áudio)"""
     
     # Palavras-chave para análise
     positive_words = ["obrigado", "perfeito", "excelente", "ótimo", "satisfeito", "resolvido", "bom"]
@@ -150,11 +136,7 @@ def analyze_transcription(text, segments):
         "criticalMoments": critical_moments,
         "score": score,
         "recommendations": generate_recommendations(sentiment, negative_count, topics),
-        "silenceAnalysis": {
-            "totalSilenceTime": 0,
-            "silencePeriods": [],
-            "averageSilenceDuration": 0
-        },
+        "silenceAnalysis": silence_analysis or call_metrics.from_segments(segments),
         "criticalWordsFound": [
             {
                 "word": word,
@@ -201,26 +183,29 @@ def main():
         sys.exit(1)
     
     try:
-        # Converter para WAV se necessário
-        if not audio_path.endswith('.wav'):
-            wav_path = convert_to_wav(audio_path)
-        else:
-            wav_path = audio_path
-        
-        # Analisar características do áudio
-        audio_features = analyze_audio_features(wav_path)
-        
-        # Transcrever com Whisper
-        transcription_result = transcribe_with_whisper(wav_path)
+        # Cache antes de qualquer trabalho; num miss o Whisper roda dentro do orçamento de CPU do job
+        with cpu_budget.acquire() as budget:
+            transcription_result = transcribe_with_whisper(audio_path)
         
         if not transcription_result:
             print(json.dumps({"error": "Falha na transcrição"}))
             sys.exit(1)
         
+        audio_features = transcription_result["audioFeatures"]
+        
+        # Silêncio e tempo de fala pelos trechos do VAD guardados com a transcrição
+        silence_analysis = None
+        regions = transcription_result.get(call_metrics.REGIONS_KEY)
+        if call_metrics.ENABLED and regions:
+            silence_analysis = call_metrics.silence_analysis(
+                regions["regions"], regions["duration"], transcription_result["segments"]
+            )
+        
         # Analisar transcrição
         analysis = analyze_transcription(
             transcription_result["text"], 
-            transcription_result["segments"]
+            transcription_result["segments"],
+            silence_analysis
         )
         
         # Resultado final
@@ -231,14 +216,11 @@ def main():
             "confidence": transcription_result["confidence"],
             "analysis": analysis,
             "audioFeatures": audio_features,
-            "method": "whisper_local"
+            "method": "whisper_local",
+            "cpu_budget": budget.as_dict()
         }
         
         print(json.dumps(result, ensure_ascii=False, indent=2))
-        
-        # Limpar arquivo temporário
-        if wav_path != audio_path and os.path.exists(wav_path):
-            os.remove(wav_path)
             
     except Exception as e:
         print(json.dumps({"error": f"Erro no processamento: {str(e)}"}))
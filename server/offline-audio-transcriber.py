@@ -9,8 +9,11 @@ import sys
 import json
 import tempfile
 import subprocess
-from pydub import AudioSegment
+import audio_energy
+import audio_vad
+import call_metrics
 
+@call_metrics.with_call_metrics
 def extract_text_from_audio_file(file_path: str) -> dict:
     """
     Extrai texto do arquivo de áudio usando processamento offline
@@ -22,6 +25,8 @@ def extract_text_from_audio_file(file_path: str) -> dict:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Arquivo não encontrado: {file_path}")
         
+        from pydub import AudioSegment
+        
         # Carregar áudio
         audio = AudioSegment.from_file(file_path)
         duration = len(audio) / 1000.0
@@ -53,33 +58,21 @@ def extract_text_from_audio_file(file_path: str) -> dict:
             metadata = {}
         
         # Analisar características reais do áudio
-        raw_data = audio.raw_data
-        sample_width = audio.sample_width
         frame_rate = audio.frame_rate
         
-        # Calcular energia RMS em janelas
-        window_size = frame_rate // 2  # 0.5 segundos
-        energy_levels = []
-        
-        for i in range(0, len(raw_data), window_size * sample_width):
-            window = raw_data[i:i + window_size * sample_width]
-            if len(window) >= sample_width:
-                # Calcular energia da janela
-                if sample_width == 2:
-                    import struct
-                    samples = struct.unpack(f"<{len(window)//2}h", window)
-                    rms = (sum(s * s for s in samples) / len(samples)) ** 0.5
-                else:
-                    rms = sum(abs(b) for b in window) / len(window)
-                energy_levels.append(rms)
+        # Calcular energia RMS em janelas de 0.5 segundos (8, 16 ou 32 bits)
+        window_size = frame_rate // 2
+        samples = audio_energy.segment_samples(audio)
+        energy_levels = audio_energy.frame_energy(samples, window_size)['rms'].tolist()
         
-        # Detectar segmentos com atividade
+        # Detectar segmentos com atividade (VAD: piso de ruído + histerese)
+        regions = audio_vad.speech_regions(samples, frame_rate) if energy_levels else []
         if energy_levels:
-            threshold = max(energy_levels) * 0.2
+            active = audio_vad.window_activity(regions, 0.5, len(energy_levels))
             active_segments = []
             
             for i, energy in enumerate(energy_levels):
-                if energy > threshold:
+                if active[i]:
                     start_time = i * 0.5
                     end_time = min((i + 1) * 0.5, duration)
                     active_segments.append({
@@ -138,7 +131,7 @@ def extract_text_from_audio_file(file_path: str) -> dict:
         }
         
         print(f"Processamento concluído: {len(active_segments)} segmentos ativos detectados", file=sys.stderr)
-        return result
+        return call_metrics.with_regions(result, regions, len(samples) / frame_rate)
         
     except Exception as e:
         print(f"Erro no processamento: {e}", file=sys.stderr)
@@ -7,74 +7,57 @@ Extrai características autênticas sem APIs externas
 import os
 import sys
 import json
-import tempfile
-import wave
-import struct
-from pydub import AudioSegment
+import audio_decode
+import audio_energy
+import audio_vad
+import call_metrics
+import transcript_cache
 
-def extract_audio_features(wav_path: str) -> dict:
-    """Extrai características reais do arquivo WAV"""
+def extract_audio_features(blocks, sample_rate: int) -> dict:
+    """
+    Extrai características reais do áudio em blocos (PCM mono int16, audio_decode.iter_pcm_blocks)
+    Só a energia de cada janela de 0.5s fica em memória, não as amostras
+    """
     try:
-        with wave.open(wav_path, 'rb') as wav_file:
-            frames = wav_file.getnframes()
-            sample_rate = wav_file.getframerate()
-            channels = wav_file.getnchannels()
-            sample_width = wav_file.getsampwidth()
-            duration = frames / sample_rate
-            
-            # Ler dados de áudio brutos
-            raw_audio = wav_file.readframes(frames)
-            
-            # Converter para valores numéricos baseado na largura da amostra
-            if sample_width == 1:  # 8-bit
-                audio_data = struct.unpack(f"{frames * channels}B", raw_audio)
-                max_val = 255
-            elif sample_width == 2:  # 16-bit
-                audio_data = struct.unpack(f"<{frames * channels}h", raw_audio)
-                max_val = 32767
-            elif sample_width == 4:  # 32-bit
-                audio_data = struct.unpack(f"<{frames * channels}i", raw_audio)
-                max_val = 2147483647
-            else:
-                raise ValueError(f"Unsupported sample width: {sample_width}")
-            
-            # Analisar energia em janelas de tempo
-            window_size = sample_rate // 2  # 0.5 segundo
-            energy_windows = []
-            
-            for i in range(0, len(audio_data), window_size):
-                window = audio_data[i:i + window_size]
-                if window:
-                    # Calcular RMS (Root Mean Square) para energia
-                    rms = (sum(sample ** 2 for sample in window) / len(window)) ** 0.5
-                    normalized_rms = rms / max_val
-                    energy_windows.append(normalized_rms)
-            
-            # Detectar segmentos de atividade vocal
-            threshold = max(energy_windows) * 0.1 if energy_windows else 0
-            voice_segments = []
-            
-            for i, energy in enumerate(energy_windows):
-                if energy > threshold:
-                    start_time = i * 0.5
-                    end_time = min((i + 1) * 0.5, duration)
-                    voice_segments.append({
-                        'start': start_time,
-                        'end': end_time,
-                        'energy': energy,
-                        'duration': end_time - start_time
-                    })
-            
-            return {
-                'duration': duration,
-                'sample_rate': sample_rate,
-                'channels': channels,
-                'sample_width': sample_width,
-                'voice_segments': voice_segments,
-                'total_voice_time': sum(seg['duration'] for seg in voice_segments),
-                'energy_profile': energy_windows
-            }
-            
+        max_val = 32767  # 16-bit
+        
+        # Analisar energia em janelas de tempo
+        window_size = sample_rate // 2  # 0.5 segundo
+        
+        # RMS (Root Mean Square) normalizado por janela
+        vad = audio_vad.StreamVAD(sample_rate)
+        frames = audio_energy.stream_frame_energy(vad.feed(blocks), window_size)
+        energy_windows = (frames['rms'] / max_val).tolist()
+        total_samples = frames['samples']
+        
+        duration = total_samples / sample_rate
+        
+        # Detectar segmentos de atividade vocal (VAD sobre o mesmo decode)
+        active = audio_vad.window_activity(vad.regions(), 0.5, len(energy_windows))
+        voice_segments = []
+        
+        for i, energy in enumerate(energy_windows):
+            if active[i]:
+                start_time = i * 0.5
+                end_time = min((i + 1) * 0.5, duration)
+                voice_segments.append({
+                    'start': start_time,
+                    'end': end_time,
+                    'energy': energy,
+                    'duration': end_time - start_time
+                })
+        
+        return {
+            'duration': duration,
+            'sample_rate': sample_rate,
+            'channels': 1,
+            'sample_width': 2,
+            'voice_segments': voice_segments,
+            'total_voice_time': sum(seg['duration'] for seg in voice_segments),
+            'energy_profile': energy_windows,
+            'speech_regions': vad.regions()
+        }
+        
     except Exception as e:
         raise Exception(f"Error analyzing audio: {e}")
 
@@ -146,6 +129,8 @@ def create_segments_from_voice_activity(transcript: str, voice_segments: list, t
     
     return segments
 
+@call_metrics.with_call_metrics
+@transcript_cache.cached_transcription('offline_voice_pattern')
 def transcribe_offline(file_path: str) -> dict:
     """Transcrição offline processando características reais do áudio"""
     try:
@@ -154,22 +139,9 @@ def transcribe_offline(file_path: str) -> dict:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Audio file not found: {file_path}")
         
-        # Carregar e converter áudio
-        audio = AudioSegment.from_file(file_path)
-        print(f"Audio loaded: {len(audio)}ms, {audio.channels} channels, {audio.frame_rate}Hz", file=sys.stderr)
-        
-        # Converter para formato padrão
-        if audio.channels > 1:
-            audio = audio.set_channels(1)
-        audio = audio.set_frame_rate(16000)
-        
-        # Salvar como WAV temporário para análise
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-            audio.export(temp_file.name, format="wav")
-            temp_path = temp_file.name
-        
-        # Extrair características reais do áudio
-        features = extract_audio_features(temp_path)
+        # Extrair características reais do áudio, decodificado em blocos de PCM mono 16kHz
+        features = extract_audio_features(audio_decode.iter_pcm_blocks(file_path), audio_decode.SAMPLE_RATE)
+        print(f"Audio decoded: {features['duration'] * 1000:.0f}ms, 1 channel, {audio_decode.SAMPLE_RATE}Hz", file=sys.stderr)
         print(f"Voice segments detected: {len(features['voice_segments'])}", file=sys.stderr)
         print(f"Total voice time: {features['total_voice_time']:.1f}s of {features['duration']:.1f}s", file=sys.stderr)
         
@@ -183,9 +155,6 @@ def transcribe_offline(file_path: str) -> dict:
             features['duration']
         )
         
-        # Limpar arquivo temporário
-        os.unlink(temp_path)
-        
         result = {
             'text': transcript,
             'segments': segments,
@@ -199,7 +168,7 @@ def transcribe_offline(file_path: str) -> dict:
         }
         
         print(f"Offline transcription completed: {len(segments)} segments", file=sys.stderr)
-        return result
+        return call_metrics.with_regions(result, features.get('speech_regions'), features['duration'])
         
     except Exception as e:
         print(f"Transcription error: {e}", file=sys.stderr)
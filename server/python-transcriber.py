@@ -7,75 +7,56 @@ Baseado na abordagem do QualityCallMonitor - Versão Otimizada
 import os
 import sys
 import json
-import tempfile
 import logging
-import speech_recognition as sr
-from pydub import AudioSegment
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import audio_decode
+import call_metrics
+import transcript_cache
 
 # Configurar logging para ser menos verboso
 logging.basicConfig(level=logging.WARNING)
 
-def convert_to_wav(input_path: str) -> str:
-    """Converte arquivo de áudio para WAV otimizado para transcrição"""
-    try:
-        audio = AudioSegment.from_file(input_path)
-        
-        # Converter para mono e ajustar taxa de amostragem
-        if audio.channels > 1:
-            audio = audio.set_channels(1)
-        audio = audio.set_frame_rate(16000)
-        
-        # Salvar como WAV temporário
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-            audio.export(temp_file.name, format="wav")
-            return temp_file.name
-            
-    except Exception as e:
-        logging.error(f"Erro na conversão de áudio: {e}")
-        raise
-
 def transcribe_chunk(chunk_data):
-    """Transcreve um chunk de áudio"""
+    """Transcreve um chunk de áudio: (índice, texto, falha da API)"""
+    import speech_recognition as sr
+    
     chunk, index = chunk_data
     try:
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-            chunk.export(temp_file.name, format="wav")
-            
-            recognizer = sr.Recognizer()
-            recognizer.energy_threshold = 300
-            recognizer.dynamic_energy_threshold = True
-            
-            with sr.AudioFile(temp_file.name) as source:
-                # Ajustar para ruído ambiente
-                recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                audio_data = recognizer.record(source)
-            
-            # Tentar Google Speech Recognition primeiro
+        recognizer = sr.Recognizer()
+        recognizer.energy_threshold = 300
+        recognizer.dynamic_energy_threshold = True
+        
+        # PCM do chunk direto para o recognizer (sem WAV temporário)
+        audio_data = audio_decode.to_audio_data(chunk)
+        
+        # Tentar Google Speech Recognition primeiro
+        try:
+            text = recognizer.recognize_google(audio_data, language='pt-BR')
+            logging.info(f"Chunk {index}: Google Speech - {len(text)} chars")
+        except sr.UnknownValueError:
+            # Se Google falhar, tentar com engine local
             try:
-                text = recognizer.recognize_google(audio_data, language='pt-BR')
-                logging.info(f"Chunk {index}: Google Speech - {len(text)} chars")
-            except sr.UnknownValueError:
-                # Se Google falhar, tentar com engine local
-                try:
-                    text = recognizer.recognize_sphinx(audio_data, language='pt-BR')
-                    logging.info(f"Chunk {index}: Sphinx - {len(text)} chars")
-                except:
-                    text = ""
-            except sr.RequestError:
-                # Fallback para análise básica se APIs falharem
-                text = f"[Segmento de áudio {index + 1}]"
-                
-            os.unlink(temp_file.name)
-            return (index, text if text else "")
-            
+                text = recognizer.recognize_sphinx(audio_data, language='pt-BR')
+                logging.info(f"Chunk {index}: Sphinx - {len(text)} chars")
+            except:
+                text = ""
+        except sr.RequestError:
+            # Fallback para análise básica se APIs falharem
+            return (index, f"[Segmento de áudio {index + 1}]", True)
+        
+        return (index, text if text else "", False)
+        
     except Exception as e:
         logging.error(f"Erro no chunk {index}: {e}")
-        return (index, "")
+        return (index, "", False)
 
-def analyze_audio_properties(file_path: str) -> dict:
-    """Analisa propriedades do áudio usando librosa"""
+def analyze_audio_properties(samples, sample_rate: int) -> dict:
+    """Analisa propriedades do áudio já decodificado usando librosa"""
+    import librosa
+    import numpy as np
+    
     try:
-        audio, sample_rate = librosa.load(file_path, sr=None)
+        audio = audio_decode.to_float32(samples)
         duration = len(audio) / sample_rate
         
         # Detectar silêncio
@@ -94,19 +75,21 @@ def analyze_audio_properties(file_path: str) -> dict:
         logging.error(f"Erro na análise de áudio: {e}")
         return {'duration': 60.0, 'sample_rate': 16000, 'silence_ratio': 0.1, 'avg_energy': 0.1}
 
+@call_metrics.with_call_metrics
+@transcript_cache.cached_transcription('google_speech_chunks')
 def transcribe_audio_real(file_path: str) -> dict:
     """Transcrição principal usando chunks paralelos"""
     try:
         logging.info(f"Iniciando transcrição real de {file_path}")
         
-        # Analisar propriedades do áudio
-        audio_props = analyze_audio_properties(file_path)
+        # Decodificar uma única vez para PCM mono 16kHz em memória
+        samples = audio_decode.decode(file_path)
         
-        # Converter para WAV otimizado
-        wav_path = convert_to_wav(file_path)
+        # Analisar propriedades do áudio
+        audio_props = analyze_audio_properties(samples, audio_decode.SAMPLE_RATE)
         
-        # Carregar áudio convertido
-        audio = AudioSegment.from_file(wav_path)
+        # AudioSegment sobre as mesmas amostras, para fatiar os chunks
+        audio = audio_decode.to_audio_segment(samples)
         
         # Determinar tamanho do chunk baseado na duração
         duration = audio_props['duration']
@@ -128,14 +111,18 @@ def transcribe_audio_real(file_path: str) -> dict:
         
         # Processar chunks em paralelo
         transcripts = {}
-        max_workers = min(4, len(chunks))
+        failed_chunks = set()
+        # Chamadas HTTP à Speech API: limite de I/O, fora do orçamento de núcleos do cpu_budget
+        max_workers = max(1, min(4, len(chunks)))
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_chunk = {executor.submit(transcribe_chunk, chunk_data): chunk_data for chunk_data in chunks}
             
             for future in as_completed(future_to_chunk, timeout=120):
                 try:
-                    index, text = future.result(timeout=30)
+                    index, text, failed = future.result(timeout=30)
+                    if failed:
+                        failed_chunks.add(index)
                     if text.strip():
                         transcripts[index] = text
                         logging.info(f"Chunk {index + 1}/{len(chunks)} concluído")
@@ -166,17 +153,23 @@ def transcribe_audio_real(file_path: str) -> dict:
                     'criticalWords': []
                 })
         
-        # Limpar arquivo temporário
-        os.unlink(wav_path)
-        
         result = {
             'text': final_transcript or "Transcrição processada mas sem texto reconhecido",
             'segments': segments,
             'duration': audio_props['duration'],
-            'success': len(transcripts) > 0,
+            'success': len(transcripts) > len(failed_chunks),
             'audio_properties': audio_props
         }
         
+        # Placeholders de API indisponível não são transcrição: falha se só houver eles,
+        # e resultado parcial fica fora do cache de transcrições
+        if failed_chunks:
+            result['failed_chunks'] = len(failed_chunks)
+            if result['success']:
+                result['incomplete'] = True
+            else:
+                result['error'] = f"Speech API indisponível em {len(failed_chunks)} de {len(chunks)} chunks"
+        
         logging.info(f"Transcrição concluída: {len(final_transcript)} caracteres, {len(segments)} segmentos")
         return result
         
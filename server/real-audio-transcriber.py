@@ -7,15 +7,32 @@ Processa o conteúdo autêntico do arquivo sem gerar diálogos falsos
 import os
 import sys
 import json
-import tempfile
-import speech_recognition as sr
-from pydub import AudioSegment
-from pydub.silence import split_on_silence
+import audio_decode
+import audio_energy
+import audio_silence
+import call_metrics
+import stream_output
+import transcript_cache
 
-def transcribe_real_audio(file_path: str) -> dict:
+def make_segment(i: int, result: dict) -> dict:
+    """Segmento de saída a partir do i-ésimo chunk transcrito"""
+    return {
+        'id': f'segment_{i}',
+        'speaker': 'unknown',  # Não identificar falantes como solicitado
+        'text': result['text'],
+        'startTime': result['start_time'],
+        'endTime': result['end_time'],
+        'confidence': 0.9,  # Confidence alto para transcrições reais
+        'criticalWords': []
+    }
+
+@call_metrics.with_call_metrics
+@transcript_cache.cached_transcription('google_speech_real')
+def transcribe_real_audio(file_path: str, stream=None) -> dict:
     """
     Transcrição real do áudio usando Google Speech Recognition
     Sem diálogos inventados - apenas o que está realmente no arquivo
+    Com `stream` (--stream), cada chunk transcrito sai como segmento na hora
     """
     try:
         print(f"Iniciando transcrição real do arquivo: {file_path}", file=sys.stderr)
@@ -23,6 +40,8 @@ def transcribe_real_audio(file_path: str) -> dict:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Arquivo de áudio não encontrado: {file_path}")
         
+        from pydub import AudioSegment
+        
         # Carregar áudio
         audio = AudioSegment.from_file(file_path)
         duration = len(audio) / 1000.0
@@ -42,8 +61,11 @@ def transcribe_real_audio(file_path: str) -> dict:
         
         # Dividir áudio em chunks para processamento
         print("Dividindo áudio em segmentos...", file=sys.stderr)
-        chunks = split_on_silence(
-            audio,
+        # Cada chunk é (início_ms, fim_ms, amostras) com as amostras como view do buffer
+        samples = audio_energy.segment_samples(audio)
+        chunks = audio_silence.split_on_silence(
+            samples,
+            audio.frame_rate,
             min_silence_len=1000,  # 1 segundo de silêncio
             silence_thresh=audio.dBFS - 16,
             keep_silence=500
@@ -52,11 +74,13 @@ def transcribe_real_audio(file_path: str) -> dict:
         if not chunks:
             # Se não conseguiu dividir, usar o áudio inteiro em chunks menores
             chunk_length = 30 * 1000  # 30 segundos por chunk
-            chunks = [audio[i:i + chunk_length] for i in range(0, len(audio), chunk_length)]
+            chunks = audio_silence.split_fixed(samples, audio.frame_rate, chunk_length)
             print(f"Dividido em chunks de 30s: {len(chunks)} chunks", file=sys.stderr)
         else:
             print(f"Dividido por silêncio: {len(chunks)} chunks", file=sys.stderr)
         
+        import speech_recognition as sr
+        
         # Inicializar recognizer
         recognizer = sr.Recognizer()
         recognizer.energy_threshold = 300
@@ -65,36 +89,27 @@ def transcribe_real_audio(file_path: str) -> dict:
         transcription_results = []
         successful_transcriptions = 0
         
-        for i, chunk in enumerate(chunks[:20]):  # Limitar a 20 chunks para performance
+        for i, (start_ms, end_ms, chunk) in enumerate(chunks[:20]):  # Limitar a 20 chunks para performance
             try:
                 print(f"Processando chunk {i+1}/{min(len(chunks), 20)}", file=sys.stderr)
                 
-                # Salvar chunk como WAV temporário
-                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                    chunk.export(temp_file.name, format="wav")
-                    temp_path = temp_file.name
-                
-                # Transcrever chunk
-                with sr.AudioFile(temp_path) as source:
-                    recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                    audio_data = recognizer.record(source)
+                # Transcrever chunk a partir do PCM em memória (sem WAV temporário)
+                audio_data = audio_decode.to_audio_data(chunk, audio.frame_rate)
                 
                 try:
                     # Tentar Google Speech Recognition
                     text = recognizer.recognize_google(audio_data, language='pt-BR')
                     if text.strip():
-                        # Calcular timing do chunk
-                        chunk_start = (i * len(audio)) / len(chunks) / 1000.0
-                        chunk_end = min(((i + 1) * len(audio)) / len(chunks) / 1000.0, duration)
-                        
                         transcription_results.append({
                             'text': text.strip(),
-                            'start_time': chunk_start,
-                            'end_time': chunk_end,
+                            'start_time': start_ms / 1000.0,
+                            'end_time': min(end_ms / 1000.0, duration),
                             'chunk_index': i
                         })
                         successful_transcriptions += 1
                         print(f"Chunk {i+1} transcrito: '{text[:50]}...'", file=sys.stderr)
+                        if stream:
+                            stream.segment(make_segment(len(transcription_results) - 1, transcription_results[-1]))
                     
                 except sr.UnknownValueError:
                     print(f"Chunk {i+1}: não foi possível entender o áudio", file=sys.stderr)
@@ -109,12 +124,12 @@ def transcribe_real_audio(file_path: str) -> dict:
                         'error': f"Google Speech API não disponível: {e}"
                     }
                 
-                # Limpar arquivo temporário
-                os.unlink(temp_path)
-                
             except Exception as chunk_error:
                 print(f"Erro processando chunk {i+1}: {chunk_error}", file=sys.stderr)
                 continue
+            finally:
+                if stream:
+                    stream.progress(chunks_processed=i + 1, chunks_total=min(len(chunks), 20))
         
         # Processar resultados
         if transcription_results:
@@ -124,15 +139,7 @@ def transcribe_real_audio(file_path: str) -> dict:
             # Criar segmentos baseados nos chunks transcritos
             segments = []
             for i, result in enumerate(transcription_results):
-                segments.append({
-                    'id': f'segment_{i}',
-                    'speaker': 'unknown',  # Não identificar falantes como solicitado
-                    'text': result['text'],
-                    'startTime': result['start_time'],
-                    'endTime': result['end_time'],
-                    'confidence': 0.9,  # Confidence alto para transcrições reais
-                    'criticalWords': []
-                })
+                segments.append(make_segment(i, result))
             
             result = {
                 'text': full_text,
@@ -146,7 +153,8 @@ def transcribe_real_audio(file_path: str) -> dict:
             
             print(f"Transcrição real concluída: {successful_transcriptions}/{len(chunks)} chunks transcritos", file=sys.stderr)
             print(f"Texto total: {len(full_text)} caracteres", file=sys.stderr)
-            return result
+            # VAD sobre as amostras já carregadas: as métricas da chamada não decodificam de novo
+            return call_metrics.with_samples(result, samples, audio.frame_rate)
         else:
             return {
                 'text': "Nenhum conteúdo de fala foi detectado ou transcrito no arquivo de áudio.",
@@ -167,17 +175,26 @@ def transcribe_real_audio(file_path: str) -> dict:
         }
 
 def main():
-    if len(sys.argv) != 2:
+    args = sys.argv[1:]
+    stream = stream_output.NdjsonStream() if stream_output.pop_stream_flag(args) else None
+    
+    if len(args) != 1:
         print(json.dumps({'error': 'Caminho do arquivo de áudio é obrigatório'}))
         sys.exit(1)
     
-    file_path = sys.argv[1]
+    file_path = args[0]
     
     try:
-        result = transcribe_real_audio(file_path)
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+        result = transcribe_real_audio(file_path, stream=stream)
+        if stream:
+            stream.summary(result)
+        else:
+            print(json.dumps(result, ensure_ascii=False, indent=2))
     except Exception as e:
-        print(json.dumps({'error': str(e)}, ensure_ascii=False))
+        if stream:
+            stream.error(str(e))
+        else:
+            print(json.dumps({'error': str(e)}, ensure_ascii=False))
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -7,14 +7,17 @@ Baseado exatamente na implementação do QualityCallMonitor
 import os
 import sys
 import json
-import tempfile
-import speech_recognition as sr
-from pydub import AudioSegment
 import logging
+import audio_decode
+import audio_energy
+import call_metrics
+import transcript_cache
 
 # Configurar logging
 logging.basicConfig(level=logging.WARNING)
 
+@call_metrics.with_call_metrics
+@transcript_cache.cached_transcription('google_speech_single')
 def transcribe_audio_real(file_path: str) -> dict:
     """
     Transcrição real usando Google Speech Recognition
@@ -27,6 +30,8 @@ def transcribe_audio_real(file_path: str) -> dict:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
+        from pydub import AudioSegment
+        
         # Carregar e converter áudio
         audio = AudioSegment.from_file(file_path)
         
@@ -35,23 +40,13 @@ def transcribe_audio_real(file_path: str) -> dict:
             audio = audio.set_channels(1)
         audio = audio.set_frame_rate(16000)
         
-        # Salvar como WAV temporário
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-            audio.export(temp_file.name, format="wav")
-            temp_wav_path = temp_file.name
-        
-        print(f"Audio converted to WAV: {temp_wav_path}", file=sys.stderr)
+        import speech_recognition as sr
         
-        # Usar SpeechRecognition para transcrição real
+        # Usar SpeechRecognition para transcrição real, com o PCM em memória (sem WAV temporário)
         recognizer = sr.Recognizer()
         recognizer.energy_threshold = 300
         recognizer.dynamic_energy_threshold = True
-        
-        with sr.AudioFile(temp_wav_path) as source:
-            print("Adjusting for ambient noise...", file=sys.stderr)
-            recognizer.adjust_for_ambient_noise(source, duration=1.0)
-            print("Recording audio data...", file=sys.stderr)
-            audio_data = recognizer.record(source)
+        audio_data = audio_decode.to_audio_data(audio)
         
         print("Starting speech recognition...", file=sys.stderr)
         
@@ -69,9 +64,6 @@ def transcribe_audio_real(file_path: str) -> dict:
             print(f"Google Speech Recognition request error: {e}", file=sys.stderr)
             success = False
         
-        # Limpar arquivo temporário
-        os.unlink(temp_wav_path)
-        
         # Obter duração real do áudio
         duration = len(audio) / 1000.0  # Convert to seconds
         
@@ -140,7 +132,8 @@ def transcribe_audio_real(file_path: str) -> dict:
         }
         
         print(f"Transcription completed: {len(segments)} segments, success: {success}", file=sys.stderr)
-        return result
+        # VAD sobre as amostras já carregadas: as métricas da chamada não decodificam de novo
+        return call_metrics.with_samples(result, audio_energy.segment_samples(audio), audio.frame_rate)
         
     except Exception as e:
         print(f"Transcription error: {e}", file=sys.stderr)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Reanálise de transcrições armazenadas, sem tocar no áudio
+Recalcula palavras críticas, tópicos, sentimento e score a partir do JSON já gerado
+pelos transcritores, com o analisador do próprio script de cada engine. Serve para
+aplicar listas de palavras-chave ou regras de score novas a todas as chamadas.
+
+Uso:
+    python3 reanalyze-transcripts.py <arquivo.json>                  resultado reanalisado no stdout
+    python3 reanalyze-transcripts.py [--in-place] <arquivos|diretórios>...
+    python3 reanalyze-transcripts.py [--in-place] --cache            entradas do transcript_cache
+
+Com vários arquivos (ou --cache), escreve uma linha JSON por transcrição com a nova
+análise; --in-place regrava os arquivos com a análise atualizada.
+"""
+
+import os
+import sys
+import json
+import time
+import importlib.util
+from pathlib import Path
+import transcript_cache
+
+SERVER_DIR = Path(__file__).resolve().parent
+
+IN_PLACE_FLAG = '--in-place'
+CACHE_FLAG = '--cache'
+
+def load_script(name: str):
+    """Importa um script do diretório server/ (nomes com hífen)"""
+    path = SERVER_DIR / name
+    spec = importlib.util.spec_from_file_location(path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+_scripts = {}
+
+def script(name: str):
+    """Cada script é carregado uma única vez por execução"""
+    if name not in _scripts:
+        _scripts[name] = load_script(name)
+    return _scripts[name]
+
+def rescore_segments(segments: list, detect_critical_words) -> list:
+    """Segmentos com criticalWords recalculadas pela lista atual do script"""
+    return [dict(segment, criticalWords=detect_critical_words(segment.get('text', ''))) for segment in segments]
+
+def reanalyze_whisper_offline(result: dict) -> dict:
+    module = script('whisper-offline-real.py')
+    segments = rescore_segments(result.get('segments', []), module.detect_critical_words)
+    return dict(result, segments=segments, analysis=module.analyze_transcription(result.get('text', ''), segments))
+
+def reanalyze_google_speech_api(result: dict) -> dict:
+    module = script('google-speech-api.py')
+    segments = rescore_segments(result.get('segments', []), module.detect_critical_words)
+    return dict(result, segments=segments, analysis=module.analyze_transcription(result.get('text', ''), segments))
+
+def reanalyze_assemblyai(result: dict) -> dict:
+    module = script('assemblyai-transcription.py')
+    segments = rescore_segments(result.get('segments', []), module.detect_critical_words)
+    # O sentimento vem da API da AssemblyAI, não das listas de palavras: é mantido
+    sentiment_score = result.get('analysis', {}).get('sentiment', 0.5)
+    analysis = module.analyze_transcription_content(result.get('text', ''), segments, sentiment_score)
+    return dict(result, segments=segments, analysis=analysis)
+
+def reanalyze_local_whisper(result: dict) -> dict:
+    module = script('local-whisper-transcriber.py')
+    # Saída final usa "transcription"; a entrada do cache guarda o retorno da transcrição ("text")
+    text = result.get('transcription', result.get('text', ''))
+    return dict(result, analysis=module.analyze_transcription(text, result.get('segments', [])))
+
+ANALYZERS = {
+    'whisper_offline_real': reanalyze_whisper_offline,
+    'google_speech_api': reanalyze_google_speech_api,
+    'assemblyai_real': reanalyze_assemblyai,
+    'whisper_local_analysis': reanalyze_local_whisper
+}
+
+# Engines do transcript_cache cujas entradas não trazem marcador próprio no resultado
+CACHE_ENGINES = {
+    'local_whisper': 'whisper_local_analysis'
+}
+
+def detect_engine(result: dict, cache_engine: str = None):
+    """
+    Analisador pelo transcription_engine, pelo method do local-whisper ou pelo engine da
+    entrada do cache; resultados sem marcador conhecido não recebem análise de outro script
+    """
+    engine = result.get('transcription_engine')
+    if engine in ANALYZERS:
+        return engine
+    if result.get('method') == 'whisper_local':
+        return 'whisper_local_analysis'
+    return CACHE_ENGINES.get(cache_engine)
+
+def keep_silence_analysis(previous: dict, updated: dict) -> dict:
+    """silenceAnalysis vem do áudio (call_metrics), não do texto: a reanálise mantém a gravada"""
+    silence = (previous.get('analysis') or {}).get('silenceAnalysis')
+    if not silence or not isinstance(updated.get('analysis'), dict):
+        return updated
+    return dict(updated, analysis=dict(updated['analysis'], silenceAnalysis=silence))
+
+def reanalyze(result: dict, cache_engine: str = None) -> tuple:
+    """(engine, resultado reanalisado); resultados sem analisador voltam inalterados com engine None"""
+    if not isinstance(result, dict) or 'error' in result or result.get('success') is False:
+        return None, result
+    engine = detect_engine(result, cache_engine)
+    if engine is None:
+        return None, result
+    return engine, keep_silence_analysis(result, ANALYZERS[engine](result))
+
+def collect_files(paths: list) -> list:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(str(p) for p in Path(path).rglob('*.json')))
+        else:
+            files.append(path)
+    return files
+
+def read_json(path: str):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def write_json(path: str, data, keep_mtime: bool = False):
+    stat = os.stat(path) if keep_mtime else None
+    transcript_cache.atomic_write(path, json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
+    if stat is not None:
+        # Entradas do cache: regravar não pode contar como uso no LRU
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+def reanalyze_file(path: str, in_place: bool, from_cache: bool) -> list:
+    """Reanalisa um arquivo com um resultado, uma lista de resultados ou uma entrada do cache"""
+    data = read_json(path)
+
+    if from_cache:
+        engine, result = reanalyze(data.get('result'), data.get('engine'))
+        updated = dict(data, result=result)
+        outcomes = [(engine, result)]
+    elif isinstance(data, list):
+        outcomes = [reanalyze(item) for item in data]
+        updated = [result for _, result in outcomes]
+    else:
+        outcomes = [reanalyze(data)]
+        updated = outcomes[0][1]
+
+    if in_place and any(engine for engine, _ in outcomes):
+        write_json(path, updated, keep_mtime=from_cache)
+    return outcomes
+
+def main():
+    args = sys.argv[1:]
+    in_place = IN_PLACE_FLAG in args
+    from_cache = CACHE_FLAG in args
+    paths = [arg for arg in args if arg not in (IN_PLACE_FLAG, CACHE_FLAG)]
+
+    if from_cache == bool(paths):
+        print("Usage: python3 reanalyze-transcripts.py [--in-place] <file.json|directory>... | --cache", file=sys.stderr)
+        sys.exit(1)
+
+    files = transcript_cache.entry_paths() if from_cache else collect_files(paths)
+
+    # Um único arquivo com um único resultado: mesmo formato de saída dos transcritores
+    if len(files) == 1 and not from_cache and not in_place:
+        try:
+            data = read_json(files[0])
+        except (OSError, ValueError) as e:
+            print(json.dumps({"success": False, "error": f"Cannot read {files[0]}: {e}"}))
+            sys.exit(1)
+        if isinstance(data, dict):
+            print(json.dumps(reanalyze(data)[1], ensure_ascii=False, indent=2))
+            return
+
+    start_time = time.perf_counter()
+    counts = {'files': len(files), 'reanalyzed': 0, 'skipped': 0, 'errors': 0}
+
+    for path in files:
+        try:
+            outcomes = reanalyze_file(path, in_place, from_cache)
+        except (OSError, ValueError) as e:
+            counts['errors'] += 1
+            print(json.dumps({'file': path, 'error': str(e)}, ensure_ascii=False))
+            continue
+
+        for index, (engine, result) in enumerate(outcomes):
+            if engine is None:
+                counts['skipped'] += 1
+                continue
+            counts['reanalyzed'] += 1
+            record = {'file': path, 'engine': engine, 'analysis': result['analysis']}
+            if len(outcomes) > 1:
+                record['index'] = index
+            print(json.dumps(record, ensure_ascii=False))
+
+    counts['seconds'] = round(time.perf_counter() - start_time, 3)
+    print(f"Reanalysis: {json.dumps(counts)}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
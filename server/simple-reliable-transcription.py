@@ -8,9 +8,11 @@ import sys
 import json
 import os
 import subprocess
-import tempfile
-import wave
 from pathlib import Path
+import audio_decode
+import audio_vad
+import call_metrics
+import transcript_cache
 
 def get_audio_info(file_path):
     """Get basic audio file information using ffprobe"""
@@ -32,60 +34,34 @@ def get_audio_info(file_path):
     estimated_duration = max(30, min(300, file_size / 20000))  # rough estimate
     return {'duration': estimated_duration, 'success': False}
 
-def convert_to_wav(input_path):
-    """Convert audio file to WAV format for analysis"""
+def decode_audio(input_path):
+    """Decode audio to 16kHz mono PCM in memory for analysis (None on failure)"""
     try:
-        temp_dir = tempfile.mkdtemp()
-        wav_path = os.path.join(temp_dir, 'converted.wav')
-        
-        cmd = [
-            'ffmpeg', '-i', input_path, '-acodec', 'pcm_s16le',
-            '-ar', '16000', '-ac', '1', '-y', wav_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, timeout=60)
-        
-        if result.returncode == 0 and os.path.exists(wav_path):
-            return wav_path
-        else:
-            print(f"FFmpeg conversion failed: {result.stderr.decode()}", file=sys.stderr)
-            return None
-            
+        return audio_decode.decode(input_path, timeout=60)
     except Exception as e:
-        print(f"Audio conversion error: {e}", file=sys.stderr)
+        print(f"Audio decode error: {e}", file=sys.stderr)
         return None
 
-def analyze_wav_content(wav_path):
-    """Analyze WAV file to detect voice activity patterns"""
+def analyze_audio_content(samples, sample_rate):
+    """Analyze decoded PCM to detect voice activity patterns"""
     try:
-        with wave.open(wav_path, 'rb') as wav_file:
-            frames = wav_file.getnframes()
-            sample_rate = wav_file.getframerate()
-            duration = frames / sample_rate
-            
-            # Read audio data
-            audio_data = wav_file.readframes(frames)
-            
-            # Simple voice activity detection
-            # Check for variance in amplitude (voice has more variance than silence)
-            samples = len(audio_data)
-            if samples > 1000:
-                # Sample every 100th byte to check variance
-                sample_points = [audio_data[i] for i in range(0, min(samples, 10000), 100)]
-                variance = sum(abs(sample_points[i] - sample_points[i-1]) for i in range(1, len(sample_points)))
-                avg_variance = variance / len(sample_points) if sample_points else 0
-                
-                has_voice = avg_variance > 20  # Threshold for voice detection
-                voice_segments = max(1, int(duration / 10))  # Estimate segments
-                
-                return {
-                    'duration': duration,
-                    'has_voice': has_voice,
-                    'estimated_segments': voice_segments,
-                    'quality': 0.8 if has_voice else 0.3
-                }
+        duration = len(samples) / sample_rate
+        
+        # Frame-level VAD (energy + zero crossings, noise floor, hysteresis) over the whole call
+        regions = audio_vad.speech_regions(samples, sample_rate)
+        speech_time = sum(end - start for start, end in regions)
+        has_voice = len(regions) > 0
+        
+        return {
+            'duration': duration,
+            'has_voice': has_voice,
+            'estimated_segments': max(1, len(regions)),
+            'speech_time': speech_time,
+            'quality': 0.8 if has_voice else 0.3,
+            'speech_regions': regions
+        }
     except Exception as e:
-        print(f"WAV analysis error: {e}", file=sys.stderr)
+        print(f"Audio analysis error: {e}", file=sys.stderr)
     
     return {
         'duration': 60,
@@ -178,33 +154,24 @@ def create_segments_from_transcription(text, duration):
     
     return segments
 
+@call_metrics.with_call_metrics
+@transcript_cache.cached_transcription('simple_reliable_local')
 def transcribe_audio_file(file_path):
     """Main transcription function"""
     try:
         print(f"Processing audio file: {file_path}", file=sys.stderr)
         
-        # Get audio information
-        audio_info_result = get_audio_info(file_path)
-        duration = audio_info_result['duration']
-        
-        print(f"Audio duration: {duration}s", file=sys.stderr)
-        
-        # Convert to WAV for analysis
-        wav_path = convert_to_wav(file_path)
+        # Decode once to PCM in memory for analysis (no temporary WAV)
+        samples = decode_audio(file_path)
         
-        if wav_path:
-            # Analyze WAV content
-            audio_analysis = analyze_wav_content(wav_path)
-            duration = audio_analysis['duration']  # Use actual duration from WAV
-            
-            # Clean up temp file
-            try:
-                os.unlink(wav_path)
-                os.rmdir(os.path.dirname(wav_path))
-            except:
-                pass
+        if samples is not None:
+            # Analyze decoded content; duration comes from the decoded samples
+            audio_analysis = analyze_audio_content(samples, audio_decode.SAMPLE_RATE)
+            duration = audio_analysis['duration']
+            speech_regions = audio_analysis.pop('speech_regions', None)
         else:
-            # Fallback analysis
+            # Fallback analysis from container metadata and file size
+            duration = get_audio_info(file_path)['duration']
             file_size = os.path.getsize(file_path)
             audio_analysis = {
                 'duration': duration,
@@ -212,6 +179,9 @@ def transcribe_audio_file(file_path):
                 'estimated_segments': max(1, int(duration / 20)),
                 'quality': 0.7
             }
+            speech_regions = None
+        
+        print(f"Audio duration: {duration}s", file=sys.stderr)
         
         # Generate realistic transcription
         transcription_text = generate_realistic_transcription(audio_analysis, duration)
@@ -229,7 +199,7 @@ def transcribe_audio_file(file_path):
         }
         
         print(f"Transcription completed: {len(transcription_text)} chars, {len(segments)} segments", file=sys.stderr)
-        return result
+        return call_metrics.with_regions(result, speech_regions, duration)
         
     except Exception as e:
         print(f"Transcription error: {e}", file=sys.stderr)
@@ -7,11 +7,15 @@ Processa arquivos de áudio reais sem dependências complexas
 import os
 import sys
 import json
-import struct
-from pydub import AudioSegment
+import audio_energy
+import audio_vad
+import call_metrics
+import transcript_cache
 
 def get_audio_info(file_path: str) -> dict:
     """Extrai informações básicas do arquivo de áudio"""
+    from pydub import AudioSegment
+    
     try:
         audio = AudioSegment.from_file(file_path)
         
@@ -30,36 +34,21 @@ def get_audio_info(file_path: str) -> dict:
         if frame_rate != 16000:
             audio_mono = audio_mono.set_frame_rate(16000)
         
-        # Obter dados de amplitude
-        raw_data = audio_mono.raw_data
-        
-        # Analisar amplitude para detectar atividade vocal
-        sample_width = audio_mono.sample_width
-        if sample_width == 2:  # 16-bit
-            samples = struct.unpack(f"<{len(raw_data)//2}h", raw_data)
-        else:
-            # Fallback para outros formatos
-            samples = [int.from_bytes(raw_data[i:i+sample_width], 'little', signed=True) 
-                      for i in range(0, len(raw_data), sample_width)]
+        # Analisar amplitude para detectar atividade vocal (8, 16 ou 32 bits)
+        samples = audio_energy.segment_samples(audio_mono)
         
-        # Calcular energia em janelas de 0.5 segundos
+        # Calcular energia (RMS) em janelas de 0.5 segundos
         window_size = 8000  # 0.5 segundos a 16kHz
-        energy_windows = []
-        
-        for i in range(0, len(samples), window_size):
-            window = samples[i:i + window_size]
-            if window:
-                # RMS da janela
-                rms = (sum(s * s for s in window) / len(window)) ** 0.5
-                energy_windows.append(rms)
+        energy_windows = audio_energy.frame_energy(samples, window_size)['rms'].tolist()
         
-        # Detectar segmentos com atividade vocal
+        # Detectar segmentos com atividade vocal (VAD: piso de ruído + histerese)
+        regions = audio_vad.speech_regions(samples, 16000) if energy_windows else []
         if energy_windows:
-            threshold = max(energy_windows) * 0.15  # 15% do pico
+            active = audio_vad.window_activity(regions, 0.5, len(energy_windows))
             speech_segments = []
             
             for i, energy in enumerate(energy_windows):
-                if energy > threshold:
+                if active[i]:
                     start_time = i * 0.5
                     end_time = min((i + 1) * 0.5, duration)
                     speech_segments.append({
@@ -76,7 +65,8 @@ def get_audio_info(file_path: str) -> dict:
             'frame_rate': frame_rate,
             'speech_segments': speech_segments,
             'total_speech_time': sum(s['end'] - s['start'] for s in speech_segments),
-            'has_speech': len(speech_segments) > 0
+            'has_speech': len(speech_segments) > 0,
+            'speech_regions': regions
         }
         
     except Exception as e:
@@ -174,6 +164,8 @@ def create_segments_from_audio(audio_info: dict) -> list:
     
     return segments
 
+@call_metrics.with_call_metrics
+@transcript_cache.cached_transcription('simple')
 def transcribe_audio_real(file_path: str) -> dict:
     """Transcrição baseada em análise real do arquivo"""
     try:
@@ -210,7 +202,7 @@ def transcribe_audio_real(file_path: str) -> dict:
         }
         
         print(f"Transcription completed: {len(segments)} segments generated", file=sys.stderr)
-        return result
+        return call_metrics.with_regions(result, audio_info.get('speech_regions'), audio_info['duration'])
         
     except Exception as e:
         print(f"Transcription failed: {e}", file=sys.stderr)
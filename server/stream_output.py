@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Saída em streaming (NDJSON) dos transcritores
+Com --stream, o script escreve um objeto JSON por linha no stdout à medida que avança:
+
+    {"type": "progress", ...}                  andamento do job
+    {"type": "segment", "segment": {...}}      cada segmento assim que fica pronto
+    {"type": "summary", "result": {...}}       resultado final, sem a lista de segmentos
+    {"type": "error", "error": "..."}          falha; o que já saiu continua valendo
+
+Quem consome pode mostrar a transcrição parcial e aproveitar os segmentos já
+recebidos mesmo que o processo seja encerrado por timeout.
+"""
+
+import sys
+import json
+import threading
+
+STREAM_FLAG = '--stream'
+
+def pop_stream_flag(argv: list) -> bool:
+    """Remove --stream de `argv` (in place) e informa se estava presente"""
+    if STREAM_FLAG in argv:
+        argv.remove(STREAM_FLAG)
+        return True
+    return False
+
+class NdjsonStream:
+    """Escreve os registros do job, um JSON por linha, com flush imediato"""
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+        self.segments = 0
+        self._lock = threading.Lock()
+
+    def _write(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.out.write(line + '\n')
+            self.out.flush()
+
+    def progress(self, **fields):
+        self._write(dict({'type': 'progress'}, **fields))
+
+    def audio_progress(self, processed_seconds: float, total_seconds: float, **fields):
+        """Andamento em segundos de áudio processados"""
+        fraction = min(1.0, processed_seconds / total_seconds) if total_seconds else None
+        self.progress(
+            processed_seconds=round(processed_seconds, 2),
+            total_seconds=round(total_seconds, 2) if total_seconds else None,
+            fraction=round(fraction, 4) if fraction is not None else None,
+            **fields
+        )
+
+    def segment(self, segment: dict):
+        self.segments += 1
+        self._write({'type': 'segment', 'segment': segment})
+
+    def summary(self, result: dict):
+        """Registro final: o resultado completo menos os segmentos, que já foram emitidos"""
+        summary = {key: value for key, value in result.items() if key != 'segments'}
+        summary['segments_count'] = len(result.get('segments', [])) if 'segments' in result else self.segments
+        self._write({'type': 'summary', 'result': summary})
+
+    def error(self, message: str):
+        self._write({'type': 'error', 'error': message})
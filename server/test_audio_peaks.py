@@ -0,0 +1,79 @@
+"""Testes da pirâmide de picos/RMS (audio_peaks) contra reduções diretas em NumPy"""
+
+import numpy as np
+import pytest
+import audio_cache
+import audio_peaks
+
+SAMPLE_RATE = 16000
+
+def call_like(seconds=7.3):
+    """Fala (tom com ruído) e pausas, int16, com duração que não fecha o último segundo"""
+    rng = np.random.default_rng(5)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    signal = 0.6 * np.sin(2 * np.pi * 180 * t) * ((t % 2) < 1.2) + 0.01 * rng.standard_normal(len(t))
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+
+def brute_force(samples, level_ms):
+    """Pico e RMS de cada janela de `level_ms`, janela a janela, na escala int16 da pirâmide"""
+    window = SAMPLE_RATE * level_ms // 1000
+    values = samples.astype(np.float64)
+    peaks, rms = [], []
+    for start in range(0, len(values), window):
+        frame = values[start:start + window]
+        peaks.append(np.abs(frame).max())
+        rms.append(np.sqrt(np.mean(frame * frame)))
+    # Fundo de escala int16 (32768) = escala da pirâmide; 32768 satura em 32767
+    return np.minimum(np.round(peaks), 32767), np.minimum(np.round(rms), 32767)
+
+@pytest.mark.parametrize('level_ms', audio_peaks.LEVELS_MS)
+def test_levels_match_brute_force(level_ms):
+    samples = call_like()
+    level = audio_peaks.build([samples], SAMPLE_RATE)['levels'][level_ms]
+    peaks, rms = brute_force(samples, level_ms)
+    assert level['peak'].tolist() == peaks.tolist()
+    # O RMS dos níveis grossos vem da soma dos quadrados das janelas de 10ms (arredondamento)
+    assert np.abs(level['rms'].astype(np.int64) - rms).max() <= 1
+
+def test_blocks_build_the_same_pyramid():
+    samples = call_like()
+    whole = audio_peaks.build([samples], SAMPLE_RATE)
+    blocks = audio_peaks.build((samples[i:i + 7777] for i in range(0, len(samples), 7777)), SAMPLE_RATE)
+    assert whole['samples'] == blocks['samples'] == len(samples)
+    for level_ms in audio_peaks.LEVELS_MS:
+        assert whole['levels'][level_ms]['peak'].tolist() == blocks['levels'][level_ms]['peak'].tolist()
+        assert whole['levels'][level_ms]['rms'].tolist() == blocks['levels'][level_ms]['rms'].tolist()
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    return tmp_path
+
+def recording(directory, name, samples):
+    path = directory / name
+    path.write_bytes(samples.tobytes())
+    return str(path)
+
+def test_store_and_load_by_content_not_path(cache_dir):
+    samples = call_like()
+    first = recording(cache_dir, 'a.raw', samples)
+    pyramid = audio_peaks.build([samples], SAMPLE_RATE)
+    audio_peaks.store(first, pyramid)
+
+    assert not (cache_dir / 'a.raw.peaks.npz').exists()
+    copy = audio_peaks.load(recording(cache_dir, 'b.raw', samples))
+    assert copy['samples'] == len(samples)
+    assert copy['levels'][100]['rms'].tolist() == pyramid['levels'][100]['rms'].tolist()
+
+def test_pcm_eviction_keeps_pyramids(cache_dir):
+    samples = call_like()
+    path = recording(cache_dir, 'a.raw', samples)
+    audio_peaks.store(path, audio_peaks.build([samples], SAMPLE_RATE))
+    audio_cache.store(path, samples, SAMPLE_RATE, 'int16')
+
+    audio_cache.clear()
+    assert audio_cache.load(path, SAMPLE_RATE, 'int16') is None
+    assert audio_peaks.is_fresh(path)
+
+    audio_peaks.evict(max_bytes=0)
+    assert not audio_peaks.is_fresh(path)
@@ -0,0 +1,54 @@
+"""Testes da divisão por silêncio vetorizada (audio_silence) contra o pydub.silence"""
+
+import numpy as np
+import pytest
+import audio_silence
+
+pydub = pytest.importorskip('pydub')
+from pydub import silence as pydub_silence
+
+def call_like(seconds=12, sample_rate=16000, width=2):
+    """Fala (tom com ruído) intercalada com pausas de durações variadas"""
+    rng = np.random.default_rng(11)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    signal = 0.001 * rng.standard_normal(len(t))
+    for start, end in ((0.4, 2.1), (2.5, 4.0), (5.3, 5.45), (6.2, 9.7), (10.9, 11.6)):
+        speech = (t >= start) & (t < end)
+        signal[speech] += 0.5 * np.sin(2 * np.pi * 180 * t[speech]) + 0.05 * rng.standard_normal(np.count_nonzero(speech))
+    dtype = {1: np.int8, 2: np.int16, 4: np.int32}[width]
+    return (np.clip(signal, -1, 1) * (np.iinfo(dtype).max - 1)).astype(dtype)
+
+def segment(samples, sample_rate=16000):
+    return pydub.AudioSegment(data=samples.tobytes(), sample_width=samples.dtype.itemsize,
+                              frame_rate=sample_rate, channels=1)
+
+@pytest.mark.parametrize('width', [1, 2, 4])
+@pytest.mark.parametrize('min_silence_len, seek_step', [(300, 1), (500, 10), (1000, 7)])
+def test_detect_silence_matches_pydub(width, min_silence_len, seek_step):
+    samples = call_like(width=width)
+    audio = segment(samples)
+    thresh = audio.dBFS - 14
+    assert audio_silence.detect_silence(samples, 16000, min_silence_len, thresh, seek_step) == \
+        pydub_silence.detect_silence(audio, min_silence_len, thresh, seek_step)
+
+def test_dbfs_matches_pydub():
+    samples = call_like()
+    assert audio_silence.dbfs(samples) == pytest.approx(segment(samples).dBFS)
+
+@pytest.mark.parametrize('keep_silence', [0, 100, 250, 700, True])
+def test_split_on_silence_matches_pydub(keep_silence):
+    samples = call_like()
+    audio = segment(samples)
+    thresh = audio.dBFS - 14
+    chunks = audio_silence.split_on_silence(samples, 16000, 500, thresh, keep_silence)
+    expected = pydub_silence.split_on_silence(audio, 500, thresh, keep_silence)
+
+    assert len(chunks) == len(expected) > 1
+    for (start_ms, end_ms, view), chunk in zip(chunks, expected):
+        assert end_ms - start_ms == len(chunk)
+        assert view.tobytes() == chunk.raw_data
+
+def test_split_on_silence_views_share_the_buffer():
+    samples = call_like()
+    for _, _, view in audio_silence.split_on_silence(samples, 16000, 500, -40, 100):
+        assert np.shares_memory(view, samples)
@@ -0,0 +1,54 @@
+"""Testes do VAD por quadro (audio_vad): histerese, critério de início e versão incremental"""
+
+import numpy as np
+import pytest
+import audio_vad
+
+def energy_profile(*runs):
+    """Energia por quadro (dBFS) a partir de pares (quadros, nível)"""
+    return np.concatenate([np.full(frames, level, dtype=np.float64) for frames, level in runs])
+
+def regions(energy, **options):
+    return audio_vad.regions_from_energy(energy, len(energy) * audio_vad.FRAME_MS / 1000, **options)
+
+# Piso -60 e fala a -20: limiar de início -48, de continuação -54
+DIP = [(100, -60), (50, -20), (30, -51), (50, -20), (170, -60)]
+
+def test_dip_above_sustain_level_does_not_split_region():
+    assert regions(energy_profile(*DIP)) == [pytest.approx((2.8, 7.1))]
+
+def test_without_hysteresis_the_same_dip_splits_region():
+    assert regions(energy_profile(*DIP), hysteresis_db=0) == [
+        pytest.approx((2.8, 4.7)), pytest.approx((5.2, 7.1))
+    ]
+
+def test_run_that_never_reaches_onset_level_is_dropped():
+    energy = energy_profile((100, -60), (50, -20), (100, -60), (30, -51), (120, -60))
+    assert regions(energy) == [pytest.approx((2.8, 4.7))]
+
+def test_broadband_noise_does_not_start_region():
+    energy = energy_profile((100, -60), (50, -20), (250, -60))
+    zcr = np.zeros(len(energy))
+    assert audio_vad.regions_from_features(energy, zcr, 12.0) == [pytest.approx((2.8, 4.7))]
+    zcr[100:150] = 0.5
+    assert audio_vad.regions_from_features(energy, zcr, 12.0) == []
+
+def speech_like(seconds=20, sample_rate=16000):
+    """Tom de 200Hz em rajadas sobre chiado baixo, int16"""
+    rng = np.random.default_rng(3)
+    t = np.arange(seconds * sample_rate) / sample_rate
+    bursts = ((t % 4) > 1.3) & ((t % 4) < 3.1)
+    signal = 0.002 * rng.standard_normal(len(t)) + 0.4 * np.sin(2 * np.pi * 200 * t) * bursts
+    return (signal * 32767).astype(np.int16)
+
+def test_stream_regions_equal_full_array_regions():
+    samples = speech_like()
+    expected = audio_vad.speech_regions(samples, 16000)
+    assert len(expected) == 5
+
+    frame_length = 16000 * audio_vad.FRAME_MS // 1000
+    block_length = frame_length * 37
+    blocks = (samples[i:i + block_length] for i in range(0, len(samples), block_length))
+    streamed, duration = audio_vad.stream_speech_regions(blocks, 16000)
+    assert streamed == expected
+    assert duration == len(samples) / 16000
@@ -0,0 +1,73 @@
+"""Testes das métricas de silêncio da chamada (call_metrics): RLE, silêncios, dead air e decorador"""
+
+import numpy as np
+import pytest
+import call_metrics
+
+def test_run_lengths():
+    mask = np.array([False, False, True, True, True, False, True])
+    values, starts, lengths = call_metrics.run_lengths(mask)
+    assert values.tolist() == [False, True, False, True]
+    assert starts.tolist() == [0, 2, 5, 6]
+    assert lengths.tolist() == [2, 3, 1, 1]
+
+def test_run_lengths_of_empty_mask():
+    values, starts, lengths = call_metrics.run_lengths(np.zeros(0, dtype=bool))
+    assert len(values) == len(starts) == len(lengths) == 0
+
+def test_speech_mask_merges_overlapping_regions_and_clips_to_duration():
+    mask = call_metrics.speech_mask([(0.02, 0.05), (0.04, 0.07), (0.09, 0.5)], 0.1)
+    assert mask.tolist() == [False, False, True, True, True, True, True, False, False, True]
+
+def test_silence_periods_and_dead_air():
+    # Fala em 0-2s, 3.5-4s e 10-12s numa chamada de 15s
+    analysis = call_metrics.silence_analysis([(0, 2), (3.5, 4), (10, 12)], 15.0)
+    assert [(p['startTime'], p['endTime']) for p in analysis['silencePeriods']] == [(2.0, 3.5), (4.0, 10.0), (12.0, 15.0)]
+    assert [(e['startTime'], e['endTime']) for e in analysis['deadAirEvents']] == [(4.0, 10.0)]
+    assert analysis['totalSilenceTime'] == pytest.approx(10.5)
+    assert analysis['longestSilence'] == pytest.approx(6.0)
+    assert analysis['deadAirTime'] == pytest.approx(6.0)
+    assert analysis['speechTime'] == pytest.approx(4.5)
+    assert analysis['speechRatio'] == pytest.approx(0.3)
+
+def test_short_pauses_are_not_listed():
+    analysis = call_metrics.silence_analysis([(0, 2), (2.5, 5)], 5.0, min_silence=1.0)
+    assert analysis['silencePeriods'] == []
+    assert analysis['totalSilenceTime'] == 0
+    assert analysis['speechTime'] == pytest.approx(4.5)
+
+def test_speech_rate_counts_overlapping_segments_once():
+    segments = [{'start': 0, 'end': 30, 'text': 'um dois três'}, {'start': 15, 'end': 60, 'text': 'quatro cinco seis'}]
+    assert call_metrics.speech_rate(segments) == (6, 6.0)
+
+def test_from_segments_uses_segment_bounds():
+    analysis = call_metrics.from_segments([{'startTime': 0, 'endTime': 2, 'text': 'alô'},
+                                           {'startTime': 8, 'endTime': 9, 'text': 'sim'}])
+    assert analysis['source'] == 'segments'
+    assert [(e['startTime'], e['endTime']) for e in analysis['deadAirEvents']] == [(2.0, 8.0)]
+
+def test_decorator_uses_attached_regions_and_strips_them(monkeypatch):
+    monkeypatch.setattr(call_metrics, 'ENABLED', True)
+    monkeypatch.setattr(call_metrics, 'from_file', lambda *args, **kwargs: pytest.fail('decoded the file again'))
+
+    @call_metrics.with_call_metrics
+    def transcribe(file_path):
+        result = {'success': True, 'segments': [{'start': 0, 'end': 2, 'text': 'bom dia'}]}
+        return call_metrics.with_regions(result, [(0, 2)], 8.0)
+
+    result = transcribe('call.wav')
+    assert call_metrics.REGIONS_KEY not in result
+    silence = result['analysis']['silenceAnalysis']
+    assert silence['deadAirEvents'] == [{'startTime': 2.0, 'endTime': 8.0, 'duration': 6.0}]
+    assert silence['wordCount'] == 2
+
+def test_failures_get_no_regions_or_metrics(monkeypatch):
+    monkeypatch.setattr(call_metrics, 'ENABLED', True)
+    failure = {'success': False, 'error': 'ffmpeg decode failed'}
+    assert call_metrics.with_regions(failure, [(0, 1)], 2.0) is failure
+
+    @call_metrics.with_call_metrics
+    def transcribe(file_path):
+        return failure
+
+    assert transcribe('call.wav') == failure
@@ -0,0 +1,37 @@
+"""Testes da divisão dos tokens de uma janela em segmentos (whisper_batching.parse_window_segments)"""
+
+import whisper_batching
+
+class Tokenizer:
+    """Tokens de texto são índices de WORDS; a partir de timestamp_begin são timestamps de 20ms"""
+    timestamp_begin = 1000
+    WORDS = [' Bom', ' dia', ' tudo', ' bem']
+
+    def decode(self, tokens):
+        return ''.join(self.WORDS[token] for token in tokens)
+
+def ts(seconds):
+    return Tokenizer.timestamp_begin + round(seconds / whisper_batching.TIME_PRECISION)
+
+def test_segments_between_timestamp_pairs_with_window_offset():
+    tokens = [ts(0.0), 0, 1, ts(1.5), ts(2.0), 2, 3, ts(3.2)]
+    segments = whisper_batching.parse_window_segments(tokens, Tokenizer(), 30.0, 30.0)
+    assert [(s['start'], s['end'], s['text'], s['tokens']) for s in segments] == [
+        (30.0, 31.5, ' Bom dia', [0, 1]),
+        (32.0, 33.2, ' tudo bem', [2, 3])
+    ]
+
+def test_unterminated_segment_runs_to_window_end():
+    segments = whisper_batching.parse_window_segments([ts(1.0), 0, 1], Tokenizer(), 0.0, 12.5)
+    assert [(s['start'], s['end'], s['text']) for s in segments] == [(1.0, 12.5, ' Bom dia')]
+
+def test_tokens_without_timestamps_start_at_window_offset():
+    segments = whisper_batching.parse_window_segments([2, 3], Tokenizer(), 60.0, 30.0)
+    assert [(s['start'], s['end'], s['text']) for s in segments] == [(60.0, 90.0, ' tudo bem')]
+
+def test_end_is_clamped_to_short_last_window():
+    segments = whisper_batching.parse_window_segments([ts(0.0), 0, ts(9.0)], Tokenizer(), 90.0, 4.0)
+    assert [(s['start'], s['end']) for s in segments] == [(90.0, 94.0)]
+
+def test_lone_timestamps_produce_no_segments():
+    assert whisper_batching.parse_window_segments([ts(0.0), ts(1.0)], Tokenizer(), 0.0, 30.0) == []
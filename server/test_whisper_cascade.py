@@ -0,0 +1,25 @@
+"""Testes da porta de confiança da cascata (whisper_cascade.low_confidence_reasons)"""
+
+import whisper_cascade
+
+def segment(avg_logprob=-0.3, compression_ratio=1.5, no_speech_prob=0.1, start=0.0, end=2.0):
+    return {'start': start, 'end': end, 'avg_logprob': avg_logprob,
+            'compression_ratio': compression_ratio, 'no_speech_prob': no_speech_prob}
+
+def test_confident_segment_is_kept():
+    assert whisper_cascade.low_confidence_reasons(segment()) == []
+
+def test_high_no_speech_prob_alone_is_not_redecoded():
+    assert whisper_cascade.low_confidence_reasons(segment(no_speech_prob=0.9)) == []
+
+def test_high_no_speech_prob_with_low_logprob_is_redecoded():
+    reasons = whisper_cascade.low_confidence_reasons(segment(avg_logprob=-1.4, no_speech_prob=0.9))
+    assert reasons == ['avg_logprob', 'no_speech_prob']
+
+def test_repetitive_text_is_redecoded():
+    assert whisper_cascade.low_confidence_reasons(segment(compression_ratio=3.1)) == ['compression_ratio']
+
+def test_flagged_regions_only_cover_low_confidence_segments():
+    segments = [segment(start=0.0, end=2.0), segment(start=2.0, end=4.0, no_speech_prob=0.9),
+                segment(start=4.0, end=6.0, avg_logprob=-1.5), segment(start=6.0, end=8.0)]
+    assert whisper_cascade.flagged_regions(segments, 8.0) == [(4.0, 6.0)]
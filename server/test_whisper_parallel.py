@@ -0,0 +1,77 @@
+"""Testes dos cortes (split_at_silence / iter_chunks) e da junção dos trechos (ChunkMerger)"""
+
+import whisper_parallel
+
+def segment(start, end, text, words=None):
+    result = {'start': start, 'end': end, 'text': text}
+    if words is not None:
+        result['words'] = [{'start': s, 'end': e, 'word': w} for s, e, w in words]
+    return result
+
+def texts(segments):
+    return [s['text'] for s in segments]
+
+def test_offsets_become_absolute_and_ids_sequential():
+    segments = whisper_parallel.merge_chunks(
+        [{'segments': [segment(0.0, 4.0, ' Bom dia.')]}, {'segments': [segment(1.5, 3.0, ' Tudo bem?')]}],
+        [0.0, 9.0]
+    )
+    assert [(s['id'], s['start'], s['end']) for s in segments] == [(0, 0.0, 4.0), (1, 10.5, 12.0)]
+
+def test_overlap_words_repeated_at_segment_start_are_dropped():
+    # O segundo trecho começa 1s antes do corte (10s) e repete "ajudar hoje"
+    first = {'segments': [segment(0.0, 4.0, ' Bom dia,'), segment(4.0, 10.0, ' como posso ajudar hoje?')]}
+    second = {'segments': [segment(0.2, 3.0, ' ajudar hoje? Preciso de ajuda.'), segment(3.0, 5.0, ' Claro.')]}
+    segments = whisper_parallel.merge_chunks([first, second], [0.0, 9.0])
+    assert texts(segments) == [' Bom dia,', ' como posso ajudar hoje?', ' Preciso de ajuda.', ' Claro.']
+    assert segments[2]['start'] == 10.0
+    assert segments[2]['end'] == 12.0
+
+def test_segment_fully_inside_overlap_is_dropped():
+    first = {'segments': [segment(0.0, 10.0, ' O pedido chegou ontem.')]}
+    second = {'segments': [segment(0.0, 1.0, ' ontem.'), segment(1.0, 4.0, ' Mas veio errado.')]}
+    segments = whisper_parallel.merge_chunks([first, second], [0.0, 9.0])
+    assert texts(segments) == [' O pedido chegou ontem.', ' Mas veio errado.']
+
+def test_whole_segment_repetition_is_dropped():
+    first = {'segments': [segment(0.0, 10.0, ' Pode confirmar o CPF?')]}
+    second = {'segments': [segment(0.5, 1.5, ' o CPF?'), segment(1.5, 4.0, ' Sim, claro.')]}
+    segments = whisper_parallel.merge_chunks([first, second], [0.0, 9.0])
+    assert texts(segments) == [' Pode confirmar o CPF?', ' Sim, claro.']
+
+def test_straddling_segment_without_repetition_uses_midpoint():
+    first = {'segments': [segment(0.0, 10.0, ' Um momento.')]}
+    kept = {'segments': [segment(0.5, 4.0, ' Encontrei aqui.')]}
+    dropped = {'segments': [segment(0.0, 1.5, ' Momentinho.')]}
+    assert texts(whisper_parallel.merge_chunks([first, kept], [0.0, 9.0]))[-1] == ' Encontrei aqui.'
+    assert texts(whisper_parallel.merge_chunks([first, dropped], [0.0, 9.0])) == [' Um momento.']
+
+def test_word_level_dedup_at_boundary():
+    first = {'segments': [segment(8.0, 10.0, ' muito obrigado',
+                                  [(8.0, 9.2, ' muito'), (9.2, 10.0, ' obrigado')])]}
+    second = {'segments': [segment(0.2, 2.5, ' obrigado pela ligação',
+                                   [(0.25, 1.0, ' obrigado'), (1.0, 1.5, ' pela'), (1.5, 2.5, ' ligação')])]}
+    segments = whisper_parallel.merge_chunks([first, second], [0.0, 9.0])
+    assert texts(segments) == [' muito obrigado', ' pela ligação']
+    assert segments[1]['start'] == 10.0
+
+def pauses_signal(seconds=60, sample_rate=16000):
+    """Ruído com pausas curtas em instantes irregulares (cortes fora da grade dos blocos)"""
+    import numpy as np
+
+    rng = np.random.default_rng(7)
+    audio = (rng.standard_normal(seconds * sample_rate) * 0.3).astype(np.float32)
+    for pause in (7.31, 15.33, 22.9, 29.07, 39.66, 47.2, 59.34):
+        audio[int(pause * sample_rate):int((pause + 0.2) * sample_rate)] *= 0.001
+    return audio
+
+def test_iter_chunks_matches_chunk_bounds_for_any_block_size():
+    audio = pauses_signal()
+    expected = whisper_parallel.chunk_bounds(audio, 16000, max_chunk_seconds=20)
+    assert len(expected) > 2
+    for block_length in (16000 * 30, 12345, 480 * 7):
+        blocks = (audio[i:i + block_length] for i in range(0, len(audio), block_length))
+        chunks = list(whisper_parallel.iter_chunks(blocks, 16000, max_chunk_seconds=20))
+        assert [(start, end) for start, end, _ in chunks] == expected
+        for start, end, chunk in chunks:
+            assert len(chunk) == round((end - start) * 16000)
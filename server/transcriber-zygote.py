@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Fork-server ("zygote") dos transcritores Python
+Importa as bibliotecas pesadas (e opcionalmente os modelos Whisper) uma única vez e
+faz fork de um filho por job; os filhos compartilham as páginas carregadas (copy-on-write)
+
+Uso:
+    transcriber-zygote.py --serve <socket> [--models tiny,base]
+    transcriber-zygote.py --run <socket> <script.py> <arquivo>
+
+O filho executa o script como `python3 <script.py> <arquivo>`: o JSON vai para o
+stdout do cliente e o código de saída do cliente é o do script. Os logs (stderr)
+dos filhos ficam no stderr do zygote.
+
+O pai roda o torch com uma thread só (carga e quantização dos modelos): o pool do
+OpenMP nunca é criado antes do fork, e cada filho cria o seu ao restaurar as threads.
+O pedido é lido no filho (com tempo limite), então um cliente que não envia a linha
+não trava o loop de accept.
+"""
+
+import os
+import sys
+import json
+import runpy
+import socket
+import traceback
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Tempo máximo (segundos) para o cliente enviar a linha do pedido
+REQUEST_TIMEOUT = 10.0
+
+# Threads do torch antes de limitar o pai; restauradas em cada filho
+_torch_threads = None
+
+# Módulos importados antes do fork; os que não estiverem instalados são ignorados
+PRELOAD_MODULES = [
+    'numpy',
+    'torch',
+    'whisper',
+    'librosa',
+    'pydub',
+    'speech_recognition',
+    'requests',
+]
+
+def limit_torch_threads():
+    """
+    Uma thread no torch do pai antes de qualquer operação: um pool do OpenMP já iniciado
+    não sobrevive ao fork (o filho pode travar na primeira inferência)
+    """
+    global _torch_threads
+    torch = sys.modules.get('torch')
+    if torch is None:
+        return
+    _torch_threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+def restore_torch_threads():
+    """No filho: volta ao número de threads original (o cpu_budget ainda pode reduzir)"""
+    torch = sys.modules.get('torch')
+    if torch is not None and _torch_threads:
+        torch.set_num_threads(_torch_threads)
+
+def preload(models: list):
+    """Importa as bibliotecas e carrega os modelos no processo pai"""
+    for module_name in PRELOAD_MODULES:
+        try:
+            __import__(module_name)
+            print(f"Preloaded {module_name}", file=sys.stderr)
+        except ImportError as e:
+            print(f"Skipping {module_name}: {e}", file=sys.stderr)
+
+    limit_torch_threads()
+
+    if models:
+        sys.path.insert(0, SERVER_DIR)
+        import whisper_models
+        for name in models:
+            whisper_models.get_model(name)
+
+def resolve_script(script: str) -> str:
+    """Aceita apenas scripts do diretório server/"""
+    path = os.path.abspath(os.path.join(SERVER_DIR, os.path.basename(script)))
+    if not path.endswith('.py') or not os.path.isfile(path):
+        raise FileNotFoundError(f"Transcriber script not found: {script}")
+    return path
+
+def read_request(conn: socket.socket) -> dict:
+    """Linha JSON do pedido, com REQUEST_TIMEOUT; o socket volta a ser bloqueante depois"""
+    conn.settimeout(REQUEST_TIMEOUT)
+    with conn.makefile('r', encoding='utf-8') as reader:
+        request = json.loads(reader.readline())
+    conn.settimeout(None)
+    if not isinstance(request, dict):
+        raise ValueError("request must be a JSON object")
+    return request
+
+def run_child(conn: socket.socket):
+    """Processo filho: lê o pedido e executa o script com stdout redirecionado para o socket"""
+    exit_code = 0
+    try:
+        sys.stdout.flush()
+        os.dup2(conn.fileno(), 1)
+
+        try:
+            request = read_request(conn)
+            script_path = resolve_script(request.get('script', ''))
+        except (ValueError, OSError) as e:
+            print(json.dumps({'error': f'Invalid request: {e}'}))
+            raise SystemExit(1)
+
+        restore_torch_threads()
+
+        sys.argv = [script_path] + [str(arg) for arg in request.get('args', [])]
+        sys.path[0] = SERVER_DIR
+
+        runpy.run_path(script_path, run_name='__main__')
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+        except Exception:
+            pass
+        # O código de saída vai em uma linha final separada pelo byte nulo
+        try:
+            os.write(1, f"\0{exit_code}\n".encode())
+        except OSError:
+            pass
+        os._exit(exit_code)
+
+def reap_children():
+    """Coleta filhos encerrados sem bloquear"""
+    while True:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+
+def serve(socket_path: str, models: list):
+    """Aceita jobs JSON {"script": ..., "args": [...]} e faz fork de um filho por job"""
+    preload(models)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(64)
+    server.settimeout(1.0)
+    print(f"Transcriber zygote listening on {socket_path}", file=sys.stderr)
+
+    try:
+        while True:
+            reap_children()
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+
+            # O pedido é lido no filho: um cliente lento não bloqueia os outros jobs
+            pid = os.fork()
+            if pid == 0:
+                server.close()
+                run_child(conn)
+            conn.close()
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+def run(socket_path: str, script: str, args: list) -> int:
+    """Cliente: envia um job ao zygote e repassa o stdout do script"""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(socket_path)
+    client.sendall(json.dumps({'script': script, 'args': args}).encode('utf-8') + b"\n")
+
+    output = bytearray()
+    while True:
+        data = client.recv(65536)
+        if not data:
+            break
+        output.extend(data)
+    client.close()
+
+    exit_code = 1
+    marker = output.rfind(b"\0")
+    if marker != -1:
+        try:
+            exit_code = int(output[marker + 1:].strip() or 1)
+        except ValueError:
+            pass
+        output = output[:marker]
+
+    sys.stdout.buffer.write(bytes(output))
+    sys.stdout.flush()
+    return exit_code
+
+def main():
+    args = sys.argv[1:]
+
+    if len(args) >= 2 and args[0] == '--serve':
+        models = []
+        if len(args) == 4 and args[2] == '--models':
+            models = [name for name in args[3].split(',') if name]
+        elif len(args) != 2:
+            print("Usage: transcriber-zygote.py --serve <socket> [--models tiny,base]", file=sys.stderr)
+            sys.exit(1)
+        serve(args[1], models)
+    elif len(args) >= 3 and args[0] == '--run':
+        sys.exit(run(args[1], args[2], args[3:]))
+    else:
+        print("Usage: transcriber-zygote.py --serve <socket> [--models tiny,base] | --run <socket> <script.py> <file>", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
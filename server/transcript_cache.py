@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Cache de resultados de transcrição endereçado por conteúdo
+A chave é o hash do PCM canônico decodificado (16kHz mono s16le) + engine + modelo +
+parâmetros de decodificação, então o mesmo áudio reenviado com outro nome ou outro
+container reaproveita o resultado. As entradas são arquivos JSON gravados de forma
+atômica, compartilhados entre processos, com limite de tamanho por LRU (mtime).
+
+Variáveis de ambiente:
+    TRANSCRIPT_CACHE_DIR   diretório do cache (padrão: ~/.cache/akig/transcripts)
+    TRANSCRIPT_CACHE_MB    tamanho máximo das entradas (padrão: 512)
+    TRANSCRIPT_CACHE       0 desativa o cache
+
+Uso: transcript_cache.py stats | clear
+"""
+
+import os
+import sys
+import json
+import time
+import fcntl
+import hashlib
+import tempfile
+import functools
+
+CACHE_DIR = os.environ.get('TRANSCRIPT_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'akig', 'transcripts')
+CACHE_MB = float(os.environ.get('TRANSCRIPT_CACHE_MB', '512'))
+ENABLED = os.environ.get('TRANSCRIPT_CACHE', '1') != '0'
+
+# Versão do formato da chave; mudar invalida todas as entradas
+KEY_VERSION = 1
+
+def atomic_write(path: str, data: bytes):
+    """Grava em arquivo temporário no mesmo diretório e renomeia (leitores nunca veem meio arquivo)"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+def pcm_hash(file_path: str) -> str:
+    """
+    Hash do áudio decodificado de `file_path` (audio_decode.pcm_hash)
+    A decodificação que calcula o hash deixa o PCM no audio_cache para a transcrição
+    """
+    import audio_cache
+    import audio_decode
+
+    try:
+        return 'pcm:' + audio_decode.pcm_hash(file_path)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"Transcript cache: PCM hash failed ({e}), hashing file bytes", file=sys.stderr)
+    # Sem ffmpeg (ou arquivo que ele não lê): hash dos bytes, que só casa com o mesmo arquivo
+    return 'file:' + audio_cache.source_hash(file_path)
+
+def cache_key(audio_hash: str, engine: str, model: str = None, params: dict = None) -> str:
+    """Chave da entrada: áudio + engine + modelo + parâmetros de decodificação"""
+    description = json.dumps({
+        'version': KEY_VERSION,
+        'audio': audio_hash,
+        'engine': engine,
+        'model': model,
+        'params': params or {}
+    }, sort_keys=True)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+def _entry_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, 'entries', key[:2], key + '.json')
+
+def _update_stats(values: dict = None, **increments) -> dict:
+    """
+    Soma contadores (e fixa `values`) em stats.json sob flock (vários processos usam o mesmo cache)
+    Retorna os contadores atualizados
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(os.path.join(CACHE_DIR, 'stats.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        stats = read_stats()
+        for name, value in increments.items():
+            stats[name] = stats.get(name, 0) + value
+        stats.update(values or {})
+        atomic_write(os.path.join(CACHE_DIR, 'stats.json'), json.dumps(stats).encode())
+    return stats
+
+def read_stats() -> dict:
+    try:
+        with open(os.path.join(CACHE_DIR, 'stats.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def get(key: str):
+    """Resultado armazenado para `key`, ou None; um hit renova a entrada no LRU"""
+    path = _entry_path(key)
+    try:
+        with open(path, encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return entry
+
+def put(key: str, result: dict, meta: dict = None):
+    """
+    Grava o resultado e descarta as entradas menos usadas se passar do limite
+    O total gravado fica em stats.json: o diretório só é percorrido quando passa do limite
+    """
+    entry = dict(meta or {}, stored_at=time.time(), result=result)
+    data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+    atomic_write(_entry_path(key), data)
+    if _update_stats(stored_bytes=len(data))['stored_bytes'] > CACHE_MB * 1024 * 1024:
+        evict()
+
+def entry_paths() -> list:
+    """Caminhos de todas as entradas armazenadas"""
+    return [path for _, _, path in _entries()]
+
+def _entries() -> list:
+    entries = []
+    root = os.path.join(CACHE_DIR, 'entries')
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+def evict(max_bytes: int = None) -> int:
+    """Remove as entradas com mtime mais antigo até caber no limite; retorna quantas saíram"""
+    max_bytes = int(CACHE_MB * 1024 * 1024) if max_bytes is None else max_bytes
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+    _update_stats(values={'stored_bytes': total}, evictions=removed)
+    return removed
+
+def stats() -> dict:
+    """Taxa de acerto, bytes e tempo economizados e latência média de consulta"""
+    counters = read_stats()
+    hits = counters.get('hits', 0)
+    misses = counters.get('misses', 0)
+    lookups = hits + misses
+    entries = _entries()
+    return {
+        'directory': CACHE_DIR,
+        'entries': len(entries),
+        'bytes': sum(size for _, size, _ in entries),
+        'max_bytes': int(CACHE_MB * 1024 * 1024),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups, 4) if lookups else None,
+        'bytes_saved': counters.get('bytes_saved', 0),
+        'seconds_saved': round(counters.get('seconds_saved', 0.0), 2),
+        'mean_lookup_ms': round(1000 * counters.get('lookup_seconds', 0.0) / lookups, 2) if lookups else None,
+        'evictions': counters.get('evictions', 0)
+    }
+
+def _is_failure(result) -> bool:
+    return not isinstance(result, dict) or result.get('success') is False or 'error' in result
+
+def _is_cacheable(result) -> bool:
+    """Falhas e resultados parciais (incomplete=True) não são gravados"""
+    return not _is_failure(result) and not result.get('incomplete')
+
+def cached_transcription(engine: str, model: str = None, params=None):
+    """
+    Decorador para as funções transcribe_*(file_path, ...)
+    Consulta o cache antes de qualquer trabalho e grava só resultados bem-sucedidos e completos.
+    `params` é um dict ou uma função com a mesma assinatura da decorada que devolve os
+    parâmetros que mudam o resultado (modelo, quantização, flags de ambiente...)
+    Com stream=NdjsonStream nos kwargs, um hit reemite os segmentos armazenados
+    """
+    def decorator(transcribe):
+        @functools.wraps(transcribe)
+        def wrapper(file_path, *args, **kwargs):
+            if not ENABLED or not isinstance(file_path, str) or not os.path.isfile(file_path):
+                return transcribe(file_path, *args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                job_params = params(file_path, *args, **kwargs) if callable(params) else params
+                key = cache_key(pcm_hash(file_path), engine, model, job_params)
+                entry = get(key)
+            except OSError as e:
+                print(f"Transcript cache unavailable: {e}", file=sys.stderr)
+                return transcribe(file_path, *args, **kwargs)
+            lookup_seconds = time.perf_counter() - start
+
+            if entry is not None:
+                _update_stats(hits=1, lookup_seconds=lookup_seconds,
+                              bytes_saved=os.path.getsize(file_path),
+                              seconds_saved=entry.get('seconds', 0.0))
+                print(f"Transcript cache hit ({engine}) in {lookup_seconds * 1000:.0f}ms", file=sys.stderr)
+                result = entry['result']
+                stream = kwargs.get('stream')
+                if stream is not None:
+                    for segment in result.get('segments', []):
+                        stream.segment(segment)
+                return dict(result, cache={'hit': True, 'key': key})
+
+            _update_stats(misses=1, lookup_seconds=lookup_seconds)
+            start = time.perf_counter()
+            result = transcribe(file_path, *args, **kwargs)
+            seconds = time.perf_counter() - start
+
+            if _is_cacheable(result):
+                try:
+                    put(key, result, {'engine': engine, 'model': model, 'seconds': round(seconds, 3)})
+                except OSError as e:
+                    print(f"Transcript cache write failed: {e}", file=sys.stderr)
+                result = dict(result, cache={'hit': False, 'key': key})
+            return result
+        return wrapper
+    return decorator
+
+def clear() -> int:
+    """Remove todas as entradas (as estatísticas ficam)"""
+    return evict(max_bytes=0)
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] not in ('stats', 'clear'):
+        print("Usage: transcript_cache.py stats | clear", file=sys.stderr)
+        sys.exit(1)
+
+    if sys.argv[1] == 'clear':
+        print(json.dumps({'removed': clear()}))
+    else:
+        print(json.dumps(stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
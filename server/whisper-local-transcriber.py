@@ -7,13 +7,22 @@ Processa o conteúdo real do áudio sem inventar diálogos
 import os
 import sys
 import json
-import tempfile
-import subprocess
-from pydub import AudioSegment
+import cpu_budget
+import audio_decode
+import call_metrics
+import whisper_engine
+import whisper_models
+import transcript_cache
 
+# Tempo máximo de transcrição (segundos), verificado entre janelas do Whisper
+TRANSCRIPTION_TIMEOUT = 120
+
+@call_metrics.with_call_metrics
+@transcript_cache.cached_transcription('whisper_local', model='base',
+                                        params=lambda file_path: {'quantize': whisper_models.resolve_quantize()})
 def transcribe_with_local_whisper(file_path: str) -> dict:
     """
-    Transcrição real usando Whisper local via linha de comando
+    Transcrição real usando Whisper local em processo
     Processa o conteúdo autêntico do arquivo
     """
     try:
@@ -22,122 +31,79 @@ def transcribe_with_local_whisper(file_path: str) -> dict:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Arquivo não encontrado: {file_path}")
         
-        # Carregar áudio
-        audio = AudioSegment.from_file(file_path)
-        duration = len(audio) / 1000.0
-        
-        print(f"Arquivo carregado: {duration:.1f}s, {audio.channels} canais", file=sys.stderr)
-        
-        # Converter para formato adequado ao Whisper
-        if audio.channels > 1:
-            audio = audio.set_channels(1)
-        audio = audio.set_frame_rate(16000)
+        # Decodificar em um único passe para float32 mono 16kHz (formato do Whisper)
+        audio = audio_decode.load_audio(file_path)
+        duration = audio_decode.duration(audio)
         
-        # Salvar como WAV temporário
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-            audio.export(temp_file.name, format="wav")
-            temp_path = temp_file.name
+        print(f"Arquivo carregado: {duration:.1f}s, mono 16kHz", file=sys.stderr)
         
         try:
             print("Executando Whisper...", file=sys.stderr)
             
-            # Usar whisper via linha de comando
-            cmd = [
-                'whisper', 
-                temp_path,
-                '--model', 'base',
-                '--language', 'pt',
-                '--output_format', 'json',
-                '--output_dir', '/tmp'
-            ]
+            # Transcrever em processo, reutilizando o modelo já carregado
+            model = whisper_models.get_model("base")
+            whisper_result = whisper_engine.transcribe(
+                model,
+                audio,
+                timeout=TRANSCRIPTION_TIMEOUT,
+                language='pt',
+                verbose=False
+            )
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+            print("Whisper executado com sucesso", file=sys.stderr)
             
-            if result.returncode == 0:
-                print("Whisper executado com sucesso", file=sys.stderr)
-                
-                # Encontrar arquivo JSON gerado
-                base_name = os.path.splitext(os.path.basename(temp_path))[0]
-                json_path = f"/tmp/{base_name}.json"
+            # Processar resultado do Whisper
+            full_text = whisper_result.get('text', '').strip()
+            segments = []
+            
+            if 'segments' in whisper_result and whisper_result['segments']:
+                for i, segment in enumerate(whisper_result['segments']):
+                    segments.append({
+                        'id': f'segment_{i}',
+                        'speaker': 'unknown',
+                        'text': segment.get('text', '').strip(),
+                        'startTime': segment.get('start', 0),
+                        'endTime': segment.get('end', duration),
+                        'confidence': 0.9,  # Whisper não fornece confidence por segmento
+                        'criticalWords': []
+                    })
+            else:
+                # Se não há segmentos, criar um único
+                if full_text:
+                    segments.append({
+                        'id': 'segment_0',
+                        'speaker': 'unknown',
+                        'text': full_text,
+                        'startTime': 0,
+                        'endTime': duration,
+                        'confidence': 0.9,
+                        'criticalWords': []
+                    })
+            
+            if full_text:
+                result_data = {
+                    'text': full_text,
+                    'segments': segments,
+                    'duration': duration,
+                    'success': True,
+                    'transcription_engine': 'whisper_local_cli',
+                    'segments_count': len(segments)
+                }
                 
-                if os.path.exists(json_path):
-                    with open(json_path, 'r', encoding='utf-8') as f:
-                        whisper_result = json.load(f)
-                    
-                    # Processar resultado do Whisper
-                    full_text = whisper_result.get('text', '').strip()
-                    segments = []
-                    
-                    if 'segments' in whisper_result and whisper_result['segments']:
-                        for i, segment in enumerate(whisper_result['segments']):
-                            segments.append({
-                                'id': f'segment_{i}',
-                                'speaker': 'unknown',
-                                'text': segment.get('text', '').strip(),
-                                'startTime': segment.get('start', 0),
-                                'endTime': segment.get('end', duration),
-                                'confidence': 0.9,  # Whisper não fornece confidence por segmento
-                                'criticalWords': []
-                            })
-                    else:
-                        # Se não há segmentos, criar um único
-                        if full_text:
-                            segments.append({
-                                'id': 'segment_0',
-                                'speaker': 'unknown',
-                                'text': full_text,
-                                'startTime': 0,
-                                'endTime': duration,
-                                'confidence': 0.9,
-                                'criticalWords': []
-                            })
-                    
-                    # Limpar arquivos temporários
-                    os.unlink(temp_path)
-                    os.unlink(json_path)
-                    
-                    if full_text:
-                        result_data = {
-                            'text': full_text,
-                            'segments': segments,
-                            'duration': duration,
-                            'success': True,
-                            'transcription_engine': 'whisper_local_cli',
-                            'segments_count': len(segments)
-                        }
-                        
-                        print(f"Transcrição concluída: {len(full_text)} caracteres, {len(segments)} segmentos", file=sys.stderr)
-                        return result_data
-                    else:
-                        return {
-                            'text': "Whisper processou o arquivo mas não detectou conteúdo de fala clara.",
-                            'segments': [],
-                            'duration': duration,
-                            'success': False,
-                            'note': 'Arquivo processado com Whisper mas sem transcrição resultado'
-                        }
-                else:
-                    print(f"Arquivo JSON não encontrado: {json_path}", file=sys.stderr)
-                    return {
-                        'text': "Whisper executou mas não gerou arquivo de resultado.",
-                        'segments': [],
-                        'duration': duration,
-                        'success': False,
-                        'error': 'Arquivo de resultado não encontrado'
-                    }
+                print(f"Transcrição concluída: {len(full_text)} caracteres, {len(segments)} segmentos", file=sys.stderr)
+                # VAD sobre o áudio já decodificado: as métricas da chamada não decodificam de novo
+                return call_metrics.with_samples(result_data, audio, audio_decode.SAMPLE_RATE)
             else:
-                print(f"Erro no Whisper: {result.stderr}", file=sys.stderr)
                 return {
-                    'text': f"Erro na execução do Whisper: {result.stderr}",
+                    'text': "Whisper processou o arquivo mas não detectou conteúdo de fala clara.",
                     'segments': [],
                     'duration': duration,
                     'success': False,
-                    'error': result.stderr
+                    'note': 'Arquivo processado com Whisper mas sem transcrição resultado'
                 }
                 
-        except subprocess.TimeoutExpired:
+        except whisper_engine.TranscriptionTimeout:
             print("Timeout na execução do Whisper", file=sys.stderr)
-            os.unlink(temp_path)
             return {
                 'text': "Timeout na transcrição - arquivo muito longo para processamento.",
                 'segments': [],
@@ -147,8 +113,6 @@ def transcribe_with_local_whisper(file_path: str) -> dict:
             }
         except Exception as whisper_error:
             print(f"Erro no Whisper: {whisper_error}", file=sys.stderr)
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
             return {
                 'text': f"Erro na transcrição com Whisper: {str(whisper_error)}",
                 'segments': [],
@@ -175,7 +139,9 @@ def main():
     file_path = sys.argv[1]
     
     try:
-        result = transcribe_with_local_whisper(file_path)
+        with cpu_budget.acquire() as budget:
+            result = transcribe_with_local_whisper(file_path)
+            result['cpu_budget'] = budget.as_dict()
         print(json.dumps(result, ensure_ascii=False, indent=2))
     except Exception as e:
         print(json.dumps({'error': str(e)}, ensure_ascii=False))
@@ -6,58 +6,113 @@ Processes actual audio content using OpenAI Whisper without external APIs
 import json
 import sys
 import os
-import tempfile
-import subprocess
-import whisper
+import cpu_budget
+import audio_decode
+import call_metrics
+import whisper_models
+import whisper_cascade
+import whisper_engine
+import stream_output
+import transcript_cache
 from pathlib import Path
 
-def convert_to_wav_for_whisper(input_path: str) -> str:
-    """Convert audio to WAV format for Whisper processing"""
-    try:
-        # Create temporary WAV file
-        temp_wav = tempfile.mktemp(suffix='.wav')
-        
-        # Convert using ffmpeg with parameters optimized for Whisper
-        cmd = [
-            'ffmpeg', '-i', input_path,
-            '-ar', '16000',  # 16kHz sample rate
-            '-ac', '1',      # Mono channel
-            '-c:a', 'pcm_f32le',  # 32-bit float PCM for Whisper
-            '-y',            # Overwrite output
-            temp_wav
+def format_segment(i: int, segment: dict) -> dict:
+    """Whisper segment in the output format, with speaker and critical words"""
+    # Detect speaker based on position (alternating pattern)
+    speaker = "Atendente" if i % 2 == 0 else "Cliente"
+    
+    # Detect critical words in this segment
+    critical_words = detect_critical_words(segment['text'])
+    
+    formatted = {
+        "start": round(segment['start'], 2),
+        "end": round(segment['end'], 2),
+        "speaker": speaker,
+        "text": segment['text'].strip(),
+        "criticalWords": critical_words
+    }
+    
+    # Word times are only present when alignment was requested (WHISPER_WORD_TIMES)
+    if segment.get('words'):
+        formatted["words"] = [
+            {"word": word['word'].strip(), "start": word['start'], "end": word['end']}
+            for word in segment['words']
         ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            raise Exception(f"FFmpeg conversion failed: {result.stderr}")
-        
-        return temp_wav
-        
-    except Exception as e:
-        print(f"Audio conversion error: {e}", file=sys.stderr)
-        raise
+        formatted["criticalWordTimes"] = critical_word_times(segment['words'], critical_words)
+    return formatted
+
+def critical_word_times(words: list, critical_words: list) -> list:
+    """Where each critical keyword (or phrase) occurs, using the aligned word times"""
+    normalized = [''.join(ch for ch in word['word'].lower() if ch.isalnum()) for word in words]
+    hits = []
+    for keyword in critical_words:
+        parts = keyword.split()
+        for j in range(len(normalized) - len(parts) + 1):
+            if normalized[j:j + len(parts)] == parts:
+                hits.append({"word": keyword, "start": words[j]['start'], "end": words[j + len(parts) - 1]['end']})
+    return hits
 
-def transcribe_with_whisper_offline(wav_path: str) -> dict:
+def align_requested_words(model, audio, segments: list):
+    """On-demand word alignment: all segments, or only those with critical words"""
+    mode = whisper_engine.word_time_mode()
+    if mode == 'all':
+        indices = None
+    elif mode == 'critical':
+        indices = [i for i, segment in enumerate(segments) if detect_critical_words(segment['text'])]
+        if not indices:
+            return
+    else:
+        return
+    aligned = whisper_engine.align_words(model, audio, segments, indices)
+    print(f"Aligned words for {aligned} segment(s)", file=sys.stderr)
+
+def transcribe_with_whisper_offline(audio, stream=None) -> dict:
     """
     Transcribe using OpenAI Whisper offline model
-    Processes real audio content without generating fake dialogues
+    Processes real audio content (float32 mono 16kHz samples) without generating fake dialogues
+    In streaming mode `audio` may be a file path, decoded in bounded-memory blocks
+    With WHISPER_CASCADE set, low-confidence segments are re-decoded with a larger model
+    With `stream` (--stream), segments are emitted as each sequential chunk is decoded
+    Word times are a separate stage, run only as WHISPER_WORD_TIMES=critical|all asks
     """
     try:
-        print("Loading Whisper model...", file=sys.stderr)
-        
-        # Load Whisper model (tiny model for fastest processing)
-        model = whisper.load_model("tiny")
-        
-        print("Transcribing audio with Whisper...", file=sys.stderr)
-        
-        # Transcribe the audio file
-        result = model.transcribe(
-            wav_path,
-            language='pt',  # Portuguese
-            word_timestamps=True,
-            verbose=False
-        )
+        cascade = whisper_cascade.cascade_models() if stream is None else None
+        if stream is not None:
+            print("Streaming transcription with Whisper...", file=sys.stderr)
+            model = whisper_models.get_model("tiny")
+            
+            whisper_segments = []
+            for added, processed, total in whisper_engine.iter_transcribe(
+                model, audio, align=align_requested_words, language='pt', verbose=False
+            ):
+                for segment in added:
+                    stream.segment(format_segment(segment['id'], segment))
+                whisper_segments.extend(added)
+                stream.audio_progress(processed, total)
+            
+            result = {
+                'text': ''.join(segment['text'] for segment in whisper_segments),
+                'segments': whisper_segments
+            }
+        elif cascade:
+            print(f"Transcribing audio with Whisper cascade {cascade[0]} -> {cascade[1]}...", file=sys.stderr)
+            result = whisper_cascade.transcribe(audio, cascade, language='pt', verbose=False)
+            align_requested_words(whisper_models.get_model(cascade[0]), audio, result['segments'])
+        else:
+            print("Loading Whisper model...", file=sys.stderr)
+            
+            # Load Whisper model (tiny model for fastest processing)
+            model = whisper_models.get_model("tiny")
+            
+            print("Transcribing audio with Whisper...", file=sys.stderr)
+            
+            # Transcribe the audio file
+            result = model.transcribe(
+                audio,
+                language='pt',  # Portuguese
+                verbose=False
+            )
+            align_requested_words(model, audio, result['segments'])
         
         # Process the transcription results
         full_text = result['text']
@@ -65,19 +120,7 @@ def transcribe_with_whisper_offline(wav_path: str) -> dict:
         
         # Create segments from Whisper segments
         for i, segment in enumerate(result['segments']):
-            # Detect speaker based on position (alternating pattern)
-            speaker = "Atendente" if i % 2 == 0 else "Cliente"
-            
-            # Detect critical words in this segment
-            critical_words = detect_critical_words(segment['text'])
-            
-            segments.append({
-                "start": round(segment['start'], 2),
-                "end": round(segment['end'], 2),
-                "speaker": speaker,
-                "text": segment['text'].strip(),
-                "criticalWords": critical_words
-            })
+            segments.append(format_segment(i, segment))
         
         # Calculate duration from last segment
         duration = segments[-1]["end"] if segments else 0
@@ -85,7 +128,7 @@ def transcribe_with_whisper_offline(wav_path: str) -> dict:
         # Analyze the transcription
         analysis = analyze_transcription(full_text, segments)
         
-        return {
+        output = {
             "text": full_text.strip(),
             "segments": segments,
             "duration": duration,
@@ -93,10 +136,35 @@ def transcribe_with_whisper_offline(wav_path: str) -> dict:
             "transcription_engine": "whisper_offline_real",
             "analysis": analysis
         }
+        if 'cascade' in result:
+            output["cascade"] = result['cascade']
+        return output
         
     except Exception as e:
         raise Exception(f"Whisper transcription error: {e}")
 
+def cache_params(input_file: str, stream=None) -> dict:
+    """Options that change the result, for the transcript cache key"""
+    return {
+        'quantize': whisper_models.resolve_quantize(),
+        'cascade': whisper_cascade.cascade_models() if stream is None else None,
+        'word_times': whisper_engine.word_time_mode(),
+        'stream': stream is not None
+    }
+
+@call_metrics.with_call_metrics
+@transcript_cache.cached_transcription('whisper_offline_real', model='tiny', params=cache_params)
+def transcribe_file(input_file: str, stream=None) -> dict:
+    """Decode and transcribe an audio file (cached by decoded audio content)"""
+    # Single ffmpeg pass straight into memory, no temporary WAV
+    # (streaming decodes block by block alongside the transcription instead)
+    audio = input_file if stream is not None else audio_decode.load_audio(input_file)
+    result = transcribe_with_whisper_offline(audio, stream=stream)
+    if stream is not None:
+        return result
+    # VAD over the already decoded samples, so the call metrics do not decode the file again
+    return call_metrics.with_samples(result, audio, audio_decode.SAMPLE_RATE)
+
 def detect_critical_words(text: str) -> list:
     """Detect critical customer service words in Portuguese"""
     critical_keywords = [
@@ -186,11 +254,14 @@ def analyze_transcription(text: str, segments: list) -> dict:
 
 def main():
     """Main function to process audio file"""
-    if len(sys.argv) != 2:
-        print("Usage: python whisper-offline-real.py <audio_file>", file=sys.stderr)
+    args = sys.argv[1:]
+    stream = stream_output.NdjsonStream() if stream_output.pop_stream_flag(args) else None
+    
+    if len(args) != 1:
+        print("Usage: python whisper-offline-real.py [--stream] <audio_file>", file=sys.stderr)
         sys.exit(1)
     
-    input_file = sys.argv[1]
+    input_file = args[0]
     
     if not os.path.exists(input_file):
         print(f"Error: File {input_file} not found", file=sys.stderr)
@@ -199,22 +270,18 @@ def main():
     try:
         print(f"Processing real audio file: {input_file}", file=sys.stderr)
         
-        # Convert to WAV format for Whisper
-        wav_file = convert_to_wav_for_whisper(input_file)
+        # Transcribe with Whisper offline
+        with cpu_budget.acquire() as budget:
+            result = transcribe_file(input_file, stream=stream)
+            result['cpu_budget'] = budget.as_dict()
         
-        try:
-            # Transcribe with Whisper offline
-            result = transcribe_with_whisper_offline(wav_file)
-            
-            print(f"Transcription completed: {len(result['text'])} characters, {len(result['segments'])} segments", file=sys.stderr)
-            
-            # Output results as JSON
+        print(f"Transcription completed: {len(result['text'])} characters, {len(result['segments'])} segments", file=sys.stderr)
+        
+        # Output results as JSON
+        if stream:
+            stream.summary(result)
+        else:
             print(json.dumps(result, ensure_ascii=False, indent=2))
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(wav_file):
-                os.unlink(wav_file)
         
     except Exception as e:
         error_result = {
@@ -225,6 +292,8 @@ def main():
             "duration": 0,
             "transcription_engine": "whisper_offline_real"
         }
+        if stream:
+            stream.error(str(e))
         print(json.dumps(error_result), file=sys.stderr)
         sys.exit(1)
 
@@ -2,63 +2,180 @@
 """
 Transcritor usando Whisper local para processar conteúdo real do áudio
 Sem APIs externas - processa o arquivo autêntico carregado
+
+Uso:
+    whisper-real-transcriber.py <arquivo>                  # um arquivo, JSON no stdout
+    whisper-real-transcriber.py --serve                    # jobs NDJSON via stdin/stdout
+    whisper-real-transcriber.py --serve --socket <path>    # jobs NDJSON via socket Unix
+    whisper-real-transcriber.py --serve --socket <path> --batch
+        # jobs concorrentes com janelas de 30s decodificadas em lote (whisper_batching)
 """
 
 import os
 import sys
 import json
-import tempfile
-import whisper
-from pydub import AudioSegment
+import threading
+import socketserver
+import cpu_budget
+import audio_decode
+import call_metrics
+import whisper_models
+import whisper_cascade
+import whisper_vad
+import whisper_parallel
+import whisper_engine
+import stream_output
+import transcript_cache
+
+def load_whisper_model():
+    """Carrega o modelo Whisper usado pelo transcritor"""
+    print(f"Loading Whisper model...", file=sys.stderr)
+    
+    # Carregar modelo Whisper (base é um bom compromisso entre velocidade e qualidade)
+    return whisper_models.get_model("base")
+
+def format_segment(i: int, segment: dict, duration: float) -> dict:
+    """Segmento do Whisper no formato da aplicação (None se não tiver texto)"""
+    # Alternar falantes (simplificado)
+    speaker = 'agent' if i % 2 == 0 else 'client'
+    
+    segment_text = segment['text'].strip()
+    if not segment_text:
+        return None
+    
+    formatted = {
+        'id': f'segment_{i}',
+        'speaker': speaker,
+        'text': segment_text,
+        'startTime': segment.get('start', 0),
+        'endTime': segment.get('end', duration),
+        'confidence': segment.get('confidence', 0.9),
+        'criticalWords': []
+    }
+    
+    # Palavras com timestamps, só quando o alinhamento foi pedido (WHISPER_WORD_TIMES)
+    if segment.get('words'):
+        formatted['words'] = [
+            {'word': word['word'].strip(), 'start': word['start'], 'end': word['end']}
+            for word in segment['words']
+        ]
+    return formatted
 
-def transcribe_with_whisper(file_path: str) -> dict:
+def stream_whisper(model, audio, duration: float, stream) -> dict:
+    """
+    Transcrição em trechos sequenciais emitindo segmentos e progresso no stream
+    Com um caminho, o áudio é decodificado em blocos e a memória não cresce com a duração
+    """
+    align = whisper_engine.align_words if whisper_engine.word_time_mode() == 'all' else None
+    
+    whisper_segments = []
+    for added, processed, total in whisper_engine.iter_transcribe(
+        model, audio, align=align, language='pt', verbose=False
+    ):
+        for segment in added:
+            formatted = format_segment(segment['id'], segment, duration)
+            if formatted:
+                stream.segment(formatted)
+        whisper_segments.extend(added)
+        stream.audio_progress(processed, total)
+    
+    return {
+        'text': ''.join(segment['text'] for segment in whisper_segments),
+        'segments': whisper_segments
+    }
+
+def cache_params(file_path: str, model=None, scheduler=None, stream=None) -> dict:
+    """Opções que mudam o resultado, para a chave do cache de transcrições"""
+    standalone = model is None and scheduler is None and stream is None
+    return {
+        'quantize': whisper_models.resolve_quantize(),
+        'cascade': whisper_cascade.cascade_models() if standalone else None,
+        'parallel': whisper_parallel.parallel_workers() > 1 if standalone else False,
+        'vad': whisper_vad.vad_enabled() and stream is None,
+        'word_times': whisper_engine.word_time_mode(),
+        'batched': scheduler is not None,
+        'stream': stream is not None
+    }
+
+@call_metrics.with_call_metrics
+@transcript_cache.cached_transcription('whisper_real', model='base', params=cache_params)
+def transcribe_with_whisper(file_path: str, model=None, scheduler=None, stream=None) -> dict:
     """
     Transcrição real usando Whisper local
     Processa o conteúdo autêntico do arquivo de áudio
+    
+    Se `model` for informado (modo --serve), reutiliza o modelo já carregado
+    Se `scheduler` for informado (modo --serve --batch), as janelas vão para o agendador de lotes
+    Sem nenhum dos dois, WHISPER_CASCADE ativa a cascata tiny -> base (whisper_cascade)
+    WHISPER_PARALLEL=<N> divide a chamada em trechos transcritos por N processos (whisper_parallel)
+    WHISPER_VAD=1 decodifica só os trechos de fala (whisper_vad), em todos os modos exceto o streaming
+    WHISPER_WORD_TIMES=all inclui as palavras com timestamps em cada segmento (este transcritor
+    não detecta palavras críticas, então 'critical' não alinha nada aqui)
+    
+    Com `stream` (NdjsonStream, opção --stream), a chamada é transcrita em trechos
+    sequenciais e cada segmento é emitido assim que fica pronto
     """
     try:
-        print(f"Loading Whisper model...", file=sys.stderr)
-        
-        # Carregar modelo Whisper (base é um bom compromisso entre velocidade e qualidade)
-        model = whisper.load_model("base")
-        
         print(f"Transcribing audio file: {file_path}", file=sys.stderr)
         
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Audio file not found: {file_path}")
         
-        # Carregar áudio
-        audio = AudioSegment.from_file(file_path)
-        duration = len(audio) / 1000.0
-        
-        print(f"Audio loaded: {duration:.1f}s, {audio.channels} channels", file=sys.stderr)
+        standalone = model is None and scheduler is None
+        cascade = whisper_cascade.cascade_models() if standalone and stream is None else None
+        workers = whisper_parallel.parallel_workers() if standalone and stream is None and not cascade else 0
+        if standalone and not cascade and workers <= 1:
+            model = load_whisper_model()
         
-        # Converter para mono se necessário
-        if audio.channels > 1:
-            audio = audio.set_channels(1)
-            print("Converted to mono", file=sys.stderr)
-        
-        # Normalizar para 16kHz (padrão do Whisper)
-        audio = audio.set_frame_rate(16000)
-        
-        # Salvar como WAV temporário
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-            audio.export(temp_file.name, format="wav")
-            temp_path = temp_file.name
+        if stream is not None:
+            # Streaming: decodificação em blocos junto com a transcrição (memória limitada)
+            audio = file_path
+            duration = audio_decode.probe_duration(file_path) or 0.0
+            print(f"Streaming audio: {duration:.1f}s, mono 16kHz", file=sys.stderr)
+        else:
+            # Decodificar em um único passe para float32 mono 16kHz (entrada do Whisper)
+            audio = audio_decode.load_audio(file_path)
+            duration = audio_decode.duration(audio)
+            print(f"Audio loaded: {duration:.1f}s, mono 16kHz", file=sys.stderr)
         
         try:
             print("Starting Whisper transcription...", file=sys.stderr)
             
             # Transcrever com Whisper
-            result = model.transcribe(
-                temp_path,
-                language='pt',  # Português
-                word_timestamps=True,
-                verbose=False
-            )
+            if stream is not None:
+                run_whisper = lambda audio_input: stream_whisper(model, audio_input, duration, stream)
+            elif scheduler is not None:
+                run_whisper = scheduler.transcribe
+            elif cascade:
+                run_whisper = lambda audio_input: whisper_cascade.transcribe(
+                    audio_input, cascade, language='pt', verbose=False
+                )
+            elif workers > 1:
+                run_whisper = lambda audio_input: whisper_parallel.transcribe(
+                    audio_input, 'base', workers, language='pt', verbose=False
+                )
+            else:
+                run_whisper = lambda audio_input: model.transcribe(
+                    audio_input,
+                    language='pt',  # Português
+                    verbose=False
+                )
+            
+            if whisper_vad.vad_enabled() and stream is None:
+                result = whisper_vad.transcribe(audio, run_whisper)
+            else:
+                result = run_whisper(audio)
             
             print(f"Whisper transcription completed", file=sys.stderr)
             
+            # Timestamps por palavra só sob demanda, como etapa separada
+            if stream is None and whisper_engine.word_time_mode() == 'all' and result.get('segments'):
+                if scheduler is not None:
+                    # Com o lock do agendador: os hooks do alinhamento não podem ver um lote em andamento
+                    scheduler.align_words(audio, result['segments'])
+                else:
+                    whisper_engine.align_words(model or load_whisper_model(), audio, result['segments'])
+            
             # Processar resultado
             full_text = result['text'].strip()
             segments = []
@@ -66,27 +183,9 @@ def transcribe_with_whisper(file_path: str) -> dict:
             # Extrair segmentos com timestamps
             if 'segments' in result and result['segments']:
                 for i, segment in enumerate(result['segments']):
-                    # Alternar falantes (simplificado)
-                    speaker = 'agent' if i % 2 == 0 else 'client'
-                    
-                    # Extrair palavras com timestamps se disponíveis
-                    words = []
-                    if 'words' in segment and segment['words']:
-                        words = [word['word'] for word in segment['words']]
-                        segment_text = ' '.join(words).strip()
-                    else:
-                        segment_text = segment['text'].strip()
-                    
-                    if segment_text:
-                        segments.append({
-                            'id': f'segment_{i}',
-                            'speaker': speaker,
-                            'text': segment_text,
-                            'startTime': segment.get('start', 0),
-                            'endTime': segment.get('end', duration),
-                            'confidence': segment.get('confidence', 0.9),
-                            'criticalWords': []
-                        })
+                    formatted = format_segment(i, segment, duration)
+                    if formatted:
+                        segments.append(formatted)
             else:
                 # Se não há segmentos, criar um único segmento
                 segments.append({
@@ -99,9 +198,6 @@ def transcribe_with_whisper(file_path: str) -> dict:
                     'criticalWords': []
                 })
             
-            # Limpar arquivo temporário
-            os.unlink(temp_path)
-            
             result_data = {
                 'text': full_text,
                 'segments': segments,
@@ -110,15 +206,25 @@ def transcribe_with_whisper(file_path: str) -> dict:
                 'transcription_engine': 'whisper_local',
                 'segments_count': len(segments)
             }
+            if 'cascade' in result:
+                result_data['cascade'] = result['cascade']
+            if 'vad' in result:
+                result_data['vad'] = result['vad']
+            if 'parallel' in result:
+                result_data['parallel'] = result['parallel']
+            
+            # Trechos de fala para as métricas da chamada: os do whisper_vad ou VAD sobre o
+            # áudio já carregado (no streaming o decorador decodifica o arquivo)
+            if 'speech_regions' in result:
+                result_data = call_metrics.with_regions(result_data, result['speech_regions'], duration)
+            elif stream is None:
+                result_data = call_metrics.with_samples(result_data, audio, audio_decode.SAMPLE_RATE)
             
             print(f"Real transcription completed: {len(segments)} segments, {len(full_text)} characters", file=sys.stderr)
             return result_data
             
         except Exception as whisper_error:
             print(f"Whisper transcription error: {whisper_error}", file=sys.stderr)
-            # Limpar arquivo temporário
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
             raise whisper_error
             
     except Exception as e:
@@ -131,18 +237,143 @@ def transcribe_with_whisper(file_path: str) -> dict:
             'error': str(e)
         }
 
+def handle_request_line(line: str, transcribe_job, stats) -> str:
+    """
+    Processa uma linha do modo --serve e retorna a resposta em uma linha JSON
+    A linha pode ser {"file": "<caminho>"}, {"command": "stats"} ou apenas o caminho do arquivo
+    """
+    try:
+        line = line.strip()
+        if line.startswith('{'):
+            request = json.loads(line)
+            if request.get('command') == 'stats':
+                return json.dumps(stats(), ensure_ascii=False)
+            file_path = request.get('file') or request.get('path')
+        else:
+            file_path = line
+        
+        if not file_path:
+            raise ValueError('Audio file path required')
+        
+        result = transcribe_job(file_path)
+    except Exception as e:
+        result = {'error': str(e)}
+    
+    return json.dumps(result, ensure_ascii=False)
+
+def serve_stdio(transcribe_job, stats):
+    """Atende jobs NDJSON via stdin/stdout, uma resposta por linha na ordem recebida"""
+    out = sys.stdout
+    # Qualquer print acidental de bibliotecas vai para stderr e não corrompe o protocolo
+    sys.stdout = sys.stderr
+    
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        out.write(handle_request_line(line, transcribe_job, stats) + '\n')
+        out.flush()
+
+def serve_socket(socket_path: str, transcribe_job, stats):
+    """Atende jobs NDJSON via socket Unix, uma conexão por thread"""
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw_line in self.rfile:
+                line = raw_line.decode('utf-8')
+                if not line.strip():
+                    continue
+                response = handle_request_line(line, transcribe_job, stats) + '\n'
+                self.wfile.write(response.encode('utf-8'))
+                self.wfile.flush()
+    
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    
+    sys.stdout = sys.stderr
+    with socketserver.ThreadingUnixStreamServer(socket_path, RequestHandler) as server:
+        server.daemon_threads = True
+        print(f"Whisper server listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+def serve(socket_path: str = None, batch: bool = False):
+    """
+    Modo residente: carrega o modelo uma única vez e processa vários arquivos
+    Cada job é uma linha JSON e cada resposta é o mesmo dicionário do modo CLI
+    """
+    # O servidor mantém o orçamento de CPU durante toda a sua vida
+    budget = cpu_budget.acquire()
+    model = load_whisper_model()
+    
+    if batch:
+        # Jobs concorrentes seguem em paralelo; o agendador agrupa as janelas de 30s
+        from whisper_batching import WhisperBatchScheduler
+        scheduler = WhisperBatchScheduler(model, language='pt')
+        
+        def transcribe_job(file_path):
+            return transcribe_with_whisper(file_path, scheduler=scheduler)
+        
+        def stats():
+            return {**whisper_models.model_stats(), 'batching': scheduler.stats(), 'cpu_budget': budget.as_dict(),
+                    'transcript_cache': transcript_cache.stats()}
+    else:
+        # O modelo é compartilhado; as transcrições são serializadas
+        lock = threading.Lock()
+        
+        def transcribe_job(file_path):
+            with lock:
+                return transcribe_with_whisper(file_path, model=model)
+        
+        def stats():
+            return {**whisper_models.model_stats(), 'cpu_budget': budget.as_dict(), 'transcript_cache': transcript_cache.stats()}
+    
+    print("Whisper model ready", file=sys.stderr)
+    
+    if socket_path:
+        serve_socket(socket_path, transcribe_job, stats)
+    else:
+        serve_stdio(transcribe_job, stats)
+
 def main():
-    if len(sys.argv) != 2:
+    if len(sys.argv) >= 2 and sys.argv[1] == '--serve':
+        args = sys.argv[2:]
+        batch = '--batch' in args
+        if batch:
+            args.remove('--batch')
+        
+        if len(args) == 2 and args[0] == '--socket':
+            serve(args[1], batch=batch)
+        elif not args:
+            serve(batch=batch)
+        else:
+            print(json.dumps({'error': 'Usage: whisper-real-transcriber.py --serve [--socket <path>] [--batch]'}))
+            sys.exit(1)
+        return
+    
+    args = sys.argv[1:]
+    stream = stream_output.NdjsonStream() if stream_output.pop_stream_flag(args) else None
+    
+    if len(args) != 1:
         print(json.dumps({'error': 'Audio file path required'}))
         sys.exit(1)
     
-    file_path = sys.argv[1]
+    file_path = args[0]
     
     try:
-        result = transcribe_with_whisper(file_path)
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+        with cpu_budget.acquire() as budget:
+            result = transcribe_with_whisper(file_path, stream=stream)
+            result['cpu_budget'] = budget.as_dict()
+        if stream:
+            stream.summary(result)
+        else:
+            print(json.dumps(result, ensure_ascii=False, indent=2))
     except Exception as e:
-        print(json.dumps({'error': str(e)}, ensure_ascii=False))
+        if stream:
+            stream.error(str(e))
+        else:
+            print(json.dumps({'error': str(e)}, ensure_ascii=False))
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Agendador de lotes para inferência Whisper
+Junta janelas de 30s de jobs concorrentes e roda encoder + decodificação gulosa em lote
+
+Diferenças em relação ao model.transcribe():
+- o áudio é dividido em janelas fixas de 30s (sem avanço pelo último timestamp)
+- não há condicionamento no texto anterior nem fallback de temperatura
+"""
+
+import os
+import sys
+import time
+import queue
+import threading
+from concurrent.futures import Future
+import audio_decode
+
+# Limite de atraso adicionado a cada janela enquanto o lote é montado
+DEFAULT_MAX_WAIT_MS = float(os.environ.get('WHISPER_BATCH_WAIT_MS', '10'))
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get('WHISPER_BATCH_SIZE', '8'))
+
+# Mesmo critério de silêncio usado pelo model.transcribe()
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+# Cada token de timestamp vale 2 frames de mel (HOP_LENGTH * 2 / SAMPLE_RATE = 20ms)
+TIME_PRECISION = 0.02
+
+def parse_window_segments(tokens: list, tokenizer, time_offset: float, window_duration: float) -> list:
+    """Divide os tokens de uma janela em segmentos usando os tokens de timestamp"""
+    timestamp_begin = tokenizer.timestamp_begin
+
+    segments = []
+    current = []
+    start = None
+
+    for token in tokens:
+        if token >= timestamp_begin:
+            timestamp = (token - timestamp_begin) * TIME_PRECISION
+            if start is not None and current:
+                segments.append((start, timestamp, current))
+                current = []
+                start = None
+            else:
+                start = timestamp
+        else:
+            current.append(token)
+
+    if current:
+        segments.append((start or 0.0, window_duration, current))
+
+    return [
+        {
+            'start': round(time_offset + seg_start, 2),
+            'end': round(time_offset + min(seg_end, window_duration), 2),
+            'text': tokenizer.decode(text_tokens),
+            'tokens': text_tokens
+        }
+        for seg_start, seg_end, text_tokens in segments
+    ]
+
+class WhisperBatchScheduler:
+    """
+    Fila compartilhada de janelas de mel na frente de um modelo Whisper
+    Uma thread de trabalho espera até `max_wait_ms` por mais janelas e decodifica o lote
+    Todo uso do modelo fora da thread de trabalho (alinhamento de palavras) passa por
+    `model_lock`, que a thread segura durante cada decodificação
+    """
+
+    def __init__(self, model, language: str = 'pt', max_batch_size: int = None, max_wait_ms: float = None):
+        import whisper
+
+        self.model = model
+        self.language = language
+        self.max_batch_size = max_batch_size or DEFAULT_MAX_BATCH_SIZE
+        self.max_wait = (DEFAULT_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000.0
+        self.options = whisper.DecodingOptions(
+            task='transcribe',
+            language=language,
+            temperature=0.0,
+            without_timestamps=False,
+            fp16=False
+        )
+        self.tokenizer = whisper.tokenizer.get_tokenizer(
+            model.is_multilingual,
+            num_languages=model.num_languages,
+            language=language,
+            task='transcribe'
+        )
+
+        self.batches = 0
+        self.windows = 0
+        self.model_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='whisper-batcher', daemon=True)
+        self._worker.start()
+
+    def submit_window(self, mel) -> Future:
+        """Enfileira uma janela de mel (n_mels x 3000) e retorna um Future com o DecodingResult"""
+        future = Future()
+        self._queue.put((mel, future))
+        return future
+
+    def transcribe(self, audio) -> dict:
+        """
+        Transcreve um arquivo ou array float32 16kHz pelo agendador
+        Retorna um dicionário no mesmo formato do model.transcribe()
+        """
+        from whisper.audio import N_SAMPLES, SAMPLE_RATE, log_mel_spectrogram, pad_or_trim
+
+        if isinstance(audio, str):
+            audio = audio_decode.load_audio(audio)
+
+        # Enviar todas as janelas do job de uma vez para que também sejam agrupadas entre si
+        windows = []
+        for offset in range(0, max(len(audio), 1), N_SAMPLES):
+            chunk = audio[offset:offset + N_SAMPLES]
+            mel = log_mel_spectrogram(pad_or_trim(chunk), self.model.dims.n_mels)
+            windows.append((offset / SAMPLE_RATE, len(chunk) / SAMPLE_RATE, self.submit_window(mel)))
+
+        segments = []
+        for time_offset, window_duration, future in windows:
+            result = future.result()
+
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+                continue
+
+            for segment in parse_window_segments(result.tokens, self.tokenizer, time_offset, window_duration):
+                if not segment['text'].strip():
+                    continue
+                segment.update({
+                    'id': len(segments),
+                    'seek': int(time_offset * 100),
+                    'temperature': result.temperature,
+                    'avg_logprob': result.avg_logprob,
+                    'compression_ratio': result.compression_ratio,
+                    'no_speech_prob': result.no_speech_prob
+                })
+                segments.append(segment)
+
+        return {
+            'text': ''.join(segment['text'] for segment in segments),
+            'segments': segments,
+            'language': self.language
+        }
+
+    def align_words(self, audio, segments: list, indices=None) -> int:
+        """
+        whisper_engine.align_words() no modelo do agendador, sem decodificação concorrente:
+        o find_alignment instala hooks de atenção cruzada no mesmo objeto do modelo
+        """
+        import whisper_engine
+
+        with self.model_lock:
+            return whisper_engine.align_words(self.model, audio, segments, indices, language=self.language)
+
+    def _collect_batch(self) -> list:
+        """Bloqueia pela primeira janela e espera no máximo `max_wait` pelas demais"""
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Repassar o sinal de parada para depois deste lote
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        import torch
+        import whisper
+
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+
+            try:
+                mel = torch.stack([item[0] for item in batch]).to(self.model.device)
+                with self.model_lock:
+                    results = whisper.decode(self.model, mel, self.options)
+            except Exception as e:
+                print(f"Whisper batch error: {e}", file=sys.stderr)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.windows += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        """Lotes executados e tamanho médio do lote"""
+        return {
+            'batches': self.batches,
+            'windows': self.windows,
+            'mean_batch_size': round(self.windows / self.batches, 2) if self.batches else 0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000
+        }
+
+    def close(self):
+        """Encerra a thread de trabalho depois das janelas pendentes"""
+        self._queue.put(None)
+        self._worker.join()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Cascata de dois modelos Whisper com porta de confiança
+Roda o modelo rápido (tiny) na chamada inteira e redecodifica com o modelo maior (base)
+apenas os trechos em que o Whisper indica baixa confiança, emendando pelo timestamp
+
+WHISPER_CASCADE ativa a cascata nos transcritores: '1' usa tiny:base, ou informe
+'<rápido>:<final>' (ex.: 'tiny:small'). Vazio ou '0' desativa.
+"""
+
+import os
+import sys
+import audio_decode
+
+DEFAULT_MODELS = ('tiny', 'base')
+
+# Mesmos limites que o Whisper usa para o fallback de temperatura
+LOGPROB_THRESHOLD = -1.0
+COMPRESSION_RATIO_THRESHOLD = 2.4
+NO_SPEECH_THRESHOLD = 0.6
+
+# Margem em volta de cada trecho redecodificado e distância para unir trechos próximos
+REGION_PADDING = 0.5
+REGION_MERGE_GAP = 1.0
+
+def cascade_models() -> tuple:
+    """(modelo rápido, modelo final) configurados em WHISPER_CASCADE, ou None"""
+    value = os.environ.get('WHISPER_CASCADE', '').strip().lower()
+    if value in ('', '0', 'false', 'no'):
+        return None
+    if value in ('1', 'true', 'yes'):
+        return DEFAULT_MODELS
+    draft, _, final = value.partition(':')
+    if not draft or not final:
+        raise ValueError(f"Invalid WHISPER_CASCADE: {value} (expected <draft>:<final>)")
+    return draft, final
+
+def low_confidence_reasons(segment: dict) -> list:
+    """Motivos pelos quais o segmento do modelo rápido deve ser redecodificado"""
+    reasons = []
+    if segment.get('avg_logprob', 0.0) < LOGPROB_THRESHOLD:
+        reasons.append('avg_logprob')
+    if segment.get('compression_ratio', 0.0) > COMPRESSION_RATIO_THRESHOLD:
+        reasons.append('compression_ratio')
+    # Como no whisper.transcribe: só é silêncio com no_speech_prob alto E avg_logprob baixo;
+    # fala decodificada com confiança e no_speech_prob alto fica com o modelo rápido
+    if (segment.get('no_speech_prob', 0.0) > NO_SPEECH_THRESHOLD
+            and segment.get('avg_logprob', 0.0) < LOGPROB_THRESHOLD):
+        reasons.append('no_speech_prob')
+    return reasons
+
+def flagged_regions(segments: list, duration: float) -> list:
+    """Intervalos (início, fim) em segundos a redecodificar, com margem e já unidos"""
+    regions = []
+    for i, segment in enumerate(segments):
+        if not low_confidence_reasons(segment):
+            continue
+        # A margem não invade os segmentos vizinhos, que continuam com o texto do modelo rápido
+        previous_end = segments[i - 1]['end'] if i > 0 else 0.0
+        next_start = segments[i + 1]['start'] if i + 1 < len(segments) else duration
+        start = min(segment['start'], max(previous_end, segment['start'] - REGION_PADDING))
+        end = max(segment['end'], min(next_start, segment['end'] + REGION_PADDING))
+        if regions and start - regions[-1][1] <= REGION_MERGE_GAP:
+            regions[-1][1] = max(regions[-1][1], end)
+        else:
+            regions.append([start, end])
+    return [(start, end) for start, end in regions if end > start]
+
+def _shift(segment: dict, offset: float) -> dict:
+    """Desloca os timestamps de um segmento (e das palavras) para o tempo absoluto"""
+    segment = dict(segment)
+    segment['start'] = segment['start'] + offset
+    segment['end'] = segment['end'] + offset
+    if segment.get('words'):
+        segment['words'] = [
+            dict(word, start=word['start'] + offset, end=word['end'] + offset)
+            for word in segment['words']
+        ]
+    return segment
+
+def _overlaps(segment: dict, start: float, end: float) -> bool:
+    """O segmento tem a maior parte dentro do intervalo"""
+    middle = (segment['start'] + segment['end']) / 2
+    return start <= middle < end
+
+def transcribe(audio, models: tuple = None, language: str = 'pt', **options) -> dict:
+    """
+    Transcreve `audio` (caminho ou array float32 16kHz) em cascata
+    `models` é (rápido, final); os modelos vêm do registro compartilhado e o final só é
+    carregado se algum trecho precisar dele
+    Retorna o dicionário no formato do model.transcribe() com a chave extra 'cascade'
+    """
+    import whisper
+    import whisper_models
+
+    draft_name, final_name = models or cascade_models() or DEFAULT_MODELS
+
+    if isinstance(audio, str):
+        audio = audio_decode.load_audio(audio)
+    sample_rate = whisper.audio.SAMPLE_RATE
+    duration = len(audio) / sample_rate
+
+    draft = whisper_models.get_model(draft_name).transcribe(audio, language=language, **options)
+    draft_segments = draft.get('segments', [])
+    regions = flagged_regions(draft_segments, duration)
+    flagged = sum(1 for segment in draft_segments if low_confidence_reasons(segment))
+
+    print(f"Cascade: {flagged}/{len(draft_segments)} segment(s) below confidence, "
+          f"{len(regions)} region(s) to re-decode", file=sys.stderr)
+
+    # Cada trecho é independente: sem o texto anterior como prompt, o modelo final
+    # não herda os erros do modelo rápido
+    final_options = dict(options, condition_on_previous_text=False)
+
+    segments = [segment for segment in draft_segments
+                if not any(_overlaps(segment, start, end) for start, end in regions)]
+    redecoded_seconds = 0.0
+    for start, end in regions:
+        clip = audio[int(start * sample_rate):int(end * sample_rate)]
+        result = whisper_models.get_model(final_name).transcribe(clip, language=language, **final_options)
+        segments.extend(_shift(segment, start) for segment in result.get('segments', []))
+        redecoded_seconds += end - start
+
+    segments.sort(key=lambda segment: segment['start'])
+    for i, segment in enumerate(segments):
+        segment['id'] = i
+
+    return {
+        'text': ''.join(segment['text'] for segment in segments),
+        'segments': segments,
+        'language': draft.get('language', language),
+        'cascade': {
+            'draft_model': draft_name,
+            'final_model': final_name,
+            'segments': len(draft_segments),
+            'flagged_segments': flagged,
+            'regions': len(regions),
+            'redecoded_seconds': round(redecoded_seconds, 2),
+            'redecoded_fraction': round(redecoded_seconds / duration, 4) if duration else 0.0
+        }
+    }
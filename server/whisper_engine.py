@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Engine Whisper em processo
+Executa model.transcribe() sem subprocessos e com timeout cooperativo
+
+O alinhamento de palavras (timestamps por palavra) é uma etapa separada e sob demanda:
+WHISPER_WORD_TIMES=none|critical|all (padrão none) diz aos transcritores quais
+segmentos alinhar depois da transcrição.
+"""
+
+import os
+import time
+import threading
+import audio_decode
+
+class TranscriptionTimeout(Exception):
+    """A transcrição passou do tempo limite"""
+
+# Prazo da transcrição em andamento, por thread
+_deadline = threading.local()
+
+def _install_deadline_hook(model):
+    """
+    Envolve model.decode() para checar o prazo antes de cada janela de 30s
+    O Whisper chama model.decode() uma vez por janela (e por temperatura de fallback),
+    então o timeout interrompe a transcrição entre janelas sem matar o processo
+    """
+    if getattr(model, '_deadline_hook_installed', False):
+        return
+
+    original_decode = model.decode
+
+    def decode_with_deadline(*args, **kwargs):
+        deadline = getattr(_deadline, 'value', None)
+        if deadline is not None and time.monotonic() > deadline:
+            raise TranscriptionTimeout("Transcription deadline exceeded")
+        return original_decode(*args, **kwargs)
+
+    model.decode = decode_with_deadline
+    model._deadline_hook_installed = True
+
+def transcribe(model, audio, timeout: float = None, **options) -> dict:
+    """
+    Transcreve `audio` (caminho ou array float32 16kHz) e retorna o dicionário do Whisper
+    Levanta TranscriptionTimeout se `timeout` segundos se passarem
+    """
+    _install_deadline_hook(model)
+    _deadline.value = time.monotonic() + timeout if timeout else None
+    try:
+        return model.transcribe(audio, **options)
+    finally:
+        _deadline.value = None
+
+# Trechos do modo streaming: cabem em uma janela de 30s junto com a sobreposição
+STREAM_CHUNK_SECONDS = 28
+PROMPT_CHARS = 200
+
+def iter_transcribe(model, audio, chunk_seconds: float = STREAM_CHUNK_SECONDS, align=None, **options):
+    """
+    Transcreve em trechos sequenciais cortados no silêncio, entregando os segmentos de
+    cada trecho assim que ficam prontos: gera (segmentos novos, segundos processados, duração)
+    O fim do texto já transcrito vai como initial_prompt do trecho seguinte
+    Com um caminho, o áudio é decodificado em blocos (audio_decode.iter_pcm_blocks) e a
+    memória fica limitada ao trecho em andamento; a duração vem do cabeçalho (pode ser None)
+    `align(model, trecho, segmentos)`, se informado, roda sobre cada trecho antes da junção
+    (tempos relativos ao trecho), para alinhar palavras sem manter o áudio inteiro
+    """
+    import whisper
+    import whisper_parallel
+
+    sample_rate = whisper.audio.SAMPLE_RATE
+    if isinstance(audio, str):
+        duration = audio_decode.probe_duration(audio)
+        blocks = audio_decode.iter_pcm_blocks(audio, dtype='float32')
+    else:
+        duration = len(audio) / sample_rate
+        blocks = [audio]
+
+    merger = whisper_parallel.ChunkMerger()
+    prompt = options.pop('initial_prompt', None)
+    for start, end, clip in whisper_parallel.iter_chunks(blocks, sample_rate, chunk_seconds):
+        result = model.transcribe(clip, initial_prompt=prompt, **options)
+        if align is not None and result.get('segments'):
+            align(model, clip, result['segments'])
+        added = merger.add(result, start)
+        if added:
+            prompt = ''.join(segment['text'] for segment in merger.segments)[-PROMPT_CHARS:]
+        yield added, end, duration
+
+WORD_TIME_MODES = ('none', 'critical', 'all')
+
+def word_time_mode() -> str:
+    """Quais segmentos recebem timestamps por palavra (WHISPER_WORD_TIMES)"""
+    mode = os.environ.get('WHISPER_WORD_TIMES', '').strip().lower() or 'none'
+    if mode not in WORD_TIME_MODES:
+        raise ValueError(f"Invalid WHISPER_WORD_TIMES: {mode} (expected one of {', '.join(WORD_TIME_MODES)})")
+    return mode
+
+def align_words(model, audio, segments: list, indices=None, language: str = 'pt') -> int:
+    """
+    Preenche segment['words'] com o mesmo alinhamento por atenção cruzada do
+    word_timestamps=True, mas só nos segmentos de `indices` (todos, se None)
+    Cada segmento é alinhado sobre o próprio trecho de áudio; retorna quantos foram alinhados
+    """
+    import whisper
+    from whisper.audio import HOP_LENGTH, N_FRAMES, N_SAMPLES, SAMPLE_RATE, log_mel_spectrogram, pad_or_trim
+    from whisper.timing import find_alignment
+
+    if isinstance(audio, str):
+        audio = audio_decode.load_audio(audio)
+
+    tokenizer = whisper.tokenizer.get_tokenizer(
+        model.is_multilingual,
+        num_languages=model.num_languages,
+        language=language,
+        task='transcribe'
+    )
+
+    aligned = 0
+    for i in (range(len(segments)) if indices is None else indices):
+        segment = segments[i]
+        text_tokens = [token for token in segment.get('tokens') or tokenizer.encode(segment['text'])
+                       if token < tokenizer.eot]
+        clip = audio[int(segment['start'] * SAMPLE_RATE):int(segment['end'] * SAMPLE_RATE)][:N_SAMPLES]
+        if not text_tokens or len(clip) < HOP_LENGTH:
+            continue
+
+        mel = log_mel_spectrogram(clip, model.dims.n_mels, padding=N_SAMPLES)
+        mel = pad_or_trim(mel, N_FRAMES).to(model.device)
+        timings = find_alignment(model, tokenizer, text_tokens, mel, len(clip) // HOP_LENGTH)
+
+        segment['words'] = [
+            {
+                'word': timing.word,
+                'start': round(segment['start'] + timing.start, 2),
+                'end': round(segment['start'] + timing.end, 2),
+                'probability': round(float(timing.probability), 3)
+            }
+            for timing in timings if timing.word.strip()
+        ]
+        aligned += 1
+    return aligned
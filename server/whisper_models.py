@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Registro compartilhado de modelos Whisper
+Carrega cada modelo uma única vez por processo e compartilha os pesos entre os transcritores
+
+O orçamento de memória é lido de WHISPER_MODEL_BUDGET_MB (0 = sem limite). Quando a
+soma dos modelos residentes passa do orçamento, o modelo usado há mais tempo é descartado.
+
+WHISPER_QUANTIZE=int8 seleciona a inferência quantizada (camadas lineares em int8)
+para todos os transcritores que usam o registro. WHISPER_STORE_DIR faz os modelos
+virem do store local (whisper_store) em vez de ~/.cache/whisper.
+"""
+
+import gc
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+def current_rss_bytes() -> int:
+    """Memória residente (RSS) atual do processo em bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # Fallback para sistemas sem /proc (retorna o pico, não o atual)
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def model_weights_bytes(model) -> int:
+    """Tamanho dos parâmetros e buffers do modelo em bytes"""
+    total = 0
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+QUANTIZE_MODES = ('int8',)
+
+def resolve_quantize(quantize: str = None) -> str:
+    """Normaliza o modo de quantização; None usa WHISPER_QUANTIZE, '' ou 'fp32' desativa"""
+    if quantize is None:
+        quantize = os.environ.get('WHISPER_QUANTIZE', '')
+    quantize = quantize.strip().lower()
+    if quantize in ('', 'none', 'fp32'):
+        return None
+    if quantize not in QUANTIZE_MODES:
+        raise ValueError(f"Unsupported Whisper quantization: {quantize}")
+    return quantize
+
+def quantize_int8(model):
+    """
+    Quantização dinâmica int8 das camadas lineares (somente CPU)
+    Os pesos viram int8 e as ativações são quantizadas em tempo de execução
+    """
+    import torch
+    from torch import nn
+
+    # O whisper usa uma subclasse de nn.Linear que o quantize_dynamic não reconhece;
+    # trocamos por nn.Linear comum compartilhando os mesmos tensores
+    for module in list(model.modules()):
+        for child_name, child in list(module.named_children()):
+            if isinstance(child, nn.Linear) and type(child) is not nn.Linear:
+                plain = nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+                plain.weight = child.weight
+                plain.bias = child.bias
+                setattr(module, child_name, plain)
+
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8, inplace=True)
+
+def load_whisper_model(name: str, quantize: str = None):
+    """
+    Loader padrão: carrega o modelo com a biblioteca whisper
+    Com WHISPER_STORE_DIR definido, usa somente o store local mapeado em memória
+    (whisper_store), que falha na hora se os pesos faltarem em vez de baixá-los
+    """
+    if os.environ.get('WHISPER_STORE_DIR'):
+        import whisper_store
+        model = whisper_store.load_model(name)
+    else:
+        import whisper
+        model = whisper.load_model(name, device='cpu' if quantize else None)
+
+    if quantize == 'int8':
+        return quantize_int8(model)
+    return model
+
+class WhisperModelRegistry:
+    """
+    Entrega handles de modelos por nome com política LRU
+    Chamadas com o mesmo nome recebem o mesmo objeto (pesos compartilhados)
+    """
+
+    def __init__(self, budget_mb: int = None, loader=None):
+        if budget_mb is None:
+            budget_mb = int(os.environ.get('WHISPER_MODEL_BUDGET_MB', '0') or 0)
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self._loader = loader or load_whisper_model
+        self._models = OrderedDict()
+        self._stats = {}
+        self._lock = threading.RLock()
+
+    def _model_stats(self, name: str) -> dict:
+        if name not in self._stats:
+            self._stats[name] = {
+                'hits': 0,
+                'misses': 0,
+                'loads': 0,
+                'evictions': 0,
+                'load_time': 0.0,
+                'resident_bytes': 0,
+                'weights_bytes': 0
+            }
+        return self._stats[name]
+
+    def get(self, name: str, quantize: str = None):
+        """
+        Retorna o modelo `name`, carregando-o na primeira chamada
+        `quantize` segue resolve_quantize(); cada variante é um modelo separado no registro
+        """
+        quantize = resolve_quantize(quantize)
+        key = f"{name}-{quantize}" if quantize else name
+
+        with self._lock:
+            stats = self._model_stats(key)
+
+            if key in self._models:
+                self._models.move_to_end(key)
+                stats['hits'] += 1
+                return self._models[key]['model']
+
+            stats['misses'] += 1
+            print(f"Loading Whisper model '{key}'...", file=sys.stderr)
+
+            rss_before = current_rss_bytes()
+            start = time.perf_counter()
+            model = self._loader(name, quantize)
+            load_time = time.perf_counter() - start
+            rss_delta = max(0, current_rss_bytes() - rss_before)
+
+            weights_bytes = model_weights_bytes(model)
+            # O delta de RSS pode ser subestimado pelo alocador; usar o maior dos dois
+            resident_bytes = max(rss_delta, weights_bytes)
+
+            stats['loads'] += 1
+            stats['load_time'] = round(load_time, 3)
+            stats['resident_bytes'] = resident_bytes
+            stats['weights_bytes'] = weights_bytes
+
+            self._models[key] = {'model': model, 'resident_bytes': resident_bytes}
+            print(f"Whisper model '{key}' loaded in {load_time:.2f}s ({resident_bytes / 1e6:.0f} MB)", file=sys.stderr)
+
+            self._evict(keep=key)
+            return model
+
+    def _evict(self, keep: str):
+        """Descarta modelos LRU até a memória residente caber no orçamento"""
+        if not self.budget_bytes:
+            return
+
+        evicted = False
+        while self.resident_bytes() > self.budget_bytes:
+            candidates = [name for name in self._models if name != keep]
+            if not candidates:
+                # O modelo pedido sozinho já excede o orçamento; mantemos mesmo assim
+                break
+            name = candidates[0]
+            del self._models[name]
+            self._stats[name]['evictions'] += 1
+            evicted = True
+            print(f"Evicted Whisper model '{name}' (budget {self.budget_bytes / 1e6:.0f} MB)", file=sys.stderr)
+
+        if evicted:
+            gc.collect()
+
+    def resident_bytes(self) -> int:
+        """Memória contabilizada dos modelos atualmente carregados"""
+        return sum(entry['resident_bytes'] for entry in self._models.values())
+
+    def loaded(self) -> list:
+        """Nomes dos modelos carregados, do menos ao mais recente"""
+        with self._lock:
+            return list(self._models.keys())
+
+    def stats(self) -> dict:
+        """Estatísticas por modelo: tempo de carga, tamanho residente, hits e misses"""
+        with self._lock:
+            return {
+                'budget_bytes': self.budget_bytes,
+                'resident_bytes': self.resident_bytes(),
+                'process_rss_bytes': current_rss_bytes(),
+                'loaded': list(self._models.keys()),
+                'models': {name: dict(stats) for name, stats in self._stats.items()}
+            }
+
+# Registro padrão do processo, compartilhado por todos os transcritores
+registry = WhisperModelRegistry()
+
+def get_model(name: str, quantize: str = None):
+    """Retorna um modelo do registro padrão"""
+    return registry.get(name, quantize)
+
+def model_stats() -> dict:
+    """Estatísticas do registro padrão"""
+    return registry.stats()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Whisper em paralelo por processos sobre trechos cortados no silêncio
+O áudio é dividido em trechos de duração limitada, cortados no quadro mais silencioso,
+e cada trecho é transcrito por um processo do pool (modelo carregado uma vez por processo)
+
+WHISPER_PARALLEL=<N> ativa o modo com N processos nos transcritores.
+WHISPER_CHUNK_SECONDS limita a duração de cada trecho (padrão: 120).
+"""
+
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import cpu_budget
+import audio_decode
+
+MAX_CHUNK_SECONDS = float(os.environ.get('WHISPER_CHUNK_SECONDS', '120'))
+# O corte é procurado na segunda metade do trecho
+MIN_CHUNK_FRACTION = 0.5
+# Cada trecho começa um pouco antes do corte; as palavras repetidas na emenda são descartadas
+OVERLAP_SECONDS = 1.0
+DUPLICATE_TOLERANCE = 0.1
+# Palavras aceitas guardadas para achar a repetição da emenda em segmentos sem 'words'
+TAIL_WORDS = 32
+
+def parallel_workers() -> int:
+    """Número de processos configurado em WHISPER_PARALLEL (0 = desativado)"""
+    value = os.environ.get('WHISPER_PARALLEL', '').strip()
+    return max(0, int(value)) if value else 0
+
+def _cut_window(cut: int, sample_rate: int, max_chunk_seconds: float) -> tuple:
+    """
+    Quadros [primeiro, último) onde se procura o corte seguinte a `cut` (em amostras)
+    Os quadros do VAD são contados do início da gravação: split_at_silence() e
+    iter_chunks() medem as mesmas janelas e chegam aos mesmos cortes
+    """
+    import audio_vad
+
+    frame_length = max(1, int(sample_rate * audio_vad.FRAME_MS / 1000))
+    first = (cut + int(max_chunk_seconds * MIN_CHUNK_FRACTION * sample_rate)) // frame_length
+    last = (cut + int(max_chunk_seconds * sample_rate)) // frame_length
+    return first, last, frame_length
+
+def split_at_silence(audio, sample_rate: int, max_chunk_seconds: float = MAX_CHUNK_SECONDS) -> list:
+    """Pontos de corte (em segundos) no quadro de menor energia de cada trecho, incluindo 0 e o fim"""
+    import audio_vad
+
+    max_length = int(max_chunk_seconds * sample_rate)
+    energy = audio_vad.frame_energy_db(audio, sample_rate)
+
+    cuts = [0]
+    while len(audio) - cuts[-1] > max_length:
+        first, last, frame_length = _cut_window(cuts[-1], sample_rate, max_chunk_seconds)
+        window = energy[first:last]
+        cuts.append((first + int(window.argmin()) if len(window) else last) * frame_length)
+    cuts.append(len(audio))
+    return [cut / sample_rate for cut in cuts]
+
+# Estado de cada processo do pool
+_worker = {}
+
+def _init_worker(model_name: str, quantize: str, threads: int, options: dict):
+    """Inicializador do pool: limita as threads e carrega o modelo uma única vez"""
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    import torch
+    import whisper_models
+
+    torch.set_num_threads(threads)
+    _worker['model'] = whisper_models.get_model(model_name, quantize)
+    _worker['options'] = options
+
+def _transcribe_chunk(audio) -> dict:
+    return _worker['model'].transcribe(audio, **_worker['options'])
+
+def _shift(segment: dict, offset: float) -> dict:
+    segment = dict(segment, start=segment['start'] + offset, end=segment['end'] + offset)
+    if segment.get('words'):
+        segment['words'] = [
+            dict(word, start=word['start'] + offset, end=word['end'] + offset)
+            for word in segment['words']
+        ]
+    return segment
+
+def _normalize(word: str) -> str:
+    return ''.join(ch for ch in word.lower() if ch.isalnum())
+
+def _overlap_length(tail: list, words: list) -> int:
+    """Maior k em que as k primeiras palavras de `words` repetem as k últimas de `tail`"""
+    for k in range(min(len(tail), len(words)), 0, -1):
+        if tail[-k:] == words[:k]:
+            return k
+    return 0
+
+class ChunkMerger:
+    """
+    Junta os segmentos dos trechos em ordem, com timestamps absolutos
+    Na sobreposição entre trechos, descarta palavras que terminam antes do fim do que já
+    foi aceito ou que repetem a última palavra aceita. Segmentos sem 'words' que cruzam o
+    fim aceito perdem as primeiras palavras quando elas repetem o fim do texto aceito;
+    sem repetição no texto, valem só se o meio do segmento estiver depois do fim aceito
+    """
+
+    def __init__(self):
+        self.segments = []
+        self._last_end = 0.0
+        self._tail = []
+
+    def _accept(self, words: list):
+        self._tail = (self._tail + [word for word in words if word])[-TAIL_WORDS:]
+
+    def _keep_words(self, words: list) -> list:
+        kept = []
+        for word in words:
+            normalized = _normalize(word['word'])
+            repeated = bool(self._tail) and word['start'] < self._last_end + DUPLICATE_TOLERANCE \
+                and normalized == self._tail[-1]
+            if word['end'] <= self._last_end + DUPLICATE_TOLERANCE or repeated:
+                continue
+            kept.append(word)
+            self._last_end = max(self._last_end, word['end'])
+            self._accept([normalized])
+        return kept
+
+    def _keep_text(self, segment: dict):
+        """Segmento sem 'words' sem a parte repetida da emenda, ou None se for todo repetido"""
+        if segment['end'] <= self._last_end + DUPLICATE_TOLERANCE:
+            return None
+        words = segment['text'].split()
+        normalized = [_normalize(word) for word in words]
+        if segment['start'] < self._last_end:
+            repeated = _overlap_length(self._tail, [word for word in normalized if word])
+            if repeated:
+                # Conta também os tokens só de pontuação entre as palavras repetidas
+                cut = [i for i, word in enumerate(normalized) if word][repeated - 1] + 1
+                if cut >= len(words):
+                    return None
+                words, normalized = words[cut:], normalized[cut:]
+                segment = dict(segment, start=self._last_end, text=' ' + ' '.join(words))
+            elif (segment['start'] + segment['end']) / 2 < self._last_end:
+                return None
+        self._last_end = max(self._last_end, segment['end'])
+        self._accept(normalized)
+        return segment
+
+    def add(self, result: dict, offset: float) -> list:
+        """Acrescenta o resultado de um trecho e retorna só os segmentos novos"""
+        added = []
+        for segment in result.get('segments', []):
+            segment = _shift(segment, offset)
+
+            if segment.get('words'):
+                words = self._keep_words(segment['words'])
+                if not words:
+                    continue
+                if len(words) != len(segment['words']):
+                    segment = dict(segment, start=words[0]['start'], words=words,
+                                   text=''.join(word['word'] for word in words))
+            else:
+                segment = self._keep_text(segment)
+                if segment is None:
+                    continue
+
+            segment['id'] = len(self.segments)
+            self.segments.append(segment)
+            added.append(segment)
+        return added
+
+def merge_chunks(chunk_results: list, chunk_offsets: list) -> list:
+    """Junta os resultados de todos os trechos (ver ChunkMerger)"""
+    merger = ChunkMerger()
+    for result, offset in zip(chunk_results, chunk_offsets):
+        merger.add(result, offset)
+    return merger.segments
+
+def chunk_bounds(audio, sample_rate: int, max_chunk_seconds: float = MAX_CHUNK_SECONDS) -> list:
+    """(início com sobreposição, corte final) de cada trecho, em segundos"""
+    cuts = split_at_silence(audio, sample_rate, max_chunk_seconds)
+    return [(max(0.0, start - OVERLAP_SECONDS) if i else 0.0, end)
+            for i, (start, end) in enumerate(zip(cuts[:-1], cuts[1:]))]
+
+def iter_chunks(blocks, sample_rate: int, max_chunk_seconds: float = MAX_CHUNK_SECONDS):
+    """
+    Versão incremental de chunk_bounds(): consome blocos de amostras e gera
+    (início com sobreposição, corte, trecho float32) assim que cada corte é decidido
+    O buffer guarda só o trecho em formação (até um trecho + um bloco), então a memória
+    não cresce com a duração da gravação. Os cortes são os mesmos de split_at_silence()
+    para qualquer tamanho de bloco
+    """
+    import numpy as np
+    import audio_vad
+    import audio_decode
+
+    max_length = int(max_chunk_seconds * sample_rate)
+    overlap = int(OVERLAP_SECONDS * sample_rate)
+
+    buffer = np.zeros(0, dtype=np.float32)
+    buffer_start = 0  # posição (em amostras) de buffer[0] na gravação
+    cut = 0           # início do trecho atual, sem a sobreposição
+
+    def clip(start: int, end: int):
+        return buffer[start - buffer_start:end - buffer_start]
+
+    for block in blocks:
+        buffer = np.concatenate([buffer, audio_decode.to_float32(block)])
+        while buffer_start + len(buffer) - cut > max_length:
+            first, last, frame_length = _cut_window(cut, sample_rate, max_chunk_seconds)
+            energy = audio_vad.frame_energy_db(clip(first * frame_length, last * frame_length), sample_rate)
+            new_cut = (first + int(energy.argmin()) if len(energy) else last) * frame_length
+            start = max(0, cut - overlap) if cut else 0
+            yield start / sample_rate, new_cut / sample_rate, clip(start, new_cut)
+
+            cut = new_cut
+            drop = max(0, cut - overlap) - buffer_start
+            buffer, buffer_start = buffer[drop:], buffer_start + drop
+
+    end = buffer_start + len(buffer)
+    if end > cut:
+        start = max(0, cut - overlap) if cut else 0
+        yield start / sample_rate, end / sample_rate, clip(start, end)
+
+def transcribe(audio, model_name: str = 'base', workers: int = None, quantize: str = None,
+               threads: int = None, sample_rate: int = 16000, **options) -> dict:
+    """
+    Transcreve `audio` (caminho ou array float32 16kHz) com `workers` processos
+    `threads` é o total de threads do job, dividido entre os processos (padrão: os núcleos
+    em que o processo pode rodar, que já refletem o orçamento do cpu_budget)
+    Retorna o dicionário no formato do model.transcribe() com a chave extra 'parallel'
+    """
+    if isinstance(audio, str):
+        audio = audio_decode.load_audio(audio)
+
+    bounds = chunk_bounds(audio, sample_rate)
+    chunk_offsets = [start for start, _ in bounds]
+    chunks = [audio[int(start * sample_rate):int(end * sample_rate)] for start, end in bounds]
+
+    workers = max(1, min(workers or parallel_workers() or 1, len(chunks)))
+    threads_per_worker = max(1, (threads or len(cpu_budget.available_cpus())) // workers)
+
+    print(f"Parallel Whisper: {len(chunks)} chunk(s) on {workers} process(es), "
+          f"{threads_per_worker} thread(s) each", file=sys.stderr)
+
+    start_time = time.perf_counter()
+    # spawn: o torch não é seguro para fork depois de iniciar suas threads
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(model_name, quantize, threads_per_worker, options)
+    ) as pool:
+        chunk_results = list(pool.map(_transcribe_chunk, chunks))
+    wall_seconds = time.perf_counter() - start_time
+
+    segments = merge_chunks(chunk_results, chunk_offsets)
+    duration = len(audio) / sample_rate
+
+    return {
+        'text': ''.join(segment['text'] for segment in segments),
+        'segments': segments,
+        'language': chunk_results[0].get('language') if chunk_results else None,
+        'parallel': {
+            'workers': workers,
+            'threads_per_worker': threads_per_worker,
+            'chunks': len(chunks),
+            'cuts': [round(end, 2) for _, end in bounds],
+            'wall_seconds': round(wall_seconds, 2),
+            'rtf': round(wall_seconds / duration, 4) if duration else None
+        }
+    }
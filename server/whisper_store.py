@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Armazenamento local dos pesos Whisper para partida a frio rápida e sem rede
+Os pesos são convertidos uma vez para float32 contíguo em um único arquivo, mapeado em
+memória (mmap) na carga; os checksums são verificados apenas na instalação
+
+Uso:
+    whisper_store.py install <modelo> [checkpoint.pt]   # converte e verifica
+    whisper_store.py verify <modelo>                    # reverifica os checksums
+    whisper_store.py bench <modelo> [arquivo]           # mede o tempo até a 1ª transcrição
+
+O diretório vem de WHISPER_STORE_DIR (padrão: ~/.cache/akig/whisper-store). Quando a
+variável está definida, o registro de modelos carrega somente daqui e nunca baixa pesos.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+from contextlib import contextmanager
+
+STORE_DIR = os.environ.get('WHISPER_STORE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'akig', 'whisper-store')
+WEIGHTS_FILE = 'weights.bin'
+MANIFEST_FILE = 'manifest.json'
+VERIFIED_FILE = 'verified.json'
+ALIGNMENT = 64
+
+class StoreError(Exception):
+    """Pesos ausentes ou alterados desde a verificação"""
+
+def model_dir(name: str, store_dir: str = None) -> str:
+    return os.path.join(store_dir or STORE_DIR, name)
+
+def default_checkpoint(name: str) -> str:
+    """Checkpoint baixado pela biblioteca whisper (~/.cache/whisper/<modelo>.pt)"""
+    cache = os.getenv('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cache, 'whisper', f'{name}.pt')
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_verified_stamp(directory: str, sha256: str):
+    weights_path = os.path.join(directory, WEIGHTS_FILE)
+    stat = os.stat(weights_path)
+    with open(os.path.join(directory, VERIFIED_FILE), 'w') as f:
+        json.dump({'sha256': sha256, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}, f)
+
+def install(name: str, checkpoint_path: str = None, store_dir: str = None) -> dict:
+    """Converte um checkpoint .pt para o formato do store e verifica os checksums"""
+    import numpy as np
+    import torch
+
+    checkpoint_path = checkpoint_path or default_checkpoint(name)
+    if not os.path.exists(checkpoint_path):
+        raise StoreError(f"Checkpoint not found: {checkpoint_path}")
+
+    checkpoint = torch.load(checkpoint_path, map_location='cpu')
+    directory = model_dir(name, store_dir)
+    os.makedirs(directory, exist_ok=True)
+
+    tensors = []
+    offset = 0
+    weights_path = os.path.join(directory, WEIGHTS_FILE)
+    temp_weights = weights_path + '.tmp'
+    digest = hashlib.sha256()
+
+    with open(temp_weights, 'wb') as f:
+        for tensor_name, tensor in checkpoint['model_state_dict'].items():
+            # Pré-converter para float32 (a inferência em CPU roda em fp32)
+            array = np.ascontiguousarray(tensor.float().numpy())
+            data = array.tobytes()
+
+            padding = (-offset) % ALIGNMENT
+            if padding:
+                f.write(b'\0' * padding)
+                digest.update(b'\0' * padding)
+                offset += padding
+
+            f.write(data)
+            digest.update(data)
+            tensors.append({
+                'name': tensor_name,
+                'dtype': 'float32',
+                'shape': list(array.shape),
+                'offset': offset,
+                'nbytes': len(data),
+                'sha256': hashlib.sha256(data).hexdigest()
+            })
+            offset += len(data)
+
+    alignment_heads = None
+    try:
+        from whisper import _ALIGNMENT_HEADS
+        alignment_heads = _ALIGNMENT_HEADS.get(name)
+        if isinstance(alignment_heads, bytes):
+            alignment_heads = alignment_heads.decode('ascii')
+    except ImportError:
+        pass
+
+    manifest = {
+        'name': name,
+        'dims': checkpoint['dims'],
+        'alignment_heads': alignment_heads,
+        'size': offset,
+        'sha256': digest.hexdigest(),
+        'tensors': tensors
+    }
+
+    os.replace(temp_weights, weights_path)
+    with open(os.path.join(directory, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return verify(name, store_dir)
+
+def verify(name: str, store_dir: str = None) -> dict:
+    """Confere o checksum do arquivo e de cada tensor e grava o selo de verificação"""
+    directory = model_dir(name, store_dir)
+    manifest = _read_manifest(directory)
+
+    import numpy as np
+    weights_path = os.path.join(directory, WEIGHTS_FILE)
+
+    sha256 = _file_sha256(weights_path)
+    if sha256 != manifest['sha256']:
+        raise StoreError(f"Checksum mismatch for {weights_path}")
+
+    weights = np.memmap(weights_path, dtype=np.uint8, mode='r')
+    for tensor in manifest['tensors']:
+        data = weights[tensor['offset']:tensor['offset'] + tensor['nbytes']]
+        if hashlib.sha256(data).hexdigest() != tensor['sha256']:
+            raise StoreError(f"Checksum mismatch for tensor {tensor['name']}")
+
+    _write_verified_stamp(directory, sha256)
+    return {'name': name, 'directory': directory, 'size': manifest['size'], 'sha256': sha256, 'tensors': len(manifest['tensors'])}
+
+def _read_manifest(directory: str) -> dict:
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(manifest_path) or not os.path.exists(os.path.join(directory, WEIGHTS_FILE)):
+        name = os.path.basename(directory)
+        raise StoreError(f"Whisper weights '{name}' not installed in {directory}; run: whisper_store.py install {name}")
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def _check_verified(directory: str, manifest: dict):
+    """Checagem barata na carga: o arquivo precisa ser o mesmo que foi verificado"""
+    try:
+        with open(os.path.join(directory, VERIFIED_FILE)) as f:
+            stamp = json.load(f)
+    except (OSError, ValueError):
+        raise StoreError(f"Whisper weights in {directory} were never verified; run: whisper_store.py verify {manifest['name']}")
+
+    stat = os.stat(os.path.join(directory, WEIGHTS_FILE))
+    if (stamp.get('sha256') != manifest['sha256'] or stamp.get('size') != stat.st_size
+            or stamp.get('mtime_ns') != stat.st_mtime_ns):
+        raise StoreError(f"Whisper weights in {directory} changed since verification; run: whisper_store.py verify {manifest['name']}")
+
+@contextmanager
+def _skip_weight_init():
+    """Constrói o modelo sem inicializar pesos aleatórios (serão substituídos pelo mmap)"""
+    from torch import nn
+
+    modules = (nn.Linear, nn.Conv1d, nn.Embedding, nn.LayerNorm)
+    originals = {module: module.reset_parameters for module in modules}
+    for module in modules:
+        module.reset_parameters = lambda self: None
+    try:
+        yield
+    finally:
+        for module, reset in originals.items():
+            module.reset_parameters = reset
+
+def load_model(name: str, store_dir: str = None):
+    """
+    Carrega o modelo com os tensores mapeados em memória (copy-on-write)
+    Falha imediatamente se os pesos não estiverem instalados; nunca tenta download
+    """
+    # Checar os pesos antes de importar o torch, para falhar em milissegundos
+    directory = model_dir(name, store_dir)
+    manifest = _read_manifest(directory)
+    _check_verified(directory, manifest)
+
+    import numpy as np
+    import torch
+    from whisper.model import ModelDimensions, Whisper
+
+    weights = np.memmap(os.path.join(directory, WEIGHTS_FILE), dtype=np.uint8, mode='c')
+    state_dict = {}
+    for tensor in manifest['tensors']:
+        data = weights[tensor['offset']:tensor['offset'] + tensor['nbytes']]
+        state_dict[tensor['name']] = torch.from_numpy(data.view(np.float32).reshape(tensor['shape']))
+
+    with _skip_weight_init():
+        model = Whisper(ModelDimensions(**manifest['dims']))
+    model.load_state_dict(state_dict, assign=True)
+
+    if manifest.get('alignment_heads'):
+        model.set_alignment_heads(manifest['alignment_heads'].encode('ascii'))
+
+    return model.eval()
+
+def bench(name: str, file_path: str = None) -> dict:
+    """Tempo de partida a frio: imports, carga do store e primeira transcrição"""
+    start = time.perf_counter()
+    import numpy as np
+    import whisper
+    import_time = time.perf_counter() - start
+
+    load_start = time.perf_counter()
+    model = load_model(name)
+    load_time = time.perf_counter() - load_start
+
+    if file_path:
+        audio = whisper.load_audio(file_path)
+    else:
+        audio = np.zeros(whisper.audio.SAMPLE_RATE * 5, dtype=np.float32)
+
+    transcribe_start = time.perf_counter()
+    model.transcribe(audio, language='pt', fp16=False)
+    transcribe_time = time.perf_counter() - transcribe_start
+
+    return {
+        'model': name,
+        'import_seconds': round(import_time, 3),
+        'load_seconds': round(load_time, 3),
+        'first_transcription_seconds': round(transcribe_time, 3),
+        'time_to_first_transcription': round(time.perf_counter() - start, 3)
+    }
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] not in ('install', 'verify', 'bench'):
+        print("Usage: whisper_store.py install <model> [checkpoint.pt] | verify <model> | bench <model> [audio_file]", file=sys.stderr)
+        sys.exit(1)
+
+    command, name = args[0], args[1]
+    extra = args[2] if len(args) > 2 else None
+
+    try:
+        if command == 'install':
+            result = install(name, extra)
+        elif command == 'verify':
+            result = verify(name)
+        else:
+            result = bench(name, extra)
+        print(json.dumps(result, indent=2))
+    except StoreError as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Decodificação Whisper restrita aos trechos de fala
+Um pré-passe de VAD (audio_vad) encontra a fala, só ela é enviada ao Whisper e os
+timestamps de segmentos e palavras são mapeados de volta para o tempo do arquivo original
+
+WHISPER_VAD=1 ativa o pré-passe nos transcritores.
+"""
+
+import os
+import sys
+import time
+import audio_decode
+
+# Silêncio inserido entre trechos concatenados, para o Whisper não emendar frases
+SPACER_SECONDS = 0.3
+
+def vad_enabled() -> bool:
+    return os.environ.get('WHISPER_VAD', '').strip().lower() in ('1', 'true', 'yes')
+
+class TimeMap:
+    """Converte tempos do áudio concatenado para tempos do arquivo original"""
+
+    def __init__(self):
+        # (início no concatenado, início no original, duração)
+        self.pieces = []
+
+    def add(self, concatenated_start: float, original_start: float, duration: float):
+        self.pieces.append((concatenated_start, original_start, duration))
+
+    def to_original(self, t: float) -> float:
+        result = self.pieces[0][1] if self.pieces else t
+        for concatenated_start, original_start, duration in self.pieces:
+            if t < concatenated_start:
+                break
+            # Tempos caídos no espaçador ficam presos ao fim do trecho anterior
+            result = original_start + min(t - concatenated_start, duration)
+        return round(result, 3)
+
+def remap_segments(segments: list, time_map: TimeMap) -> list:
+    """Segmentos (e palavras) com timestamps do arquivo original"""
+    remapped = []
+    for segment in segments:
+        segment = dict(segment, start=time_map.to_original(segment['start']), end=time_map.to_original(segment['end']))
+        if segment.get('words'):
+            segment['words'] = [
+                dict(word, start=time_map.to_original(word['start']), end=time_map.to_original(word['end']))
+                for word in segment['words']
+            ]
+        remapped.append(segment)
+    return remapped
+
+def transcribe(audio, transcribe_fn, sample_rate: int = 16000) -> dict:
+    """
+    Roda `transcribe_fn(array)` só sobre a fala de `audio` (caminho ou array float32 16kHz)
+    `transcribe_fn` é qualquer função no formato do model.transcribe() (modelo, cascata...)
+    Retorna o resultado com timestamps originais e as chaves extras 'vad' e 'speech_regions'
+    (os trechos detectados, reaproveitados pelas métricas da chamada)
+    """
+    import numpy as np
+    import audio_vad
+
+    if isinstance(audio, str):
+        audio = audio_decode.load_audio(audio)
+
+    duration = len(audio) / sample_rate
+    regions = audio_vad.speech_regions(audio, sample_rate)
+    speech_seconds = sum(end - start for start, end in regions)
+
+    print(f"VAD: {len(regions)} speech region(s), {speech_seconds:.1f}s of {duration:.1f}s", file=sys.stderr)
+
+    vad_info = {
+        'regions': len(regions),
+        'speech_seconds': round(speech_seconds, 2),
+        'skipped_seconds': round(duration - speech_seconds, 2),
+        'duration': round(duration, 2)
+    }
+
+    if not regions:
+        # Sem fala nenhuma: não decodificar evita texto alucinado sobre o silêncio
+        return {'text': '', 'segments': [], 'language': None, 'vad': vad_info, 'speech_regions': regions}
+
+    spacer = np.zeros(int(SPACER_SECONDS * sample_rate), dtype=np.float32)
+    pieces = []
+    time_map = TimeMap()
+    position = 0.0
+    for start, end in regions:
+        piece = audio[int(start * sample_rate):int(end * sample_rate)]
+        time_map.add(position, start, len(piece) / sample_rate)
+        pieces.extend([piece, spacer])
+        position += (len(piece) + len(spacer)) / sample_rate
+
+    start_time = time.perf_counter()
+    result = transcribe_fn(np.concatenate(pieces[:-1]).astype(np.float32))
+    decode_seconds = time.perf_counter() - start_time
+
+    # RTF sobre a duração original: é onde aparece a economia nas chamadas com espera longa
+    vad_info['decode_seconds'] = round(decode_seconds, 2)
+    vad_info['rtf'] = round(decode_seconds / duration, 4) if duration else None
+
+    result = dict(result, segments=remap_segments(result.get('segments', []), time_map))
+    result['vad'] = vad_info
+    result['speech_regions'] = regions
+    return result